@@ -1,14 +1,35 @@
+import argparse
 import csv
+import hashlib
 import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import ollama
+from armazenamento_interacoes import INTERACOES_PATH, ler_interacoes
 
-def carregar_interacoes(arquivo):
-    """Carrega as interações salvas de um arquivo JSON."""
-    with open(arquivo, 'r', encoding='utf-8') as f:
-        return json.load(f)
+# Versão do prompt do avaliador. Altere ao mudar o prompt para invalidar o cache de veredictos.
+PROMPT_VERSAO = "1"
+MODELO_AVALIADOR = "mistral"
+CACHE_AVALIACOES_PATH = "cache_avaliacoes.jsonl"
 
-def avaliar_resposta(query, documentos, resposta):
-    """Usa o modelo Mistral via Ollama para avaliar a resposta com base na tríade RAG."""
+# Campos obrigatórios do veredicto do avaliador (a tríade RAG)
+CHAVES_AVALIACAO = ("grounding", "retrieval", "relevance")
+
+def avaliacao_valida(avaliacao):
+    """Indica se o veredicto é um objeto JSON com os três campos da tríade."""
+    return isinstance(avaliacao, dict) and all(chave in avaliacao for chave in CHAVES_AVALIACAO)
+
+def carregar_interacoes(arquivo=INTERACOES_PATH):
+    """Percorre as interações salvas (um JSON por linha) sem carregar o arquivo inteiro."""
+    return ler_interacoes(arquivo)
+
+def avaliar_resposta(query, documentos, resposta, modelo=MODELO_AVALIADOR, tentativas=3, espera_inicial=1.0):
+    """Usa o modelo Mistral via Ollama para avaliar a resposta com base na tríade RAG.
+
+    Respostas que não são um objeto JSON com os campos de CHAVES_AVALIACAO são repetidas
+    até `tentativas` vezes, com espera exponencial a partir de `espera_inicial` segundos.
+    """
     prompt = f"""
     You are an evaluator specialized in RAG (Retrieval-Augmented Generation) systems. Your task is to evaluate the quality of a response generated by a RAG model based on the RAG triad: Grounding, Retrieval, and Relevance.
     ### Instructions:
@@ -49,16 +70,90 @@ def avaliar_resposta(query, documentos, resposta):
       "relevance": "Evaluation of relevance..."
     }}
     """
-    try:
-        response = ollama.chat(model='mistral', messages=[{"role": "user", "content": prompt}])
-        return json.loads(response['message']['content'])
-    except Exception as e:
-        print(f"Erro ao avaliar a resposta: {e}")
-        return {
-            "grounding": "Evaluation failed.",
-            "retrieval": "Evaluation failed.",
-            "relevance": "Evaluation failed."
-        }
+    for tentativa in range(tentativas):
+        try:
+            response = ollama.chat(model=modelo, messages=[{"role": "user", "content": prompt}])
+            avaliacao = json.loads(response['message']['content'])
+            if not avaliacao_valida(avaliacao):
+                raise ValueError(f"veredicto sem os campos {', '.join(CHAVES_AVALIACAO)}")
+            return avaliacao
+        except Exception as e:
+            print(f"Erro ao avaliar a resposta (tentativa {tentativa + 1}/{tentativas}): {e}")
+            if tentativa + 1 < tentativas:
+                time.sleep(espera_inicial * 2 ** tentativa)
+    return {
+        "grounding": "Evaluation failed.",
+        "retrieval": "Evaluation failed.",
+        "relevance": "Evaluation failed.",
+        "falhou": True,
+    }
+
+def chave_avaliacao(query, documentos, resposta, modelo=MODELO_AVALIADOR):
+    """Gera a chave do cache de veredictos para uma interação."""
+    hash_documentos = hashlib.sha1(json.dumps(documentos, ensure_ascii=False).encode("utf-8")).hexdigest()
+    hash_resposta = hashlib.sha1(resposta.encode("utf-8")).hexdigest()
+    return hashlib.sha1(
+        json.dumps([query, hash_documentos, hash_resposta, modelo, PROMPT_VERSAO], ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+def carregar_cache_avaliacoes(arquivo=CACHE_AVALIACOES_PATH):
+    """Carrega os veredictos já calculados (um JSON por linha)."""
+    cache = {}
+    if os.path.exists(arquivo):
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            for linha in f:
+                if not linha.strip():
+                    continue
+                try:
+                    entrada = json.loads(linha)
+                except json.JSONDecodeError:
+                    # Última linha truncada por uma execução interrompida durante a gravação
+                    continue
+                # Veredictos incompletos gravados por versões anteriores são avaliados de novo
+                if avaliacao_valida(entrada["avaliacao"]):
+                    cache[entrada["chave"]] = entrada["avaliacao"]
+    return cache
+
+def registrar_avaliacao(arquivo, chave, avaliacao):
+    """Acrescenta um veredicto ao cache em disco."""
+    with open(arquivo, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({"chave": chave, "avaliacao": avaliacao}, ensure_ascii=False) + "\n")
+
+def avaliar_interacoes(interacoes, concorrencia=4, modelo=MODELO_AVALIADOR, arquivo_cache=CACHE_AVALIACOES_PATH):
+    """Avalia as interações em paralelo, reaproveitando os veredictos em cache.
+
+    Apenas interações novas ou alteradas são enviadas ao modelo avaliador.
+    """
+    cache = carregar_cache_avaliacoes(arquivo_cache)
+
+    # Guarda apenas o necessário de cada interação; as completas só ficam em memória
+    # enquanto aguardam avaliação.
+    resumo = []
+    pendentes = {}
+    for interacao in interacoes:
+        chave = chave_avaliacao(interacao['query'], interacao['documentos'], interacao['resposta'], modelo)
+        resumo.append((chave, interacao['query'], interacao['metricas']))
+        if chave not in cache and chave not in pendentes:
+            pendentes[chave] = interacao
+    print(f"📋 {len(resumo)} interações, {len(resumo) - len(pendentes)} já avaliadas em cache, {len(pendentes)} a avaliar.")
+
+    def avaliar(item):
+        chave, interacao = item
+        return chave, avaliar_resposta(interacao['query'], interacao['documentos'], interacao['resposta'], modelo=modelo)
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        for chave, avaliacao in executor.map(avaliar, pendentes.items()):
+            cache[chave] = avaliacao
+            if not avaliacao.get("falhou"):
+                registrar_avaliacao(arquivo_cache, chave, avaliacao)
+
+    avaliacoes = []
+    for chave, query, metricas in resumo:
+        avaliacao = {k: v for k, v in cache[chave].items() if k != "falhou"}
+        avaliacao['query'] = query
+        avaliacao['metricas'] = metricas
+        avaliacoes.append(avaliacao)
+    return avaliacoes
 
 def salvar_avaliacoes(arquivo_csv, avaliacoes):
     """Salva as avaliações no arquivo CSV."""
@@ -74,22 +169,22 @@ def salvar_avaliacoes(arquivo_csv, avaliacoes):
                 av.get('grounding', 'N/A'),
                 av.get('retrieval', 'N/A'),
                 av.get('relevance', 'N/A'),
-                av['metricas']['precision_at_k'],
-                av['metricas']['recall_at_k'],
+                # Interações anteriores gravavam "precision" e "recall"
+                av['metricas'].get('precision_at_k', av['metricas'].get('precision')),
+                av['metricas'].get('recall_at_k', av['metricas'].get('recall')),
                 av['metricas']['f1_score'],
                 av['metricas']['average_precision'],
             ])
 
 def main():
-    interacoes = carregar_interacoes('interacoes.json')  # Substitua pelo nome correto do seu arquivo
-    avaliacoes = []
-    
-    for interacao in interacoes:
-        avaliacao = avaliar_resposta(interacao['query'], interacao['documentos'], interacao['resposta'])
-        avaliacao['query'] = interacao['query']
-        avaliacao['metricas'] = interacao['metricas']
-        avaliacoes.append(avaliacao)
-    
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concorrencia", type=int, default=4, help="Avaliações simultâneas no Ollama.")
+    parser.add_argument("--modelo", default=MODELO_AVALIADOR, help="Modelo avaliador.")
+    args = parser.parse_args()
+
+    interacoes = carregar_interacoes(INTERACOES_PATH)
+    avaliacoes = avaliar_interacoes(interacoes, concorrencia=args.concorrencia, modelo=args.modelo)
+
     salvar_avaliacoes('avaliacoes.csv', avaliacoes)
     print("Avaliação concluída e salva em avaliacoes.csv")
 
@@ -0,0 +1,270 @@
+import json
+import os
+import time
+from collections import Counter
+import pandas as pd
+from processamento_de_dados import (
+    CLASSIFICADOR_MODULOS,
+    carregar_csv,
+    converter_numeros,
+    exportar_contexto,
+    estatisticas_por_release,
+    extrair_releases,
+    textos_da_coluna,
+)
+from grafo_defeitos import analisar_grafo
+from topicos import carregar_resumo_topicos
+from series_temporais import COLUNAS_RESOLUCAO, analisar_series, converter_datas, derivar_release, derivar_sprint, tempo_resolucao
+
+# Pasta com o estado agregado persistido entre execuções
+ESTADO_ANALITICO_PATH = "estado_analitico"
+
+# Subpasta com os lotes da tabela de linhas (um por execução) e quantidade de lotes a
+# partir da qual a tabela é compactada em um só
+PASTA_LOTES = "lotes"
+MAX_LOTES = 32
+
+# Colunas que, se alteradas, mudam a contribuição de uma linha para as análises
+COLUNAS_ANALISADAS = ["Summary", "Epic Link", "Status", "Reporter", "Created", "Sprint", "Linked Issues", *COLUNAS_RESOLUCAO]
+
+# Contadores mesclados entre execuções e a coluna da tabela de linhas que alimenta cada um
+CONTADORES = {
+    "contagem_epic_link": "epic_link",
+    "contagem_bugs_release": "release",
+    "categorias_status": "status",
+    "categorias_reporter": "reporter",
+    "por_dia": "dia",
+    "bugs_por_modulo": "modulo",
+    "por_sprint": "sprint",
+}
+
+# Colunas da tabela de linhas usadas para remontar o grafo de defeitos
+COLUNAS_GRAFO_LINHAS = {"chave": "key", "vinculos": "linked_issues", "epic": "epic_link", "modulo": "modulo", "sprint": "sprint"}
+
+def hashes_das_linhas(df):
+    """
+    Retorna o hash das colunas analisadas de cada linha, indexado pelo identificador da linha.
+
+    O identificador é a Key, com um sufixo para distinguir Keys repetidas.
+    """
+    chaves = df["Key"].astype(str) if "Key" in df.columns else pd.Series(df.index.astype(str), index=df.index)
+    ids = chaves + "#" + chaves.groupby(chaves).cumcount().astype(str)
+    colunas = [coluna for coluna in COLUNAS_ANALISADAS if coluna in df.columns]
+    hashes = pd.util.hash_pandas_object(df[colunas].astype(object), index=False).to_numpy()
+    return pd.Series(hashes, index=ids.to_numpy())
+
+def tabela_de_linhas(df, hashes):
+    """
+    Resume cada linha do CSV nos valores usados pelas análises, indexada como `hashes`.
+    """
+    vazio = pd.Series(None, index=df.index, dtype=object)
+
+    summaries = textos_da_coluna(df, "Summary")
+    datas = converter_datas(df["Created"]) if "Created" in df.columns else pd.Series(pd.NaT, index=df.index)
+
+    tabela = pd.DataFrame({
+        "hash": hashes.to_numpy(),
+        "key": df["Key"] if "Key" in df.columns else vazio,
+        "linked_issues": df["Linked Issues"] if "Linked Issues" in df.columns else vazio,
+        "summary": df["Summary"] if "Summary" in df.columns else vazio,
+        "epic_link": df["Epic Link"] if "Epic Link" in df.columns else vazio,
+        "status": df["Status"] if "Status" in df.columns else vazio,
+        "reporter": df["Reporter"] if "Reporter" in df.columns else vazio,
+        "sprint": df["Sprint"] if "Sprint" in df.columns else vazio,
+        "release": extrair_releases(summaries).reindex(df.index),
+        "dia": datas.dt.strftime("%Y-%m-%d").where(datas.notna(), None),
+        "modulo": CLASSIFICADOR_MODULOS.classificar_serie(df["Summary"]) if "Summary" in df.columns else "Outros",
+        "resolucao": tempo_resolucao(df),
+    }, index=df.index)
+    tabela.index = hashes.index
+    return tabela
+
+def contribuicoes(tabela):
+    """
+    Calcula os contadores produzidos por um conjunto de linhas.
+    """
+    resultado = {nome: Counter(tabela[coluna].value_counts().to_dict()) for nome, coluna in CONTADORES.items()}
+    resultado["contagem_total_bugs"] = Counter({"total": len(tabela)})
+    return resultado
+
+def carregar_estado(pasta=ESTADO_ANALITICO_PATH):
+    """
+    Carrega os contadores agregados e remonta a tabela de linhas a partir dos lotes gravados.
+
+    Cada lote traz as linhas que entraram em uma execução e os identificadores que saíram
+    (removidos ou alterados), aplicados em ordem. Estados antigos com linhas.pkl continuam
+    sendo lidos.
+    """
+    caminho_agregados = os.path.join(pasta, "agregados.json")
+    manifesto = _ler_manifesto(pasta)
+    caminho_legado = os.path.join(pasta, "linhas.pkl")
+    if not os.path.exists(caminho_agregados) or (manifesto is None and not os.path.exists(caminho_legado)):
+        return None, None
+    with open(caminho_agregados, 'r', encoding='utf-8') as f:
+        agregados = {nome: Counter(contagem) for nome, contagem in json.load(f).items()}
+    if manifesto is None:
+        return agregados, pd.read_pickle(caminho_legado)
+
+    partes = []
+    for nome in manifesto["lotes"]:
+        lote = pd.read_pickle(os.path.join(pasta, PASTA_LOTES, nome))
+        if lote["removidos"]:
+            partes = [parte.drop(index=lote["removidos"], errors='ignore') for parte in partes]
+        partes.append(lote["linhas"])
+    return agregados, pd.concat(partes) if len(partes) > 1 else partes[0]
+
+def salvar_estado(agregados, linhas, entrada, removidos, pasta=ESTADO_ANALITICO_PATH):
+    """
+    Persiste os contadores agregados e acrescenta o delta da execução (`entrada` e os
+    identificadores `removidos`) como um novo lote da tabela de linhas, sem regravar o
+    histórico. Quando há mais de MAX_LOTES lotes ou as linhas descartadas superam as
+    vivas, a tabela inteira (`linhas`) é compactada em um lote só.
+    """
+    pasta_lotes = os.path.join(pasta, PASTA_LOTES)
+    os.makedirs(pasta_lotes, exist_ok=True)
+    manifesto = _ler_manifesto(pasta)
+    compactar = (manifesto is None or len(manifesto["lotes"]) >= MAX_LOTES
+                 or manifesto["descartadas"] + len(removidos) > len(linhas))
+
+    antigos = []
+    if compactar:
+        antigos = manifesto["lotes"] if manifesto is not None else []
+        manifesto = {"lotes": [], "descartadas": 0}
+        entrada, removidos = linhas, []
+    if compactar or len(entrada) or len(removidos):
+        numeros = [int(nome.split("_")[1].split(".")[0]) for nome in manifesto["lotes"] + antigos]
+        nome = f"lote_{max(numeros, default=-1) + 1:05d}.pkl"
+        pd.to_pickle({"linhas": entrada, "removidos": list(removidos)}, os.path.join(pasta_lotes, nome))
+        manifesto["lotes"].append(nome)
+        manifesto["descartadas"] += len(removidos)
+
+    _gravar_json(os.path.join(pasta, "agregados.json"), agregados)
+    _gravar_json(os.path.join(pasta, "lotes.json"), manifesto)
+    for antigo in antigos:
+        os.remove(os.path.join(pasta_lotes, antigo))
+    if compactar and os.path.exists(os.path.join(pasta, "linhas.pkl")):
+        os.remove(os.path.join(pasta, "linhas.pkl"))
+
+def _ler_manifesto(pasta):
+    caminho = os.path.join(pasta, "lotes.json")
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _gravar_json(caminho, dados):
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, default=converter_numeros)
+    os.replace(temporario, caminho)
+
+def calcular_janelas(linhas, dias=30, sprints=3):
+    """
+    Resume os bugs dos últimos `dias` (a partir da data mais recente) e das últimas `sprints` sprints.
+    """
+    janelas = {}
+
+    datas = pd.to_datetime(linhas["dia"], format="%Y-%m-%d", errors='coerce')
+    if datas.notna().any():
+        inicio = datas.max() - pd.Timedelta(days=dias - 1)
+        janelas[f"ultimos_{dias}_dias"] = _resumo_janela(linhas[datas >= inicio])
+
+    numeros = pd.to_numeric(linhas["sprint"].astype(str).str.extract(r"(?P<numero>\d+)\D*$", expand=False), errors='coerce')
+    if numeros.notna().any():
+        ultimas = sorted(numeros.dropna().unique())[-sprints:]
+        janelas[f"ultimas_{sprints}_sprints"] = _resumo_janela(linhas[numeros.isin(ultimas)])
+        janelas[f"ultimas_{sprints}_sprints"]["sprints"] = [int(numero) for numero in ultimas]
+
+    return janelas
+
+def _resumo_janela(linhas):
+    return {
+        "total_bugs": len(linhas),
+        "bugs_por_modulo": linhas["modulo"].value_counts().to_dict(),
+        "categorias_status": linhas["status"].value_counts().to_dict(),
+        "contagem_epic_link": linhas["epic_link"].value_counts().to_dict(),
+    }
+
+def _ordenar(contagem):
+    return dict(sorted(contagem.items(), key=lambda item: item[1], reverse=True))
+
+def atualizar_contexto_incremental(caminho_csv, exportar_json=False, pasta_estado=ESTADO_ANALITICO_PATH,
+                                   janela_dias=30, janela_sprints=3):
+    """
+    Atualiza o contexto analítico processando apenas as linhas novas, alteradas ou removidas
+    desde a última execução, e acrescenta as janelas móveis em "janelas".
+    """
+    inicio = time.perf_counter()
+    df = carregar_csv(caminho_csv)
+    if df is None:
+        return None
+
+    agregados, linhas = carregar_estado(pasta_estado)
+    if agregados is not None:
+        # A contagem de palavras deu lugar aos tópicos (topicos.py)
+        agregados.pop("contagem_palavras", None)
+    if linhas is None:
+        agregados = {nome: Counter() for nome in [*CONTADORES, "contagem_total_bugs"]}
+        linhas = pd.DataFrame(columns=["hash", "key", "linked_issues", "summary", *CONTADORES.values()])
+
+    # Apenas o hash é calculado para todas as linhas; as análises rodam sobre o delta.
+    hashes = hashes_das_linhas(df)
+    ids = hashes.index
+
+    anteriores = linhas["hash"].reindex(ids)
+    alteradas = anteriores.notna().to_numpy() & (anteriores.to_numpy() != hashes.to_numpy())
+    novas = anteriores.isna().to_numpy()
+    removidas = linhas.index.difference(ids)
+
+    saida = linhas.loc[linhas.index.intersection(ids[alteradas]).union(removidas)]
+    entrada = tabela_de_linhas(df[novas | alteradas], hashes[novas | alteradas])
+
+    for nome, contagem in contribuicoes(saida).items():
+        agregados[nome].subtract(contagem)
+        agregados[nome] = +agregados[nome]
+    for nome, contagem in contribuicoes(entrada).items():
+        agregados[nome].update(contagem)
+
+    linhas = pd.concat([linhas.drop(index=saida.index), entrada])
+    salvar_estado(agregados, linhas, entrada, saida.index, pasta_estado)
+    print(f"🔄 Delta: {int(novas.sum())} novas, {int(alteradas.sum())} alteradas, {len(removidas)} removidas "
+          f"({time.perf_counter() - inicio:.2f}s)")
+
+    por_dia = dict(sorted(agregados["por_dia"].items()))
+    por_mes = Counter()
+    for dia, contagem in por_dia.items():
+        por_mes[dia[:7]] += contagem
+
+    # Séries temporais e estatísticas por release, vetorizadas sobre a tabela inteira
+    if "resolucao" not in linhas.columns:
+        linhas["resolucao"] = float("nan")
+    releases = derivar_release(linhas["release"].fillna("")).set_axis(linhas.index)
+    sprints = derivar_sprint(linhas["sprint"], linhas["release"]).set_axis(linhas.index)
+    series = analisar_series(linhas["dia"], releases, sprints, linhas["resolucao"])
+    estatisticas_release = estatisticas_por_release(pd.DataFrame({
+        "Release": releases, "Tempo_Resolucao": pd.to_numeric(linhas["resolucao"], errors='coerce'),
+    }))
+
+    # O grafo não é decomponível por linha; é remontado sobre a tabela inteira com operações esparsas
+    grafo = analisar_grafo(linhas, COLUNAS_GRAFO_LINHAS, modulo_padrao=CLASSIFICADOR_MODULOS.padrao)
+
+    contexto_analitico = {
+        "contagem_total_bugs": agregados["contagem_total_bugs"]["total"],
+        "contagem_epic_link": _ordenar(agregados["contagem_epic_link"]),
+        "contagem_bugs_release": dict(agregados["contagem_bugs_release"]),
+        "categorias_status": _ordenar(agregados["categorias_status"]),
+        "categorias_reporter": _ordenar(agregados["categorias_reporter"]),
+        "tendencia_data": {"por_dia": por_dia, "por_mes": dict(por_mes)} if "Created" in df.columns else {},
+        "bugs_por_modulo": _ordenar(agregados["bugs_por_modulo"]),
+        "estatisticas_por_release": estatisticas_release,
+        "series_temporais": series,
+        "janelas": calcular_janelas(linhas, janela_dias, janela_sprints),
+        "grafo_defeitos": grafo,
+        "areas_criticas": grafo["hotspots"]["modulo"],
+        "topicos": carregar_resumo_topicos(),
+    }
+
+    if exportar_json:
+        exportar_contexto(contexto_analitico)
+
+    return contexto_analitico
@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+# Arquivo de interações (um JSON por linha) e arquivo legado gravado por versões anteriores
+INTERACOES_PATH = "interacoes.jsonl"
+INTERACOES_LEGADO_PATH = "interacoes.json"
+
+@contextmanager
+def travar_arquivo(caminho):
+    """
+    Mantém uma trava exclusiva entre processos enquanto o bloco é executado.
+    """
+    with open(caminho + ".lock", 'a+b') as trava:
+        if msvcrt:
+            trava.seek(0)
+            msvcrt.locking(trava.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(trava.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if msvcrt:
+                trava.seek(0)
+                msvcrt.locking(trava.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(trava.fileno(), fcntl.LOCK_UN)
+
+def anexar_interacoes(novas, caminho=INTERACOES_PATH):
+    """
+    Acrescenta interações ao final do arquivo, sem reler o histórico.
+    """
+    linhas = "".join(json.dumps(interacao, ensure_ascii=False) + "\n" for interacao in novas)
+    if not linhas:
+        return
+    with travar_arquivo(caminho):
+        with open(caminho, 'a', encoding='utf-8') as f:
+            f.write(linhas)
+            f.flush()
+            os.fsync(f.fileno())
+
+def ler_interacoes(caminho=INTERACOES_PATH):
+    """
+    Percorre as interações salvas uma a uma, sem carregar o arquivo inteiro.
+    """
+    if not os.path.exists(caminho):
+        return
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+def migrar_interacoes_json(origem=INTERACOES_LEGADO_PATH, destino=INTERACOES_PATH):
+    """
+    Converte o interacoes.json legado (lista JSON) para o formato de uma interação por linha.
+
+    O arquivo de origem é preservado. A migração não é repetida se o destino já existir.
+    """
+    if os.path.exists(destino) and os.path.getsize(destino) > 0:
+        print(f"✅ {destino} já existe; migração ignorada.")
+        return 0
+    with open(origem, 'r', encoding='utf-8') as f:
+        interacoes = json.load(f)
+    anexar_interacoes(interacoes, destino)
+    print(f"✅ {len(interacoes)} interações migradas de {origem} para {destino}.")
+    return len(interacoes)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--origem", default=INTERACOES_LEGADO_PATH, help="Arquivo JSON legado.")
+    parser.add_argument("--destino", default=INTERACOES_PATH, help="Arquivo JSON Lines de destino.")
+    args = parser.parse_args()
+    migrar_interacoes_json(args.origem, args.destino)
@@ -0,0 +1,133 @@
+import json
+import os
+import struct
+import time
+import zlib
+from collections.abc import Mapping
+
+# Artefato binário do contexto analítico, gravado ao lado do JSON
+ARTEFATO_ANALITICO_PATH = "contexto_analitico.bin"
+
+# Cabeçalho: assinatura, versão do formato e tamanho do índice de seções
+ASSINATURA = b"CTXA"
+VERSAO_FORMATO = 1
+CABECALHO = struct.Struct("<4sHI")
+
+# Nível de compressão zlib de cada seção
+NIVEL_COMPRESSAO = 6
+
+def _serializar(valor, conversor=None):
+    return zlib.compress(
+        json.dumps(valor, ensure_ascii=False, separators=(",", ":"), default=conversor).encode("utf-8"),
+        NIVEL_COMPRESSAO,
+    )
+
+def gravar_artefato(contexto, caminho=ARTEFATO_ANALITICO_PATH, conversor=None):
+    """
+    Grava o contexto analítico no formato binário por seções, de forma atômica.
+
+    Cada chave de primeiro nível vira uma seção de JSON compacto comprimido com zlib.
+    O índice no início do arquivo guarda a posição e o tamanho de cada seção, de modo
+    que o leitor acessa só as seções de que precisa. Retorna o tamanho do arquivo.
+    """
+    secoes, indice, posicao = [], {}, 0
+    for nome, valor in contexto.items():
+        dados = _serializar(valor, conversor)
+        indice[nome] = [posicao, len(dados)]
+        secoes.append(dados)
+        posicao += len(dados)
+
+    cabecalho_indice = json.dumps({"gerado_em": time.time(), "secoes": indice}, ensure_ascii=False,
+                                  separators=(",", ":")).encode("utf-8")
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as f:
+        f.write(CABECALHO.pack(ASSINATURA, VERSAO_FORMATO, len(cabecalho_indice)))
+        f.write(cabecalho_indice)
+        for dados in secoes:
+            f.write(dados)
+    os.replace(temporario, caminho)
+    return os.path.getsize(caminho)
+
+def atualizar_secoes(novas, caminho=ARTEFATO_ANALITICO_PATH, conversor=None):
+    """
+    Substitui ou acrescenta seções em um artefato existente. Retorna False se ele não existir.
+    """
+    if not os.path.exists(caminho):
+        return False
+    artefato = ArtefatoAnalitico(caminho)
+    contexto = {nome: artefato[nome] for nome in artefato}
+    contexto.update(novas)
+    gravar_artefato(contexto, caminho, conversor)
+    return True
+
+class ArtefatoAnalitico(Mapping):
+    """
+    Leitura preguiçosa do artefato analítico: um dicionário somente leitura cujas
+    seções são lidas e descomprimidas apenas no primeiro acesso.
+
+    Ao abrir, só o cabeçalho e o índice são lidos. Cada seção é lida com seek no
+    intervalo indicado pelo índice, sem manter o arquivo aberto (no Windows, isso
+    impediria a regravação pelo processamento). Se o arquivo for regravado, o índice
+    e as seções em memória são descartados no próximo acesso.
+    """
+
+    def __init__(self, caminho=ARTEFATO_ANALITICO_PATH):
+        self.caminho = caminho
+        self._abrir()
+
+    def _abrir(self):
+        with open(self.caminho, 'rb') as f:
+            assinatura, versao, tamanho_indice = CABECALHO.unpack(f.read(CABECALHO.size))
+            if assinatura != ASSINATURA:
+                raise ValueError(f"{self.caminho} não é um artefato analítico.")
+            if versao != VERSAO_FORMATO:
+                raise ValueError(f"Versão {versao} do artefato analítico não suportada (esperada {VERSAO_FORMATO}). "
+                                 "Gere-o novamente com processamento_de_dados.py.")
+            indice = json.loads(f.read(tamanho_indice).decode("utf-8"))
+        self._inicio_dados = CABECALHO.size + tamanho_indice
+        self._secoes = indice["secoes"]
+        self.gerado_em = indice.get("gerado_em")
+        self._mtime = os.path.getmtime(self.caminho)
+        self._carregadas = {}
+
+    def _verificar(self):
+        if os.path.getmtime(self.caminho) != self._mtime:
+            self._abrir()
+
+    def __getitem__(self, nome):
+        self._verificar()
+        if nome not in self._carregadas:
+            posicao, tamanho = self._secoes[nome]
+            with open(self.caminho, 'rb') as f:
+                f.seek(self._inicio_dados + posicao)
+                self._carregadas[nome] = json.loads(zlib.decompress(f.read(tamanho)).decode("utf-8"))
+        return self._carregadas[nome]
+
+    def __iter__(self):
+        return iter(self._secoes)
+
+    def __len__(self):
+        return len(self._secoes)
+
+    def __contains__(self, nome):
+        return nome in self._secoes
+
+    def secoes_carregadas(self):
+        """
+        Retorna os nomes das seções já lidas do disco.
+        """
+        return list(self._carregadas)
+
+def abrir_contexto_analitico(caminho_json, caminho_artefato=ARTEFATO_ANALITICO_PATH):
+    """
+    Abre o contexto analítico: o artefato binário, se existir e não for mais antigo que
+    o JSON; caso contrário, o JSON inteiro.
+    """
+    if os.path.exists(caminho_artefato) and (
+        not os.path.exists(caminho_json) or os.path.getmtime(caminho_artefato) >= os.path.getmtime(caminho_json)
+    ):
+        return ArtefatoAnalitico(caminho_artefato)
+    print(f"⚠️ Artefato analítico ausente ou desatualizado; lendo {caminho_json} inteiro. "
+          "Gere-o com processamento_de_dados.py.")
+    with open(caminho_json, 'r', encoding='utf-8') as f:
+        return json.load(f)
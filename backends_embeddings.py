@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+from itertools import islice
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Configuração do backend de embeddings, ao lado do módulo
+EMBEDDINGS_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embeddings.json")
+
+# Valores usados para as chaves ausentes no arquivo de configuração
+CONFIGURACAO_PADRAO = {
+    "modelo": "BAAI/bge-large-en-v1.5",
+    "backend": "torch",            # "torch" ou "onnx"
+    "quantizacao": None,           # None ou "int8"
+    "arquivo_onnx": None,          # arquivo .onnx dentro do repositório do modelo (ex.: "onnx/model_qint8_avx512_vnni.onnx")
+    "batch_size": 32,
+    "threads": None,
+    "normalizar": False,
+    "dimensao": None,              # dimensão final; None mantém a do modelo
+    "reducao": None,               # None, "matryoshka" (truncamento) ou "pca"
+    "arquivo_pca": None,           # projeção PCA gerada por ajustar_pca (.npz)
+    "prefixo_documento": "",       # ex.: "passage: " para modelos E5
+    "prefixo_consulta": "",        # ex.: "query: " para modelos E5
+}
+
+# Campos que determinam os vetores gerados; uma coleção só pode ser consultada com a mesma assinatura
+CAMPOS_ASSINATURA = ["modelo", "backend", "quantizacao", "arquivo_onnx", "normalizar", "dimensao", "reducao",
+                     "prefixo_documento", "prefixo_consulta"]
+
+def carregar_configuracao(caminho=EMBEDDINGS_CONFIG_PATH):
+    """
+    Lê a configuração do backend de embeddings, completando com CONFIGURACAO_PADRAO.
+    """
+    configuracao = dict(CONFIGURACAO_PADRAO)
+    if caminho and os.path.exists(caminho):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            configuracao.update(json.load(f))
+    return configuracao
+
+def assinatura(configuracao):
+    """
+    Retorna os campos da configuração que definem o espaço vetorial da coleção.
+    """
+    return {campo: configuracao.get(campo) for campo in CAMPOS_ASSINATURA}
+
+def construir_embeddings(configuracao):
+    """
+    Carrega o modelo conforme a configuração (backend, quantização, batch e threads)
+    e o envolve com os prefixos e a redução de dimensionalidade configurados.
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    if configuracao["threads"]:
+        os.environ["OMP_NUM_THREADS"] = str(configuracao["threads"])
+        try:
+            import torch
+            torch.set_num_threads(configuracao["threads"])
+        except ImportError:
+            pass
+
+    model_kwargs = {}
+    if configuracao["backend"] == "onnx":
+        model_kwargs["backend"] = "onnx"
+        arquivo = configuracao["arquivo_onnx"]
+        if arquivo is None and configuracao["quantizacao"] == "int8":
+            arquivo = "onnx/model_qint8_avx512_vnni.onnx"
+        if arquivo:
+            model_kwargs["model_kwargs"] = {"file_name": arquivo, "provider": "CPUExecutionProvider"}
+
+    base = HuggingFaceEmbeddings(
+        model_name=configuracao["modelo"],
+        model_kwargs=model_kwargs,
+        encode_kwargs={"batch_size": configuracao["batch_size"], "normalize_embeddings": configuracao["normalizar"]},
+    )
+
+    if configuracao["backend"] == "torch" and configuracao["quantizacao"] == "int8":
+        # Quantização dinâmica das camadas lineares para inferência em CPU
+        import torch
+        base._client = torch.quantization.quantize_dynamic(base._client, {torch.nn.Linear}, dtype=torch.qint8)
+
+    return EmbeddingsConfiguradas(
+        base,
+        prefixo_documento=configuracao["prefixo_documento"],
+        prefixo_consulta=configuracao["prefixo_consulta"],
+        dimensao=configuracao["dimensao"],
+        reducao=configuracao["reducao"],
+        arquivo_pca=configuracao["arquivo_pca"],
+    )
+
+class EmbeddingsConfiguradas(Embeddings):
+    """
+    Aplica os prefixos de documento/consulta e reduz a dimensionalidade dos vetores.
+
+    Com reducao="matryoshka", os vetores são truncados nas primeiras `dimensao`
+    coordenadas e renormalizados (adequado a modelos treinados com Matryoshka). Com
+    reducao="pca", são projetados com a média e os componentes salvos por ajustar_pca.
+    """
+
+    def __init__(self, embeddings, prefixo_documento="", prefixo_consulta="", dimensao=None, reducao=None,
+                 arquivo_pca=None):
+        self.embeddings = embeddings
+        self.prefixo_documento = prefixo_documento
+        self.prefixo_consulta = prefixo_consulta
+        self.dimensao = dimensao
+        self.reducao = reducao if dimensao else None
+        self.media = self.componentes = None
+        if self.reducao == "pca":
+            if not arquivo_pca or not os.path.exists(arquivo_pca):
+                raise ValueError("A redução PCA requer 'arquivo_pca' gerado por ajustar_pca.")
+            with np.load(arquivo_pca) as pca:
+                self.media, self.componentes = pca["media"], pca["componentes"][:dimensao]
+        elif self.reducao not in (None, "matryoshka"):
+            raise ValueError(f"Redução desconhecida: {self.reducao}")
+
+    def embed_documents(self, texts):
+        vetores = self.embeddings.embed_documents([self.prefixo_documento + texto for texto in texts])
+        return self._reduzir(vetores)
+
+    def embed_query(self, text):
+        return self._reduzir([self.embeddings.embed_query(self.prefixo_consulta + text)])[0]
+
+    def embed_queries(self, texts):
+        """
+        Calcula os vetores de várias consultas em uma única chamada, com o prefixo de consulta.
+        """
+        vetores = self.embeddings.embed_documents([self.prefixo_consulta + texto for texto in texts])
+        return self._reduzir(vetores)
+
+    def _reduzir(self, vetores):
+        if self.reducao is None:
+            return vetores
+        matriz = np.asarray(vetores, dtype=np.float32)
+        if self.reducao == "matryoshka":
+            matriz = matriz[:, :self.dimensao]
+        else:
+            matriz = (matriz - self.media) @ self.componentes.T
+        normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+        return (matriz / np.where(normas > 0, normas, 1)).tolist()
+
+def ajustar_pca(configuracao, textos, caminho):
+    """
+    Ajusta a projeção PCA sobre os embeddings completos de uma amostra de textos e a salva em .npz.
+    """
+    completa = dict(configuracao, dimensao=None, reducao=None)
+    vetores = np.asarray(construir_embeddings(completa).embed_documents(list(textos)), dtype=np.float32)
+    media = vetores.mean(axis=0)
+    _, valores_singulares, componentes = np.linalg.svd(vetores - media, full_matrices=False)
+    np.savez(caminho, media=media, componentes=componentes.astype(np.float32))
+    variancia = valores_singulares ** 2 / np.sum(valores_singulares ** 2)
+    if configuracao["dimensao"]:
+        print(f"📐 PCA com {configuracao['dimensao']} componentes retém "
+              f"{variancia[:configuracao['dimensao']].sum():.1%} da variância.")
+    return caminho
+
+def caminho_assinatura(chroma_path):
+    """
+    Retorna o caminho do arquivo que registra o modelo e a dimensão de uma coleção Chroma.
+    """
+    return os.path.join(chroma_path, "embeddings_colecao.json")
+
+def verificar_assinatura(chroma_path, embedding_function, registrar=False):
+    """
+    Compara o modelo/dimensão da função de embeddings com os registrados na coleção.
+
+    Lança ValueError em caso de divergência. Com registrar=True (ingestão), grava a
+    assinatura quando a coleção ainda não tem uma.
+    """
+    atual = dict(getattr(embedding_function, "assinatura", None) or {})
+    atual["dimensao_vetor"] = len(embedding_function.embed_query("dimensão"))
+
+    caminho = caminho_assinatura(chroma_path)
+    if not os.path.exists(caminho):
+        if registrar:
+            os.makedirs(chroma_path, exist_ok=True)
+            with open(caminho, 'w', encoding='utf-8') as f:
+                json.dump(atual, f, ensure_ascii=False, indent=4)
+        else:
+            print("⚠️ A coleção não registra o modelo de embeddings que a construiu.")
+        return atual
+
+    with open(caminho, 'r', encoding='utf-8') as f:
+        registrada = json.load(f)
+    divergentes = {campo for campo in set(registrada) | set(atual) if registrada.get(campo) != atual.get(campo)}
+    if divergentes:
+        detalhes = ", ".join(f"{campo}: coleção={registrada.get(campo)!r}, atual={atual.get(campo)!r}" for campo in sorted(divergentes))
+        raise ValueError(f"Embeddings incompatíveis com a coleção em {chroma_path} ({detalhes}). "
+                         "Use a mesma configuração ou recrie a coleção com --reset.")
+    return atual
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ajustar-pca", metavar="CSV", help="Ajustar a projeção PCA com os primeiros documentos do CSV.")
+    parser.add_argument("--amostra", type=int, default=5000, help="Linhas usadas no ajuste do PCA.")
+    parser.add_argument("--configuracao", default=EMBEDDINGS_CONFIG_PATH, help="Arquivo de configuração dos embeddings.")
+    args = parser.parse_args()
+
+    if args.ajustar_pca:
+        configuracao = carregar_configuracao(args.configuracao)
+        if not configuracao["arquivo_pca"]:
+            parser.error("Defina 'arquivo_pca' na configuração.")
+        # A amostra usa o mesmo page_content da ingestão
+        from populate_database import load_documents_from_csv
+        amostra = [documento.page_content for documento in islice(load_documents_from_csv(args.ajustar_pca), args.amostra)]
+        print(f"✅ Projeção salva em {ajustar_pca(configuracao, amostra, configuracao['arquivo_pca'])}")
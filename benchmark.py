@@ -0,0 +1,376 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from langchain.schema import Document
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+from populate_database import (BATCH_SIZE, CSV_CHUNKSIZE, CSV_COLUMNS, documentos_do_bloco, embutir_lotes, gerar_lotes,
+                               gravar_lote, load_documents_from_csv)
+from processamento_de_dados import exportar_contexto, preprocessar_dados
+from indice_bm25 import IndiceBM25, caminho_bm25, tokenizar
+from indice_metadados import IndiceMetadados, caminho_indice
+from indice_quantizado import IndiceQuantizado, caminho_quantizado
+from cache_recuperacao import CACHE_RECUPERACAO_PATH, CacheRecuperacao
+from query_data import SessaoConsulta, ground_truth
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Tamanhos padrão das exportações sintéticas e pasta dos resultados em JSON
+LINHAS_BENCHMARK = [10_000, 100_000, 1_000_000]
+RESULTADOS_BENCHMARK_PATH = "resultados_benchmark"
+
+# Dimensão e número de buckets de termos das embeddings sintéticas
+DIMENSAO_SINTETICA = 384
+BUCKETS_SINTETICOS = 4096
+
+# Vocabulário usado para gerar exportações sintéticas no esquema do jirabugs.csv
+MODULOS_SINTETICOS = ["CTO", "Splitter", "DIO", "cabo", "OLT", "MAC", "Uplink", "mapa", "KMZ", "endereço", "ONU", "CEO"]
+ACOES_SINTETICAS = ["Instanciar", "Excluir", "Editar", "Copiar", "Mover", "Conectar", "Importar", "Salvar"]
+FALHAS_SINTETICAS = [
+    "Sistema não permite a operação",
+    "Erro desconhecido ao salvar",
+    "Dados não são atualizados após recarregar página",
+    "Campo Coordenadas não pode ser editado",
+    "Menu de opções permanece aberto",
+]
+RELEASES_SINTETICAS = ["v1.5.0-rc3", "v1.6.0-sp33.0", "v1.6.0-sp34.4", "v1.6.0-sp35.3", "Bloqueado", None]
+STATUS_SINTETICOS = ["Done", "To Do", "Bloqueado", "In Progress", "Code review"]
+REPORTERS_SINTETICOS = ["Ismayle Santos", "Bruno Sabóia", "Érica Miranda de Sousa", "Gustavo Mendes de Oliveira"]
+EPICOS_SINTETICOS = ["BR-25", "BR-27", "BR-28", "BR-30", "BR-32", "BR-33", "BR-1036", "BR-1178", None]
+
+def gerar_csv_sintetico(caminho_csv, linhas, semente=42):
+    """
+    Gera uma exportação sintética do Jira com as colunas do jirabugs.csv.
+    """
+    rng = np.random.default_rng(semente)
+
+    def escolher(opcoes):
+        return np.array(opcoes, dtype=object)[rng.integers(0, len(opcoes), linhas)]
+
+    releases = escolher(RELEASES_SINTETICAS)
+    prefixos = np.where(pd.isna(releases), "", "[" + releases.astype(str) + "] ")
+    summaries = (
+        pd.Series(prefixos) + pd.Series(escolher(ACOES_SINTETICAS)) + " " + pd.Series(escolher(MODULOS_SINTETICOS))
+        + " - " + pd.Series(escolher(FALHAS_SINTETICAS))
+    )
+    chaves = np.arange(1, linhas + 1)
+    vinculos = np.where(rng.random(linhas) < 0.2, "BR-" + pd.Series(rng.integers(1, linhas + 1, linhas)).astype(str), None)
+    criados = pd.Timestamp("2018-11-01") + pd.to_timedelta(rng.integers(0, 1000 * 24 * 60, linhas), unit="min")
+
+    df = pd.DataFrame({
+        "Summary": summaries,
+        "Key": "BR-" + pd.Series(chaves).astype(str),
+        "Status": escolher(STATUS_SINTETICOS),
+        "Created": criados.strftime("%Y-%m-%d %H:%M"),
+        "Linked Issues": vinculos,
+        "Development": None,
+        "Epic Link": escolher(EPICOS_SINTETICOS),
+        "Reporter": escolher(REPORTERS_SINTETICOS),
+        "Epic Name": None,
+        "Sprint": "Sprint " + pd.Series(rng.integers(1, 40, linhas)).astype(str),
+    })
+    df.to_csv(caminho_csv, index=False)
+    return caminho_csv
+
+def carregar_documentos_iterrows(caminho_csv):
+    """
+    Carregador original (DataFrame inteiro + iterrows), mantido como referência.
+    """
+    df = pd.read_csv(caminho_csv)
+
+    documents = []
+    for _, row in df.iterrows():
+        content = f"Summary: {row['Summary'] if pd.notna(row['Summary']) else 'No summary available'}\n" \
+                  f"Epic Link: {row['Epic Link'] if pd.notna(row['Epic Link']) else 'No Epic Link available'}\n" \
+                  f"Reporter: {row['Reporter'] if pd.notna(row['Reporter']) else 'No reporter found'}"
+
+        metadata = {
+            "id": row["Key"],
+            "status": row["Status"] if "Status" in df.columns else "Unknown",
+            "created": row["Created"] if "Created" in df.columns else "Unknown",
+            "linked_issues": row["Linked Issues"] if "Linked Issues" in df.columns else "None",
+            "development": row["Development"] if "Development" in df.columns else "None",
+            "epic_link": row["Epic Link"] if "Epic Link" in df.columns else "None",
+            "reporter": row["Reporter"] if "Reporter" in df.columns else "Unknown",
+            "epic_name": row["Epic Name"] if "Epic Name" in df.columns else "Unknown",
+            "sprint": row["Sprint"] if "Sprint" in df.columns else "None",
+        }
+        documents.append(Document(page_content=content, metadata=metadata))
+    return documents
+
+def medir(funcao, *args):
+    """
+    Executa a função e retorna (resultado, segundos, pico de memória em MB).
+    """
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    decorrido = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, decorrido, pico / 1024 / 1024
+
+def comparar_carregadores(linhas):
+    """
+    Compara o carregador original com o carregador em blocos em uma exportação sintética.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_csv = gerar_csv_sintetico(os.path.join(pasta, "jirabugs_sintetico.csv"), linhas)
+
+        # O carregador em blocos é consumido como na ingestão, sem acumular a lista.
+        total, tempo_stream, pico_stream = medir(lambda c: sum(1 for _ in load_documents_from_csv(c)), caminho_csv)
+        documentos, tempo_iterrows, pico_iterrows = medir(carregar_documentos_iterrows, caminho_csv)
+
+    print(f"📊 {linhas} linhas")
+    print(f"   iterrows: {tempo_iterrows:.1f}s, {len(documentos) / tempo_iterrows:.0f} docs/s, pico {pico_iterrows:.0f} MB")
+    print(f"   em blocos: {tempo_stream:.1f}s, {total / tempo_stream:.0f} docs/s, pico {pico_stream:.0f} MB")
+    print(f"   ganho: {tempo_iterrows / tempo_stream:.1f}x mais rápido, {pico_iterrows / pico_stream:.1f}x menos memória")
+
+class EmbeddingsSinteticas(Embeddings):
+    """
+    Embeddings determinísticas e baratas para medir o pipeline sem o modelo real.
+
+    Cada termo cai em um bucket (CRC32) associado a um vetor aleatório fixo; o vetor
+    do texto é a soma normalizada dos vetores de seus termos.
+    """
+
+    def __init__(self, dimensao=DIMENSAO_SINTETICA, buckets=BUCKETS_SINTETICOS, semente=42):
+        self.tabela = np.random.default_rng(semente).standard_normal((buckets, dimensao)).astype(np.float32)
+
+    def embed_documents(self, texts):
+        vetores = np.zeros((len(texts), self.tabela.shape[1]), dtype=np.float32)
+        for i, texto in enumerate(texts):
+            buckets = [zlib.crc32(termo.encode("utf-8")) % len(self.tabela) for termo in tokenizar(texto)]
+            if buckets:
+                vetores[i] = self.tabela[buckets].sum(axis=0)
+        normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+        return (vetores / np.where(normas > 0, normas, 1)).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts):
+        return self.embed_documents(texts)
+
+class LLMStub:
+    """
+    LLM local de teste: devolve uma resposta fixa em streaming, com atraso opcional por token.
+    """
+
+    def __init__(self, tokens=60, atraso_token=0.0):
+        self.tokens = tokens
+        self.atraso_token = atraso_token
+
+    def stream(self, prompt):
+        for i in range(self.tokens):
+            if self.atraso_token:
+                time.sleep(self.atraso_token)
+            yield "Resposta: stub " if i == 0 else f"t{i} "
+
+    def invoke(self, prompt):
+        return "".join(self.stream(prompt))
+
+def pico_rss_mb():
+    """
+    Retorna o pico de memória residente do processo em MB (None onde não há o módulo resource).
+
+    É o máximo desde o início do processo, inclusive de execuções anteriores nele.
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS, em bytes
+    return pico / 1024 / 1024 if platform.system() == "Darwin" else pico / 1024
+
+def resumir_amostras(amostras):
+    """
+    Resume as durações de uma etapa: quantidade, total, média e percentis p50/p95/p99 (segundos).
+    """
+    valores = np.asarray(amostras, dtype=float)
+    if not len(valores):
+        return {"amostras": 0}
+    p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+    return {
+        "amostras": len(valores),
+        "total": float(valores.sum()),
+        "media": float(valores.mean()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+    }
+
+def executar_benchmark(linhas, embeddings="sintetico", consultas=50, batch_size=BATCH_SIZE, repeticoes_analise=1,
+                       atraso_token=0.0, semente=42, quantizacao=None, cache_recuperacao=False):
+    """
+    Gera uma exportação sintética e mede cada etapa do pipeline separadamente.
+
+    Etapas: leitura do CSV (por bloco); embedding, com as impressões digitais, e
+    inserção no Chroma (por lote), pelas mesmas funções de add_to_chroma; índice BM25;
+    análises (preprocessar_dados); embedding da pergunta, busca e geração com um LLM
+    stub (por pergunta). A busca é a de SessaoConsulta.buscar (com o próprio embedding
+    da pergunta), usando o índice de metadados, o índice quantizado quando `quantizacao`
+    é informado e o cache de recuperação com cache_recuperacao=True. Retorna um dicionário com o resumo de
+    cada etapa e o pico de RSS do processo ao final. O pico (ru_maxrss) só cresce ao
+    longo do processo, por isso não é atribuído a etapas; a memória de cada
+    carregador é medida à parte, com tracemalloc, em comparar_carregadores.
+    """
+    funcao_embeddings = EmbeddingsSinteticas() if embeddings == "sintetico" else None
+    if funcao_embeddings is None:
+        from get_embeddings_function import get_embedding_function
+        funcao_embeddings = get_embedding_function(usar_cache=False)
+
+    amostras = {etapa: [] for etapa in [
+        "leitura_csv", "embedding", "insercao_chroma", "indice_bm25", "analises",
+        "embedding_pergunta", "busca", "geracao",
+    ]}
+
+    def medir_vez(etapa, funcao, *args):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        amostras[etapa].append(time.perf_counter() - inicio)
+        return resultado
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_csv = gerar_csv_sintetico(os.path.join(pasta, "jirabugs_sintetico.csv"), linhas, semente)
+        chroma_path = os.path.join(pasta, "chroma_db")
+        db = Chroma(persist_directory=chroma_path, embedding_function=funcao_embeddings)
+        bm25 = IndiceBM25(caminho_bm25(chroma_path))
+        indice = IndiceMetadados()
+        quantizado = IndiceQuantizado(caminho_quantizado(chroma_path), quantizacao) if quantizacao else None
+        existentes = {}
+
+        # Ingestão: leitura em blocos, embeddings e inserção em lotes
+        leitor = pd.read_csv(caminho_csv, chunksize=CSV_CHUNKSIZE, usecols=lambda coluna: coluna in CSV_COLUMNS)
+        while True:
+            bloco = medir_vez("leitura_csv", lambda: next(leitor, None))
+            if bloco is None:
+                amostras["leitura_csv"].pop()
+                break
+            # Mesmo caminho de add_to_chroma: impressões digitais e lotes, embeddings e upsert
+            lotes = embutir_lotes(gerar_lotes(documentos_do_bloco(bloco), batch_size, existentes), funcao_embeddings)
+            while True:
+                item = medir_vez("embedding", next, lotes, None)
+                if item is None:
+                    amostras["embedding"].pop()
+                    break
+                _, lote, vetores, _ = item
+                if lote:
+                    medir_vez("insercao_chroma", gravar_lote, db, lote, vetores)
+                    indice.adicionar(lote)
+                    bm25.adicionar(lote)
+                    if quantizado is not None:
+                        quantizado.adicionar([doc.metadata["id"] for doc in lote], vetores)
+                        quantizado.salvar(manifesto=False)
+        medir_vez("indice_bm25", bm25.salvar)
+        indice.salvar(caminho_indice(chroma_path))
+        if quantizado is not None:
+            quantizado.salvar()
+
+        # Análises, repetidas para obter percentis
+        for _ in range(repeticoes_analise):
+            contexto_analitico = medir_vez("analises", preprocessar_dados, caminho_csv)
+        json_analitico_path = os.path.join(pasta, "contexto_analitico.json")
+        artefato_analitico_path = os.path.join(pasta, "contexto_analitico.bin")
+        exportar_contexto(contexto_analitico, json_analitico_path, artefato_analitico_path)
+
+        # Consultas: embedding da pergunta, busca híbrida e geração com o LLM stub
+        sessao = SessaoConsulta(chroma_path=chroma_path, json_analitico_path=json_analitico_path, usar_cache=False,
+                                embedding_function=funcao_embeddings, artefato_analitico_path=artefato_analitico_path)
+        sessao.model = LLMStub(atraso_token=atraso_token)
+        if cache_recuperacao:
+            # Cache na pasta temporária, para não misturar entradas com o cache real
+            sessao.cache = CacheRecuperacao(chroma_path, os.path.join(pasta, CACHE_RECUPERACAO_PATH))
+        perguntas = list(ground_truth)
+        sessao.total_relevantes([ground_truth[pergunta]["relevant_keys"] for pergunta in perguntas])
+        for i in range(consultas):
+            pergunta = perguntas[i % len(perguntas)]
+            medir_vez("embedding_pergunta", funcao_embeddings.embed_query, pergunta)
+            # Caminho de produção: roteamento por metadados, índice quantizado, fusão e cache
+            results = medir_vez("busca", sessao.buscar, pergunta, 20)
+            medir_vez("geracao", sessao._gerar, pergunta, results)
+
+    return {
+        "linhas": linhas,
+        "configuracao": {
+            "embeddings": embeddings, "consultas": consultas, "batch_size": batch_size,
+            "repeticoes_analise": repeticoes_analise, "atraso_token": atraso_token, "semente": semente,
+            "quantizacao": quantizacao, "cache_recuperacao": cache_recuperacao,
+        },
+        "etapas": {etapa: resumir_amostras(valores) for etapa, valores in amostras.items()},
+        "pico_rss_mb": pico_rss_mb(),
+    }
+
+def salvar_resultados(resultados, pasta=RESULTADOS_BENCHMARK_PATH):
+    """
+    Grava os resultados com data e ambiente em um JSON, para comparar execuções.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    agora = datetime.now()
+    caminho = os.path.join(pasta, f"benchmark_{agora:%Y%m%d_%H%M%S}.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({
+            "data": agora.isoformat(timespec="seconds"),
+            "ambiente": {
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+                "processador": platform.processor(),
+                "cpus": os.cpu_count(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+            },
+            "execucoes": resultados,
+        }, f, ensure_ascii=False, indent=4)
+    return caminho
+
+def imprimir_resultado(resultado):
+    pico = resultado["pico_rss_mb"]
+    print(f"📊 {resultado['linhas']} linhas (pico RSS do processo: {'n/d' if pico is None else f'{pico:.0f} MB'})")
+    for etapa, resumo in resultado["etapas"].items():
+        if resumo["amostras"]:
+            print(f"   {etapa}: n={resumo['amostras']}, total={resumo['total']:.2f}s, "
+                  f"p50={resumo['p50'] * 1000:.1f}ms, p95={resumo['p95'] * 1000:.1f}ms, p99={resumo['p99'] * 1000:.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, nargs="+", default=LINHAS_BENCHMARK, help="Tamanhos das exportações sintéticas.")
+    parser.add_argument("--carregadores", action="store_true", help="Apenas comparar o carregador iterrows com o carregador em blocos.")
+    parser.add_argument("--embeddings", choices=["sintetico", "modelo"], default="sintetico", help="Embeddings sintéticas ou o modelo configurado.")
+    parser.add_argument("--consultas", type=int, default=50, help="Perguntas medidas (o ground truth é percorrido em ciclo).")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Documentos por lote de embeddings.")
+    parser.add_argument("--repeticoes-analise", type=int, default=1, help="Execuções das análises por tamanho.")
+    parser.add_argument("--atraso-token", type=float, default=0.0, help="Atraso por token do LLM stub, em segundos.")
+    parser.add_argument("--vetores-compactos", choices=["float16", "int8"], default=None,
+                        help="Gravar e usar na busca o índice quantizado do tipo informado.")
+    parser.add_argument("--cache-recuperacao", action="store_true", help="Medir a busca com o cache de recuperação ativo.")
+    parser.add_argument("--saida", default=RESULTADOS_BENCHMARK_PATH, help="Pasta dos resultados em JSON.")
+    args = parser.parse_args()
+
+    if args.carregadores:
+        for linhas in args.linhas:
+            comparar_carregadores(linhas)
+        return
+
+    resultados = []
+    for linhas in args.linhas:
+        resultado = executar_benchmark(
+            linhas, embeddings=args.embeddings, consultas=args.consultas, batch_size=args.batch_size,
+            repeticoes_analise=args.repeticoes_analise, atraso_token=args.atraso_token,
+            quantizacao=args.vetores_compactos, cache_recuperacao=args.cache_recuperacao,
+        )
+        imprimir_resultado(resultado)
+        resultados.append(resultado)
+    print(f"💾 Resultados salvos em {salvar_resultados(resultados, args.saida)}")
+
+if __name__ == "__main__":
+    main()
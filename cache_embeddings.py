@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+def embutir_consultas(embeddings, textos):
+    """
+    Calcula os vetores de consulta de `textos` em lote quando a função de embeddings
+    oferece embed_queries, ou um a um com embed_query.
+    """
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(list(textos))
+    return [embeddings.embed_query(texto) for texto in textos]
+
+class CacheEmbeddings(Embeddings):
+    """
+    Envolve uma função de embeddings com um cache persistente em disco.
+
+    Os vetores ficam em um arquivo float32 mapeado em memória (vetores.f32) e o
+    índice das chaves em um SQLite (indice.sqlite). Cada pasta de cache pertence a
+    uma combinação de modelo e normalização, e as chaves são o hash do texto. Quando
+    a capacidade é atingida, as entradas usadas há mais tempo são substituídas (LRU).
+    """
+
+    def __init__(self, embeddings, pasta, modelo, normalizar=False, capacidade=100_000):
+        self.embeddings = embeddings
+        self.capacidade = capacidade
+        self.acertos = 0
+        self.falhas = 0
+
+        configuracao = json.dumps({"modelo": modelo, "normalizar": normalizar}, sort_keys=True)
+        self.pasta = os.path.join(pasta, hashlib.sha1(configuracao.encode("utf-8")).hexdigest()[:16])
+        os.makedirs(self.pasta, exist_ok=True)
+        with open(os.path.join(self.pasta, "configuracao.json"), 'w', encoding='utf-8') as f:
+            f.write(configuracao)
+
+        self._caminho_vetores = os.path.join(self.pasta, "vetores.f32")
+        self._vetores = None
+        # A instância é compartilhada pelo processo (get_embedding_function) e usada pelos
+        # pools de threads das consultas em lote e da avaliação; a conexão é serializada pela trava
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(os.path.join(self.pasta, "indice.sqlite"), timeout=60, isolation_level=None,
+                                        check_same_thread=False)
+        self._conexao.executescript("""
+            CREATE TABLE IF NOT EXISTS chaves (chave TEXT PRIMARY KEY, slot INTEGER UNIQUE, acesso INTEGER);
+            CREATE INDEX IF NOT EXISTS idx_acesso ON chaves (acesso);
+            CREATE TABLE IF NOT EXISTS meta (nome TEXT PRIMARY KEY, valor INTEGER);
+        """)
+
+    def embed_documents(self, texts):
+        return self._embutir(texts, "documento", self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self._embutir([text], "consulta", lambda textos: [self.embeddings.embed_query(textos[0])])[0]
+
+    def embed_queries(self, texts):
+        """
+        Vetores de várias consultas em lote, com a mesma chave de cache de embed_query.
+        """
+        return self._embutir(texts, "consulta", lambda textos: embutir_consultas(self.embeddings, textos))
+
+    def estatisticas(self):
+        """
+        Retorna os contadores de acertos/falhas desta instância e o tamanho do cache.
+        """
+        total = self.acertos + self.falhas
+        with self._trava:
+            entradas = self._conexao.execute("SELECT COUNT(*) FROM chaves").fetchone()[0]
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "entradas": entradas,
+            "capacidade": self.capacidade,
+        }
+
+    def _embutir(self, textos, tipo, calcular):
+        chaves = [hashlib.sha1(f"{tipo}\0{texto}".encode("utf-8")).hexdigest() for texto in textos]
+        with self._trava:
+            resultado = self._ler(chaves)
+            faltantes = [i for i, vetor in enumerate(resultado) if vetor is None]
+            self.acertos += len(textos) - len(faltantes)
+            self.falhas += len(faltantes)
+        if faltantes:
+            # Textos repetidos dentro da mesma chamada são calculados uma única vez; o
+            # modelo roda fora da trava, que protege só a leitura e a gravação no cache
+            primeiro = {}
+            for i in faltantes:
+                primeiro.setdefault(chaves[i], i)
+            unicos = list(primeiro)
+            novos = calcular([textos[primeiro[chave]] for chave in unicos])
+            calculados = dict(zip(unicos, novos))
+            for i in faltantes:
+                resultado[i] = list(calculados[chaves[i]])
+            with self._trava:
+                self._gravar(unicos, novos)
+        return resultado
+
+    def _ler(self, chaves):
+        resultado = [None] * len(chaves)
+        if not chaves:
+            return resultado
+
+        # A leitura dos vetores acontece dentro da transação para que nenhum slot
+        # seja substituído por outro processo durante a cópia.
+        self._conexao.execute("BEGIN")
+        try:
+            slots = {}
+            for i in range(0, len(chaves), 500):
+                parte = chaves[i:i + 500]
+                consulta = f"SELECT chave, slot FROM chaves WHERE chave IN ({','.join('?' * len(parte))})"
+                slots.update(self._conexao.execute(consulta, parte).fetchall())
+            if slots:
+                vetores = self._abrir_vetores()
+                for i, chave in enumerate(chaves):
+                    if chave in slots:
+                        resultado[i] = vetores[slots[chave]].tolist()
+        finally:
+            self._conexao.execute("COMMIT")
+
+        if slots:
+            acesso = self._proximo_acesso(len(slots))
+            self._conexao.executemany("UPDATE chaves SET acesso = ? WHERE chave = ?", [(acesso, chave) for chave in slots])
+        return resultado
+
+    def _gravar(self, chaves, vetores):
+        matriz = np.asarray(vetores, dtype=np.float32)
+        if len(chaves) > self.capacidade:
+            chaves, matriz = chaves[-self.capacidade:], matriz[-self.capacidade:]
+
+        self._conexao.execute("BEGIN EXCLUSIVE")
+        try:
+            self._definir_dimensao(matriz.shape[1])
+
+            # Outro processo pode ter gravado as mesmas chaves desde a leitura
+            presentes = set()
+            for i in range(0, len(chaves), 500):
+                parte = chaves[i:i + 500]
+                consulta = f"SELECT chave FROM chaves WHERE chave IN ({','.join('?' * len(parte))})"
+                presentes.update(chave for chave, in self._conexao.execute(consulta, parte))
+            if presentes:
+                manter = [i for i, chave in enumerate(chaves) if chave not in presentes]
+                chaves, matriz = [chaves[i] for i in manter], matriz[manter]
+            if not chaves:
+                self._conexao.execute("COMMIT")
+                return
+
+            ocupados = self._conexao.execute("SELECT COUNT(*) FROM chaves").fetchone()[0]
+            livres = list(range(ocupados, min(ocupados + len(chaves), self.capacidade)))
+            excesso = len(chaves) - len(livres)
+            if excesso > 0:
+                # Substitui as entradas usadas há mais tempo
+                removidos = self._conexao.execute(
+                    "SELECT chave, slot FROM chaves ORDER BY acesso LIMIT ?", (excesso,)
+                ).fetchall()
+                self._conexao.executemany("DELETE FROM chaves WHERE chave = ?", [(chave,) for chave, _ in removidos])
+                livres += [slot for _, slot in removidos]
+
+            vetores_mmap = self._abrir_vetores(max(livres) + 1)
+            vetores_mmap[livres] = matriz
+            vetores_mmap.flush()
+
+            acesso = self._proximo_acesso(len(chaves), em_transacao=True)
+            self._conexao.executemany(
+                "INSERT OR REPLACE INTO chaves (chave, slot, acesso) VALUES (?, ?, ?)",
+                [(chave, slot, acesso) for chave, slot in zip(chaves, livres)],
+            )
+            self._conexao.execute("COMMIT")
+        except Exception:
+            self._conexao.execute("ROLLBACK")
+            raise
+
+    def _definir_dimensao(self, dimensao):
+        linha = self._conexao.execute("SELECT valor FROM meta WHERE nome = 'dimensao'").fetchone()
+        if linha is None:
+            self._conexao.execute("INSERT INTO meta (nome, valor) VALUES ('dimensao', ?)", (dimensao,))
+        elif linha[0] != dimensao:
+            raise ValueError(f"Dimensão {dimensao} diferente da registrada no cache ({linha[0]}).")
+
+    def _abrir_vetores(self, linhas_minimas=0):
+        dimensao = self._conexao.execute("SELECT valor FROM meta WHERE nome = 'dimensao'").fetchone()[0]
+        tamanho_linha = dimensao * 4
+        linhas = os.path.getsize(self._caminho_vetores) // tamanho_linha if os.path.exists(self._caminho_vetores) else 0
+
+        if linhas < linhas_minimas:
+            # Cresce o arquivo dobrando de tamanho até a capacidade
+            linhas = min(self.capacidade, max(linhas_minimas, linhas * 2, 1024))
+            with open(self._caminho_vetores, 'ab') as f:
+                f.truncate(linhas * tamanho_linha)
+            self._vetores = None
+
+        if self._vetores is None or self._vetores.shape[0] != linhas:
+            self._vetores = np.memmap(self._caminho_vetores, dtype=np.float32, mode='r+', shape=(linhas, dimensao))
+        return self._vetores
+
+    def _proximo_acesso(self, quantidade, em_transacao=False):
+        if not em_transacao:
+            self._conexao.execute("BEGIN IMMEDIATE")
+        self._conexao.execute(
+            "INSERT INTO meta (nome, valor) VALUES ('relogio', ?) "
+            "ON CONFLICT(nome) DO UPDATE SET valor = valor + ?", (quantidade, quantidade)
+        )
+        valor = self._conexao.execute("SELECT valor FROM meta WHERE nome = 'relogio'").fetchone()[0]
+        if not em_transacao:
+            self._conexao.execute("COMMIT")
+        return valor
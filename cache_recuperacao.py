@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import uuid
+from langchain_core.documents import Document
+
+# Arquivo do cache de resultados de busca e limites de retenção
+CACHE_RECUPERACAO_PATH = "cache_recuperacao.sqlite"
+CACHE_RECUPERACAO_CAPACIDADE = 10_000
+CACHE_RECUPERACAO_TTL = 24 * 60 * 60
+
+def caminho_versao(chroma_path):
+    """
+    Retorna o caminho do carimbo de versão gravado a cada alteração da coleção.
+    """
+    return os.path.join(chroma_path, "versao_colecao.json")
+
+def gravar_versao_colecao(chroma_path):
+    """
+    Grava um novo carimbo de versão, invalidando os resultados de busca em cache.
+    """
+    os.makedirs(chroma_path, exist_ok=True)
+    caminho = caminho_versao(chroma_path)
+    versao = uuid.uuid4().hex
+    with open(caminho + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"versao": versao, "atualizado_em": time.time()}, f)
+    os.replace(caminho + ".tmp", caminho)
+    return versao
+
+def ler_versao_colecao(chroma_path):
+    """
+    Retorna o carimbo de versão atual da coleção ("" se ainda não houver um).
+    """
+    try:
+        with open(caminho_versao(chroma_path), 'r', encoding='utf-8') as f:
+            return json.load(f)["versao"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return ""
+
+def normalizar_consulta(texto):
+    """
+    Normaliza a pergunta para a chave do cache: Unicode NFKC, caixa, espaços e pontuação final.
+    """
+    texto = unicodedata.normalize("NFKC", texto).casefold()
+    return re.sub(r"\s+", " ", texto).strip(" ?!.")
+
+class CacheRecuperacao:
+    """
+    Cache persistente (SQLite) dos resultados de busca por pergunta.
+
+    A chave combina a pergunta normalizada, k, os filtros estruturados, os
+    parâmetros da busca e a versão da coleção; quando o add_to_chroma grava uma
+    nova versão, as entradas anteriores deixam de ser encontradas e são apagadas
+    na próxima gravação. Entradas mais antigas que `ttl` segundos expiram, e acima
+    de `capacidade` entradas as usadas há mais tempo são removidas (LRU).
+    """
+
+    def __init__(self, chroma_path, caminho=CACHE_RECUPERACAO_PATH, capacidade=CACHE_RECUPERACAO_CAPACIDADE,
+                 ttl=CACHE_RECUPERACAO_TTL):
+        self.chroma_path = chroma_path
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.acertos = 0
+        self.falhas = 0
+        self._trava = threading.Lock()
+        self._versao = None
+        self._mtime_versao = None
+        self._conexao = sqlite3.connect(caminho, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conexao.executescript("""
+            CREATE TABLE IF NOT EXISTS resultados (chave TEXT PRIMARY KEY, versao TEXT, criado REAL, acesso REAL, valor TEXT);
+            CREATE INDEX IF NOT EXISTS idx_resultados_acesso ON resultados (acesso);
+        """)
+
+    def versao(self):
+        """
+        Retorna a versão atual da coleção, relendo o carimbo apenas quando o arquivo muda.
+        """
+        caminho = caminho_versao(self.chroma_path)
+        mtime = os.path.getmtime(caminho) if os.path.exists(caminho) else None
+        if self._versao is None or mtime != self._mtime_versao:
+            self._versao = ler_versao_colecao(self.chroma_path)
+            self._mtime_versao = mtime
+        return self._versao
+
+    def chave(self, pergunta, k, filtros=(), parametros=None):
+        conteudo = json.dumps(
+            [self.versao(), normalizar_consulta(pergunta), k, sorted(map(list, filtros)), parametros],
+            ensure_ascii=False, sort_keys=True,
+        )
+        return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+    def obter(self, chave):
+        """
+        Retorna a lista de (Document, pontuação) guardada para a chave, ou None.
+        """
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT valor FROM resultados WHERE chave = ? AND criado >= ?", (chave, time.time() - self.ttl)
+            ).fetchone()
+            if linha is None:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            self._conexao.execute("UPDATE resultados SET acesso = ? WHERE chave = ?", (time.time(), chave))
+        return [(Document(page_content=conteudo, metadata=metadata), pontuacao)
+                for conteudo, metadata, pontuacao in json.loads(linha[0])]
+
+    def guardar(self, chave, resultados):
+        """
+        Guarda os resultados de uma busca e remove entradas de versões antigas, expiradas ou excedentes.
+        """
+        valor = json.dumps(
+            [(doc.page_content, doc.metadata, float(pontuacao)) for doc, pontuacao in resultados], ensure_ascii=False
+        )
+        agora = time.time()
+        with self._trava:
+            self._conexao.execute("BEGIN IMMEDIATE")
+            try:
+                self._conexao.execute(
+                    "DELETE FROM resultados WHERE versao != ? OR criado < ?", (self.versao(), agora - self.ttl)
+                )
+                self._conexao.execute(
+                    "INSERT OR REPLACE INTO resultados (chave, versao, criado, acesso, valor) VALUES (?, ?, ?, ?, ?)",
+                    (chave, self.versao(), agora, agora, valor),
+                )
+                self._conexao.execute(
+                    "DELETE FROM resultados WHERE chave IN "
+                    "(SELECT chave FROM resultados ORDER BY acesso DESC LIMIT -1 OFFSET ?)", (self.capacidade,)
+                )
+                self._conexao.execute("COMMIT")
+            except Exception:
+                self._conexao.execute("ROLLBACK")
+                raise
+
+    def estatisticas(self):
+        """
+        Retorna os contadores de acertos/falhas desta instância e o tamanho do cache.
+        """
+        total = self.acertos + self.falhas
+        entradas = self._conexao.execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "entradas": entradas,
+            "capacidade": self.capacidade,
+        }
@@ -0,0 +1,86 @@
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# Taxonomia padrão de módulos, em ordem de prioridade
+MODULOS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modulos.json")
+
+class ClassificadorModulos:
+    """
+    Classifica Summaries em módulos a partir de uma taxonomia de termos.
+
+    Todos os termos da taxonomia são compilados uma única vez em uma expressão
+    regular em forma de trie (prefixos comuns fatorados), de modo que o custo de
+    varrer um texto praticamente não cresce com o número de módulos. Quando um
+    texto contém termos de vários módulos, vence o módulo que aparece primeiro na
+    taxonomia.
+    """
+
+    def __init__(self, taxonomia, padrao="Outros"):
+        self.modulos = [item["modulo"] for item in taxonomia]
+        self.padrao = padrao
+
+        self.prioridade_termo = {}
+        for prioridade, item in enumerate(taxonomia):
+            for termo in item["termos"]:
+                # Um termo repetido pertence ao módulo de maior prioridade
+                self.prioridade_termo.setdefault(termo.lower(), prioridade)
+
+        self.regex = re.compile(r"\b(?:" + _regex_trie(self.prioridade_termo) + r")\b")
+        self._nomes = np.array(self.modulos + [padrao], dtype=object)
+
+    @classmethod
+    def de_arquivo(cls, caminho=MODULOS_PATH):
+        """
+        Carrega a taxonomia de um JSON: lista de {"modulo": ..., "termos": [...]}.
+        """
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def classificar(self, summary):
+        """
+        Retorna o módulo de um único Summary.
+        """
+        if not isinstance(summary, str):
+            return self.padrao
+        prioridades = [self.prioridade_termo[termo] for termo in self.regex.findall(summary.lower())]
+        return self._nomes[min(prioridades, default=len(self.modulos))]
+
+    def classificar_serie(self, serie):
+        """
+        Retorna uma Series com o módulo de cada valor, classificando cada texto distinto uma única vez.
+        """
+        codigos, unicos = pd.factorize(serie)
+        unicos = pd.Series(np.asarray(unicos, dtype=object))
+        textos = unicos[unicos.map(lambda valor: isinstance(valor, str))]
+
+        prioridades = np.full(len(unicos) + 1, len(self.modulos))
+        termos = textos.str.lower().str.findall(self.regex).explode().dropna()
+        if len(termos):
+            melhor = termos.map(self.prioridade_termo).groupby(level=0).min()
+            prioridades[melhor.index.to_numpy()] = melhor.to_numpy(dtype=int)
+
+        # Códigos -1 (valores nulos) apontam para a última posição, que é o padrão
+        return pd.Series(self._nomes[prioridades[codigos]], index=serie.index)
+
+def _regex_trie(termos):
+    """
+    Monta uma alternância de termos com prefixos comuns fatorados (ex.: "cabo(?:s)?").
+    """
+    trie = {}
+    for termo in termos:
+        no = trie
+        for caractere in termo:
+            no = no.setdefault(caractere, {})
+        no[""] = {}
+
+    def montar(no):
+        ramos = [re.escape(caractere) + montar(filho) for caractere, filho in sorted(no.items()) if caractere]
+        if not ramos:
+            return ""
+        corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+        return f"(?:{corpo})?" if "" in no else corpo
+
+    return montar(trie)
@@ -0,0 +1,154 @@
+import math
+import re
+from indice_bm25 import tokenizar
+
+# Orçamento padrão de tokens do contexto e fração reservada às fatias analíticas
+ORCAMENTO_TOKENS = 1500
+FRACAO_ANALITICA = 0.25
+
+# Documentos com relevância abaixo desta fração da melhor relevância são descartados
+LIMIAR_RELEVANCIA = 0.5
+
+# Similaridade de Jaccard entre termos a partir da qual dois documentos são considerados duplicados
+LIMIAR_DUPLICATA = 0.9
+
+# Quantidade de entradas de cada fatia analítica quando a pergunta cita o tema sem um valor específico
+TOP_FATIAS = 5
+
+PADRAO_TOKEN_ESTIMADO = re.compile(r"\w+|[^\w\s]")
+
+# Fatias do contexto analítico: (chave no JSON, rótulo, expressão que indica interesse pelo tema)
+FATIAS_ANALITICAS = [
+    ("contagem_epic_link", "Bugs por Epic Link", re.compile(r"\bepic", re.IGNORECASE)),
+    ("contagem_bugs_release", "Bugs por Release", re.compile(r"\b(release|vers[ãa]o|version)", re.IGNORECASE)),
+    ("bugs_por_modulo", "Bugs por módulo", re.compile(r"\b(m[óo]dulo|module|[áa]rea|area|setor|sector)", re.IGNORECASE)),
+    ("categorias_status", "Bugs por status", re.compile(r"\bstatus", re.IGNORECASE)),
+    ("categorias_reporter", "Bugs por reporter", re.compile(r"\breporter", re.IGNORECASE)),
+    ("areas_criticas", "Áreas críticas (centralidade no grafo de defeitos, 1 = média)",
+     re.compile(r"\b(cr[íi]tic|critical|impact|hotspot|relacion|relat|padr[ãa]o|pattern)", re.IGNORECASE)),
+]
+
+# Perguntas sobre evolução no tempo recebem os picos e a taxa recente das séries temporais
+GATILHO_TENDENCIA = re.compile(r"\b(tend[êe]ncia|trend|pico|spike|semana|week|sprint|densidade|density|evolu|aument|increas)", re.IGNORECASE)
+
+def contar_tokens(texto):
+    """
+    Estima os tokens de um texto: palavras e sinais de pontuação, com um acréscimo
+    de 30% para a divisão em subpalavras feita pelo tokenizador do LLM.
+    """
+    return math.ceil(len(PADRAO_TOKEN_ESTIMADO.findall(texto)) * 1.3)
+
+def relevancias(results, maior_melhor):
+    """
+    Converte as pontuações da busca em relevâncias (maior é melhor).
+
+    Distâncias são convertidas em 1 / (1 + distância); pontuações de fusão já são relevâncias.
+    """
+    return [pontuacao if maior_melhor else 1 / (1 + max(pontuacao, 0.0)) for _, pontuacao in results]
+
+def fatias_relevantes(pergunta, contexto_analitico, classificador=None, top=TOP_FATIAS):
+    """
+    Seleciona do contexto analítico apenas as entradas relacionadas à pergunta.
+
+    Valores citados na pergunta (uma Epic, uma release, um módulo, um reporter) são
+    incluídos diretamente; quando a pergunta só menciona o tema, entram as `top`
+    maiores entradas da fatia. O módulo e as Epics citados também trazem seus
+    tópicos predominantes (ver topicos.py).
+    """
+    texto = pergunta.casefold()
+    modulo = classificador.classificar(pergunta) if classificador else None
+    if classificador and modulo == classificador.padrao:
+        modulo = None
+
+    linhas = [f"Total de bugs: {contexto_analitico.get('contagem_total_bugs', 'desconhecido')}"]
+    for chave, rotulo, gatilho in FATIAS_ANALITICAS:
+        contagem = contexto_analitico.get(chave) or {}
+        citados = {
+            nome: valor for nome, valor in contagem.items()
+            if (chave == "bugs_por_modulo" and nome == modulo)
+            or re.search(rf"(?<!\w){re.escape(str(nome).casefold())}(?!\w)", texto)
+        }
+        if not citados and gatilho.search(pergunta):
+            citados = dict(sorted(contagem.items(), key=lambda item: item[1], reverse=True)[:top])
+        if citados:
+            linhas.append(f"{rotulo}: " + ", ".join(f"{nome}={valor}" for nome, valor in citados.items()))
+
+    # Densidade das releases citadas e picos das séries temporais
+    series = contexto_analitico.get("series_temporais") or {}
+    por_release = series.get("por_release") or {}
+    for i, release in enumerate(por_release.get("releases", [])):
+        if re.search(rf"(?<!\w){re.escape(release.casefold())}(?!\w)", texto):
+            linhas.append(f"Release {release}: {por_release['bugs'][i]} bugs de {por_release['inicio'][i]} a "
+                          f"{por_release['fim'][i]} ({por_release['densidade_semanal'][i]} bugs/semana ativa)")
+    if GATILHO_TENDENCIA.search(pergunta):
+        for chave, rotulo in (("semanal", "Semanas"), ("por_sprint", "Sprints")):
+            serie = series.get(chave) or {}
+            if serie.get("contagens"):
+                linhas.append(f"{rotulo} com pico de bugs: {', '.join(map(str, serie['picos'][-top:])) or 'nenhum'}; "
+                              f"taxa móvel atual={serie['taxa_movel'][-1]}")
+
+    # Temas (tópicos e seus termos) do módulo e das Epics citados
+    topicos = contexto_analitico.get("topicos") or {}
+    temas = topicos.get("temas") or {}
+    for chave, rotulo in (("por_modulo", "Temas do módulo"), ("por_epic", "Temas da Epic")):
+        for grupo, contagem in (topicos.get(chave) or {}).items():
+            if (chave == "por_modulo" and grupo == modulo) or re.search(rf"(?<!\w){re.escape(grupo.casefold())}(?!\w)", texto):
+                linhas.append(f"{rotulo} {grupo}: " + "; ".join(
+                    f"{temas.get(topico, {}).get('termos') or topico} ({total} bugs)" for topico, total in contagem.items()
+                ))
+    return "\n".join(linhas)
+
+def montar_contexto(pergunta, results, contexto_analitico, orcamento_tokens=ORCAMENTO_TOKENS, maior_melhor=False,
+                    limiar_relevancia=LIMIAR_RELEVANCIA, limiar_duplicata=LIMIAR_DUPLICATA, classificador=None):
+    """
+    Monta o contexto do prompt dentro de um orçamento de tokens.
+
+    As fatias analíticas relevantes ocupam no máximo FRACAO_ANALITICA do orçamento; o
+    restante recebe os documentos em ordem de relevância, sem os de baixa pontuação e
+    sem Summaries quase idênticos. Retorna (texto do contexto, resultados incluídos, relatório).
+    """
+    analitico = fatias_relevantes(pergunta, contexto_analitico, classificador)
+    limite_analitico = int(orcamento_tokens * FRACAO_ANALITICA)
+    if contar_tokens(analitico) > limite_analitico:
+        linhas = analitico.split("\n")
+        while len(linhas) > 1 and contar_tokens("\n".join(linhas)) > limite_analitico:
+            linhas.pop()
+        analitico = "\n".join(linhas)
+    usados = contar_tokens(analitico)
+
+    relatorio = {"descartados_pontuacao": 0, "duplicados": 0, "fora_do_orcamento": 0}
+    valores = relevancias(results, maior_melhor)
+    melhor = max(valores, default=0.0)
+
+    incluidos, partes, termos_incluidos = [], [], []
+    for (doc, pontuacao), relevancia in zip(results, valores):
+        if melhor > 0 and relevancia < melhor * limiar_relevancia:
+            relatorio["descartados_pontuacao"] += 1
+            continue
+        # A comparação usa só a primeira linha (Summary), ignorando Epic Link e Reporter
+        termos = set(tokenizar(doc.page_content.split("\n", 1)[0]))
+        if any(_jaccard(termos, outros) >= limiar_duplicata for outros in termos_incluidos):
+            relatorio["duplicados"] += 1
+            continue
+        tokens = contar_tokens(doc.page_content) + 2
+        if usados + tokens > orcamento_tokens:
+            relatorio["fora_do_orcamento"] += 1
+            continue
+        usados += tokens
+        incluidos.append((doc, pontuacao))
+        partes.append(doc.page_content)
+        termos_incluidos.append(termos)
+
+    relatorio.update({
+        "orcamento": orcamento_tokens,
+        "tokens_analiticos": contar_tokens(analitico),
+        "tokens_contexto": usados,
+        "documentos_recuperados": len(results),
+        "documentos_incluidos": len(incluidos),
+    })
+    return "\n\n---\n\n".join([analitico, *partes]), incluidos, relatorio
+
+def _jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from series_temporais import converter_datas
+
+# Similaridade de cosseno a partir da qual dois bugs são considerados quase duplicados
+LIMIAR_SIMILARIDADE = 0.95
+
+# Tamanho dos blocos da comparação todos-contra-todos: cada produto gera no máximo
+# LINHAS_POR_BLOCO x COLUNAS_POR_BLOCO similaridades (128 MB em float32)
+LINHAS_POR_BLOCO = 2048
+COLUNAS_POR_BLOCO = 16_384
+
+# Vetores lidos da coleção Chroma por página
+PAGINA_CHROMA = 5000
+
+# Relatório gerado pela detecção completa
+DUPLICATAS_PATH = "duplicatas.json"
+
+def caminho_colapsados(chroma_path):
+    """
+    Retorna o caminho do registro de duplicatas removidas da coleção na ingestão.
+    """
+    return os.path.join(chroma_path, "duplicatas_colapsadas.json")
+
+def carregar_colapsados(chroma_path):
+    """
+    Lê o registro {id: {"representante": id, "hash_conteudo": hash}} das duplicatas colapsadas.
+    """
+    try:
+        with open(caminho_colapsados(chroma_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def salvar_colapsados(chroma_path, colapsados):
+    """
+    Grava o registro de duplicatas colapsadas de forma atômica.
+    """
+    os.makedirs(chroma_path, exist_ok=True)
+    caminho = caminho_colapsados(chroma_path)
+    with open(caminho + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(colapsados, f, ensure_ascii=False)
+    os.replace(caminho + ".tmp", caminho)
+
+def normalizar(vetores):
+    """
+    Converte os vetores em float32 com norma unitária, para que o produto interno seja o cosseno.
+    """
+    matriz = np.asarray(vetores, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    return matriz / np.where(normas > 0, normas, 1)
+
+def pares_similares(consultas, corpus, limiar=LIMIAR_SIMILARIDADE, mesmo_conjunto=False,
+                    linhas_por_bloco=LINHAS_POR_BLOCO, colunas_por_bloco=COLUNAS_POR_BLOCO):
+    """
+    Retorna (i, j, similaridade) dos pares com cosseno >= limiar entre as linhas de
+    `consultas` e as de `corpus` (ambos normalizados).
+
+    A matriz de similaridades é calculada em blocos, e só os pares acima do limiar
+    são guardados. Com mesmo_conjunto=True, apenas os pares i < j são comparados.
+    """
+    linhas, colunas, similaridades = [], [], []
+    for inicio in range(0, len(consultas), linhas_por_bloco):
+        bloco = consultas[inicio:inicio + linhas_por_bloco]
+        primeira_coluna = inicio if mesmo_conjunto else 0
+        for coluna in range(primeira_coluna, len(corpus), colunas_por_bloco):
+            produto = bloco @ corpus[coluna:coluna + colunas_por_bloco].T
+            if mesmo_conjunto:
+                # Descarta a diagonal e o triângulo inferior
+                produto[np.arange(len(bloco))[:, None] + inicio >= np.arange(produto.shape[1]) + coluna] = -np.inf
+            i, j = np.nonzero(produto >= limiar)
+            linhas.append(i + inicio)
+            colunas.append(j + coluna)
+            similaridades.append(produto[i, j])
+    if not linhas:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return np.concatenate(linhas), np.concatenate(colunas), np.concatenate(similaridades)
+
+def ler_vetores(db, ids=None, pagina=PAGINA_CHROMA):
+    """
+    Lê da coleção Chroma, em páginas, os IDs, metadados e vetores normalizados.
+
+    Sem `ids`, lê a coleção inteira.
+    """
+    todos_ids, metadados, blocos = [], [], []
+    if ids is None:
+        offset = 0
+        while True:
+            itens = db.get(include=["embeddings", "metadatas"], limit=pagina, offset=offset)
+            if not itens["ids"]:
+                break
+            todos_ids.extend(itens["ids"])
+            metadados.extend(itens["metadatas"])
+            blocos.append(normalizar(itens["embeddings"]))
+            offset += len(itens["ids"])
+    else:
+        for inicio in range(0, len(ids), pagina):
+            itens = db.get(ids=list(ids[inicio:inicio + pagina]), include=["embeddings", "metadatas"])
+            todos_ids.extend(itens["ids"])
+            metadados.extend(itens["metadatas"])
+            blocos.append(normalizar(itens["embeddings"]))
+    matriz = np.concatenate(blocos) if blocos else np.zeros((0, 0), dtype=np.float32)
+    return todos_ids, metadados, matriz
+
+def agrupar(ids, metadados, linhas, colunas, similaridades, preferidos=None):
+    """
+    Agrupa os pares similares em clusters (componentes conexos) e escolhe o representante de cada um.
+
+    O representante é, nesta ordem, um documento de `preferidos` (por exemplo, os que
+    já estavam na coleção), o criado primeiro e o de menor ID.
+    """
+    n = len(ids)
+    if not len(linhas):
+        return []
+    grafo = sparse.coo_matrix((np.ones(len(linhas)), (linhas, colunas)), shape=(n, n))
+    _, rotulos = connected_components(grafo, directed=False)
+
+    # Menor similaridade dentro de cada cluster (pelos pares que o formaram)
+    minimas = {}
+    for rotulo, similaridade in zip(rotulos[linhas], similaridades):
+        minimas[rotulo] = min(minimas.get(rotulo, 1.0), float(similaridade))
+
+    preferidos = preferidos or set()
+    membros = np.unique(np.concatenate([linhas, colunas]))
+    clusters = {}
+    for indice in membros:
+        clusters.setdefault(rotulos[indice], []).append(indice)
+
+    resultado = []
+    for rotulo, indices in clusters.items():
+        # "created" vem do CSV do Jira como texto ("15/Jan/23 10:00 AM"); datas inválidas vão para o fim
+        criados = converter_datas([(metadados[i] or {}).get("created") for i in indices])
+        instantes = dict(zip(indices, criados.to_numpy().astype("datetime64[ns]").astype(np.int64)))
+        invalidos = dict(zip(indices, criados.isna().to_numpy()))
+        ordem = sorted(indices, key=lambda i: (ids[i] not in preferidos, bool(invalidos[i]), int(instantes[i]), ids[i]))
+        resultado.append({
+            "representante": ids[ordem[0]],
+            "duplicatas": [ids[i] for i in ordem[1:]],
+            "similaridade_minima": round(minimas[rotulo], 4),
+        })
+    return sorted(resultado, key=lambda cluster: len(cluster["duplicatas"]), reverse=True)
+
+def detectar_duplicatas(db, limiar=LIMIAR_SIMILARIDADE):
+    """
+    Compara todos os vetores da coleção entre si, em blocos, e retorna os clusters de quase duplicatas.
+    """
+    ids, metadados, matriz = ler_vetores(db)
+    linhas, colunas, similaridades = pares_similares(matriz, matriz, limiar, mesmo_conjunto=True)
+    return agrupar(ids, metadados, linhas, colunas, similaridades)
+
+def detectar_duplicatas_novas(db, novos_ids, limiar=LIMIAR_SIMILARIDADE):
+    """
+    Compara apenas os vetores `novos_ids` com a coleção inteira, página a página.
+
+    Usado na ingestão: o custo é proporcional a novos x coleção, e não ao quadrado da
+    coleção. Documentos que já estavam na coleção têm preferência como representantes.
+    """
+    ids_novos, metadados_novos, novos = ler_vetores(db, novos_ids)
+    if not ids_novos:
+        return []
+    posicao = {id_: i for i, id_ in enumerate(ids_novos)}
+    ids, metadados = list(ids_novos), list(metadados_novos)
+    linhas, colunas, similaridades = [], [], []
+
+    offset = 0
+    while True:
+        itens = db.get(include=["embeddings", "metadatas"], limit=PAGINA_CHROMA, offset=offset)
+        if not itens["ids"]:
+            break
+        offset += len(itens["ids"])
+        i, j, s = pares_similares(novos, normalizar(itens["embeddings"]), limiar)
+        # Pares entre dois documentos novos aparecem duas vezes; mantém só um sentido
+        alvos = np.array([posicao.get(id_, -1) for id_ in itens["ids"]], dtype=np.int64)[j]
+        manter = (alvos < 0) | (alvos > i)
+        for a, b, similaridade in zip(i[manter], j[manter], s[manter]):
+            id_ = itens["ids"][b]
+            if id_ not in posicao:
+                posicao[id_] = len(ids)
+                ids.append(id_)
+                metadados.append(itens["metadatas"][b])
+            linhas.append(a)
+            colunas.append(posicao[id_])
+            similaridades.append(similaridade)
+
+    preferidos = set(ids) - set(ids_novos)
+    return agrupar(ids, metadados, np.array(linhas, dtype=np.int64), np.array(colunas, dtype=np.int64),
+                   np.array(similaridades, dtype=np.float32), preferidos)
+
+def salvar_relatorio(clusters, caminho=DUPLICATAS_PATH, db=None):
+    """
+    Grava os clusters de duplicatas em JSON, com o texto do representante quando `db` é informado.
+    """
+    if db is not None and clusters:
+        itens = db.get(ids=[cluster["representante"] for cluster in clusters], include=["documents"])
+        textos = dict(zip(itens["ids"], itens["documents"]))
+        for cluster in clusters:
+            cluster["texto"] = (textos.get(cluster["representante"]) or "").split("\n", 1)[0]
+    relatorio = {
+        "clusters": len(clusters),
+        "duplicatas": sum(len(cluster["duplicatas"]) for cluster in clusters),
+        "grupos": clusters,
+    }
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=4)
+    return relatorio
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limiar", type=float, default=LIMIAR_SIMILARIDADE, help="Similaridade de cosseno mínima entre duplicatas.")
+    parser.add_argument("--saida", default=DUPLICATAS_PATH, help="Arquivo do relatório de clusters.")
+    parser.add_argument("--colapsar", action="store_true", help="Remover da coleção e dos índices as duplicatas encontradas.")
+    args = parser.parse_args()
+
+    from langchain.vectorstores import Chroma
+    from get_embeddings_function import get_embedding_function
+    from populate_database import CHROMA_PATH, colapsar_na_colecao
+
+    db = Chroma(persist_directory=CHROMA_PATH, embedding_function=get_embedding_function())
+    clusters = detectar_duplicatas(db, args.limiar)
+    relatorio = salvar_relatorio(clusters, args.saida, db)
+    print(f"🪞 {relatorio['clusters']} clusters com {relatorio['duplicatas']} quase duplicatas "
+          f"(cosseno >= {args.limiar}). Relatório salvo em {args.saida}.")
+    if args.colapsar:
+        colapsar_na_colecao(db, clusters)
@@ -1,13 +1,47 @@
 # Novo (correto)
-from langchain_huggingface import HuggingFaceEmbeddings
+import json
+from functools import lru_cache
+from backends_embeddings import (
+    CONFIGURACAO_PADRAO,
+    EMBEDDINGS_CONFIG_PATH,
+    assinatura,
+    carregar_configuracao,
+    construir_embeddings,
+)
+from cache_embeddings import CacheEmbeddings
 
-def get_embedding_function():
+# Pasta do cache persistente de embeddings e número máximo de vetores guardados
+CACHE_EMBEDDINGS_PATH = "cache_embeddings"
+CACHE_EMBEDDINGS_CAPACIDADE = 200_000
+
+@lru_cache(maxsize=None)
+def get_embedding_function(usar_cache=True, caminho_configuracao=EMBEDDINGS_CONFIG_PATH):
     """
     Retorna a função de embeddings configurada para rodar localmente.
+
+    Modelo, backend (torch/ONNX), quantização int8, batch, threads e redução de
+    dimensionalidade vêm de `caminho_configuracao` (ver backends_embeddings). Por
+    padrão, os vetores calculados são guardados em CACHE_EMBEDDINGS_PATH, de
+    modo que textos já vistos (por exemplo, após um --reset) não passem pelo modelo.
+    O modelo é carregado uma única vez por processo e reutilizado nas chamadas seguintes.
     """
     print("🔧 Configurando a função de embeddings localmente...")
 
-    model_name = "BAAI/bge-large-en-v1.5"  # Certifique-se de que este modelo está disponível localmente
-    embedding_function = HuggingFaceEmbeddings(model_name=model_name)
+    configuracao = carregar_configuracao(caminho_configuracao)
+    embedding_function = construir_embeddings(configuracao)
+
+    if usar_cache:
+        # A pasta do cache é separada por assinatura (modelo, backend, dimensão...). Na
+        # configuração padrão, basta o nome do modelo, o que preserva caches anteriores.
+        padrao = assinatura(dict(CONFIGURACAO_PADRAO, modelo=configuracao["modelo"], normalizar=configuracao["normalizar"]))
+        modelo = configuracao["modelo"] if assinatura(configuracao) == padrao else json.dumps(assinatura(configuracao), sort_keys=True)
+        embedding_function = CacheEmbeddings(
+            embedding_function,
+            CACHE_EMBEDDINGS_PATH,
+            modelo=modelo,
+            normalizar=configuracao["normalizar"],
+            capacidade=CACHE_EMBEDDINGS_CAPACIDADE,
+        )
 
+    embedding_function.assinatura = assinatura(configuracao)
     return embedding_function  # Retorna um objeto compatível com LangChain
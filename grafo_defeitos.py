@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+# Tipos de nó do grafo, na ordem em que ocupam os índices da matriz de adjacência
+TIPOS_NO = ("issue", "epic", "modulo", "sprint")
+
+# Colunas do CSV usadas para montar o grafo
+COLUNAS_GRAFO = {"chave": "Key", "vinculos": "Linked Issues", "epic": "Epic Link", "modulo": "Modulo", "sprint": "Sprint"}
+
+# Chaves de issues citadas em Linked Issues (ex.: "BR-1154")
+PADRAO_CHAVE = r"[A-Z][A-Z0-9_]*-\d+"
+
+# Valores tratados como ausentes em Epic Link e Sprint
+VALORES_AUSENTES = {"", "none", "nan", "unknown"}
+
+# Tamanho dos rankings exportados e parâmetros do PageRank
+TOP_GRAFO = 10
+AMORTECIMENTO = 0.85
+ITERACOES_PAGERANK = 100
+TOLERANCIA_PAGERANK = 1e-8
+
+class GrafoDefeitos:
+    """
+    Grafo esparso de issues, Epics, módulos e sprints.
+
+    Cada linha do CSV liga sua issue às issues de Linked Issues, à sua Epic, ao seu
+    módulo e à sua sprint. Os nós são numerados por tipo com pd.factorize e as
+    arestas ficam em uma matriz de adjacência CSR simétrica, de modo que clusters,
+    coocorrências e centralidades são calculados com operações esparsas, sem merges
+    entre tabelas.
+    """
+
+    def __init__(self, chaves, vinculos, epics, modulos, sprints):
+        chaves = pd.Series(chaves, dtype=object).fillna("").astype(str).str.strip().str.upper().reset_index(drop=True)
+        n = len(chaves)
+
+        # Issues citadas em Linked Issues, explodidas em pares (linha de origem, chave citada)
+        citadas = (pd.Series(vinculos, dtype=object).reset_index(drop=True).fillna("").astype(str).str.upper()
+                   .str.findall(PADRAO_CHAVE).explode().dropna())
+        origens = citadas.index.to_numpy()
+
+        # Issues do CSV e issues citadas compartilham a mesma numeração
+        codigos_issue, nomes_issue = pd.factorize(np.concatenate([chaves.to_numpy(), citadas.to_numpy(dtype=object)]))
+        issue_da_linha = codigos_issue[:n]
+        issue_citada = codigos_issue[n:]
+
+        codigos_epic, nomes_epic = _fatorar(epics)
+        codigos_modulo, nomes_modulo = _fatorar(modulos)
+        codigos_sprint, nomes_sprint = _fatorar(sprints)
+
+        self.nomes = {"issue": np.asarray(nomes_issue, dtype=object), "epic": nomes_epic,
+                      "modulo": nomes_modulo, "sprint": nomes_sprint}
+        self.inicio = {}
+        total = 0
+        for tipo in TIPOS_NO:
+            self.inicio[tipo] = total
+            total += len(self.nomes[tipo])
+        self.total_nos = total
+
+        # Módulo de cada issue (o da primeira linha em que aparece; -1 para issues só citadas)
+        self.modulo_da_issue = np.full(len(nomes_issue), -1, dtype=np.int64)
+        self.modulo_da_issue[issue_da_linha[::-1]] = codigos_modulo[::-1]
+
+        self.arestas = {}
+        diferentes = issue_da_linha[origens] != issue_citada
+        self.vinculos = (issue_da_linha[origens][diferentes], issue_citada[diferentes])
+        self.arestas["vinculo"] = self.vinculos
+        for tipo, codigos in (("epic", codigos_epic), ("modulo", codigos_modulo), ("sprint", codigos_sprint)):
+            validos = codigos >= 0
+            self.arestas[tipo] = (issue_da_linha[validos], codigos[validos] + self.inicio[tipo])
+        self.issue_epic = (issue_da_linha[codigos_epic >= 0], codigos_epic[codigos_epic >= 0])
+
+        self.adjacencia = _adjacencia(self.arestas.values(), self.total_nos)
+
+    @classmethod
+    def de_dataframe(cls, df, colunas=COLUNAS_GRAFO):
+        """
+        Monta o grafo a partir das colunas de um DataFrame (colunas ausentes ficam sem arestas).
+        """
+        vazia = pd.Series(None, index=df.index, dtype=object)
+        valores = {papel: df[coluna] if coluna in df.columns else vazia for papel, coluna in colunas.items()}
+        return cls(valores["chave"], valores["vinculos"], valores["epic"], valores["modulo"], valores["sprint"])
+
+    def clusters(self, top=TOP_GRAFO):
+        """
+        Encontra os componentes conexos formados por Linked Issues e Epics em comum.
+
+        Retorna o número de clusters (componentes com duas ou mais issues), o número
+        de issues isoladas e os `top` maiores clusters com suas Epics, módulos
+        predominantes e exemplos de issues.
+        """
+        issues, epics = len(self.nomes["issue"]), len(self.nomes["epic"])
+        if not issues:
+            return {"total": 0, "issues_isoladas": 0, "maiores": []}
+        origem_epic, epic = self.issue_epic
+        grafo = _adjacencia([self.vinculos, (origem_epic, epic + issues)], issues + epics)
+        _, rotulos = connected_components(grafo, directed=False)
+
+        rotulos_issue = rotulos[:issues]
+        tamanhos = np.bincount(rotulos_issue, minlength=rotulos.max() + 1)
+        maiores = [c for c in np.argsort(-tamanhos, kind="stable")[:top] if tamanhos[c] > 1]
+
+        # Issues por (cluster, módulo) em uma matriz esparsa
+        com_modulo = self.modulo_da_issue >= 0
+        por_modulo = sparse.coo_matrix(
+            (np.ones(int(com_modulo.sum())), (rotulos_issue[com_modulo], self.modulo_da_issue[com_modulo])),
+            shape=(len(tamanhos), len(self.nomes["modulo"])),
+        ).tocsr()
+        epics_do_cluster = pd.Series(rotulos[issues:]).groupby(rotulos[issues:]).indices if epics else {}
+
+        resumo = []
+        for cluster in maiores:
+            linha = por_modulo.getrow(cluster)
+            modulos = sorted(zip(linha.indices, linha.data), key=lambda item: item[1], reverse=True)[:3]
+            resumo.append({
+                "issues": int(tamanhos[cluster]),
+                "epics": [self.nomes["epic"][i] for i in epics_do_cluster.get(cluster, [])[:top]],
+                "modulos": {self.nomes["modulo"][m]: int(total) for m, total in modulos},
+                "exemplos": [self.nomes["issue"][i] for i in np.flatnonzero(rotulos_issue == cluster)[:5]],
+            })
+        return {
+            "total": int((tamanhos > 1).sum()),
+            "issues_isoladas": int((tamanhos == 1).sum()),
+            "maiores": resumo,
+        }
+
+    def coocorrencia_modulos(self, top=TOP_GRAFO):
+        """
+        Calcula as matrizes módulo x módulo de Linked Issues entre módulos diferentes
+        e de Epics em comum, e retorna os `top` pares com mais vínculos.
+        """
+        total_modulos = len(self.nomes["modulo"])
+        if not total_modulos:
+            return []
+
+        # Vínculos entre issues cujos dois módulos são conhecidos
+        a, b = self.modulo_da_issue[self.vinculos[0]], self.modulo_da_issue[self.vinculos[1]]
+        conhecidos = (a >= 0) & (b >= 0)
+        vinculos = sparse.coo_matrix((np.ones(int(conhecidos.sum())), (a[conhecidos], b[conhecidos])),
+                                     shape=(total_modulos, total_modulos)).tocsr()
+        vinculos = vinculos + vinculos.T
+
+        # Epic x módulo binarizada; o produto conta as Epics com bugs nos dois módulos
+        issue, epic = self.issue_epic
+        modulos = self.modulo_da_issue[issue]
+        presenca = sparse.coo_matrix((np.ones(int((modulos >= 0).sum())), (epic[modulos >= 0], modulos[modulos >= 0])),
+                                     shape=(len(self.nomes["epic"]), total_modulos)).tocsr()
+        presenca.data[:] = 1
+        epics_em_comum = (presenca.T @ presenca).tocsr()
+
+        pares = sparse.triu(vinculos + epics_em_comum, k=1).tocoo()
+        if not pares.nnz:
+            return []
+        contagem_vinculos = np.asarray(vinculos[pares.row, pares.col]).ravel()
+        contagem_epics = np.asarray(epics_em_comum[pares.row, pares.col]).ravel()
+        ordem = np.lexsort((-contagem_epics, -contagem_vinculos))[:top]
+        return [
+            {
+                "modulos": [self.nomes["modulo"][pares.row[i]], self.nomes["modulo"][pares.col[i]]],
+                "vinculos": int(contagem_vinculos[i]),
+                "epics_em_comum": int(contagem_epics[i]),
+            }
+            for i in ordem
+        ]
+
+    def centralidade(self):
+        """
+        Calcula o PageRank de todos os nós por iteração de potência sobre a matriz esparsa.
+
+        Os valores são multiplicados pelo número de nós, de modo que 1 é a centralidade média.
+        """
+        n = self.total_nos
+        if not n:
+            return np.zeros(0)
+        graus = np.asarray(self.adjacencia.sum(axis=1)).ravel()
+        inverso = np.divide(1.0, graus, out=np.zeros(n), where=graus > 0)
+        pontuacao = np.full(n, 1.0 / n)
+        for _ in range(ITERACOES_PAGERANK):
+            sem_saida = pontuacao[graus == 0].sum()
+            nova = AMORTECIMENTO * (self.adjacencia @ (pontuacao * inverso)) + (1 - AMORTECIMENTO + AMORTECIMENTO * sem_saida) / n
+            if np.abs(nova - pontuacao).sum() < TOLERANCIA_PAGERANK:
+                pontuacao = nova
+                break
+            pontuacao = nova
+        return pontuacao * n
+
+    def hotspots(self, top=TOP_GRAFO, centralidade=None, excluir=None):
+        """
+        Retorna os `top` nós de cada tipo com maior centralidade.
+
+        `excluir` mapeia um tipo aos nomes que ficam fora do ranking (por exemplo, o
+        módulo padrão do classificador, que reúne todas as issues não classificadas).
+        """
+        centralidade = self.centralidade() if centralidade is None else centralidade
+        excluir = excluir or {}
+        rankings = {}
+        for tipo in TIPOS_NO:
+            inicio, nomes = self.inicio[tipo], self.nomes[tipo]
+            valores = centralidade[inicio:inicio + len(nomes)]
+            ordem = np.argsort(-valores, kind="stable")
+            if excluir.get(tipo):
+                ordem = ordem[~np.isin(nomes[ordem], list(excluir[tipo]))]
+            melhores = ordem[:top]
+            rankings[tipo] = {str(nomes[i]): round(float(valores[i]), 3) for i in melhores}
+        return rankings
+
+    def resumo(self, top=TOP_GRAFO, excluir=None):
+        """
+        Resume o grafo para o contexto analítico: tamanhos, clusters, coocorrências e hotspots.
+        """
+        return {
+            "nos": {tipo: len(self.nomes[tipo]) for tipo in TIPOS_NO},
+            "arestas": {tipo: len(origens) for tipo, (origens, _) in self.arestas.items()},
+            "clusters": self.clusters(top),
+            "coocorrencia_modulos": self.coocorrencia_modulos(top),
+            "hotspots": self.hotspots(top, excluir=excluir),
+        }
+
+def analisar_grafo(df, colunas=COLUNAS_GRAFO, top=TOP_GRAFO, modulo_padrao=None):
+    """
+    Monta o grafo de defeitos de um DataFrame e retorna seu resumo.
+
+    O `modulo_padrao` (o das issues não classificadas) fica fora do ranking de módulos:
+    como reúne tudo o que não foi classificado, teria sempre a maior centralidade.
+    """
+    excluir = {"modulo": {modulo_padrao}} if modulo_padrao else None
+    return GrafoDefeitos.de_dataframe(df, colunas).resumo(top, excluir)
+
+def _fatorar(valores):
+    """
+    Numera os valores distintos, com -1 para valores ausentes.
+    """
+    serie = pd.Series(valores, dtype=object).reset_index(drop=True)
+    textos = serie.fillna("").astype(str).str.strip()
+    textos = textos.where(~textos.str.lower().isin(VALORES_AUSENTES))
+    codigos, nomes = pd.factorize(textos)
+    return codigos, np.asarray(nomes, dtype=object)
+
+def _adjacencia(arestas, total):
+    """
+    Monta a matriz de adjacência CSR simétrica e binária de uma lista de (origens, destinos).
+    """
+    arestas = list(arestas)
+    origens = np.concatenate([np.asarray(o, dtype=np.int64) for o, _ in arestas]) if arestas else np.zeros(0, dtype=np.int64)
+    destinos = np.concatenate([np.asarray(d, dtype=np.int64) for _, d in arestas]) if arestas else np.zeros(0, dtype=np.int64)
+    matriz = sparse.coo_matrix((np.ones(len(origens)), (origens, destinos)), shape=(total, total)).tocsr()
+    matriz = (matriz + matriz.T).tocsr()
+    matriz.data[:] = 1
+    return matriz
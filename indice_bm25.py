@@ -0,0 +1,266 @@
+import json
+import os
+import re
+import shutil
+from collections import Counter
+import numpy as np
+
+PADRAO_TOKEN = re.compile(r"\w+")
+
+# Quantidade de segmentos a partir da qual o índice é compactado em um só
+MAX_SEGMENTOS = 8
+
+def caminho_bm25(chroma_path):
+    """
+    Retorna a pasta do índice BM25 que acompanha uma coleção Chroma.
+    """
+    return os.path.join(chroma_path, "indice_bm25")
+
+def tokenizar(texto):
+    """
+    Divide o texto em termos minúsculos, removendo o "s" final de termos com mais de 3 letras
+    (CTOs -> cto, cabos -> cabo). Siglas curtas como OLT, DIO e MAC são preservadas.
+    """
+    termos = PADRAO_TOKEN.findall(texto.lower())
+    return [termo[:-1] if len(termo) > 3 and termo.endswith("s") else termo for termo in termos]
+
+class SegmentoBM25:
+    """
+    Segmento imutável do índice: listas invertidas em formato CSR (indptr, docs, tfs).
+
+    Os arrays são gravados em .npy e abertos com mmap, de modo que carregar o índice
+    não exige ler as listas invertidas para a memória.
+    """
+
+    def __init__(self, vocabulario, indptr, docs, tfs, comprimentos, ids):
+        self.vocabulario = vocabulario
+        self.indptr = indptr
+        self.docs = docs
+        self.tfs = tfs
+        self.comprimentos = comprimentos
+        self.ids = ids
+
+    @classmethod
+    def construir(cls, ids, textos):
+        """
+        Monta um segmento a partir de uma lista de IDs e textos.
+        """
+        postagens = {}
+        comprimentos = np.zeros(len(ids), dtype=np.int32)
+        for numero, texto in enumerate(textos):
+            termos = tokenizar(texto)
+            comprimentos[numero] = len(termos)
+            for termo, frequencia in Counter(termos).items():
+                postagens.setdefault(termo, []).append((numero, frequencia))
+        return cls.de_postagens(postagens, comprimentos, ids)
+
+    @classmethod
+    def de_postagens(cls, postagens, comprimentos, ids):
+        """
+        Monta um segmento a partir de {termo: [(número do documento, frequência), ...]}.
+        """
+        vocabulario = {termo: linha for linha, termo in enumerate(sorted(postagens))}
+        indptr = np.zeros(len(vocabulario) + 1, dtype=np.int64)
+        docs, tfs = [], []
+        for termo, linha in vocabulario.items():
+            lista = postagens[termo]
+            indptr[linha + 1] = indptr[linha] + len(lista)
+            docs.extend(numero for numero, _ in lista)
+            tfs.extend(frequencia for _, frequencia in lista)
+        tfs = np.minimum(np.array(tfs, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16)
+        return cls(vocabulario, indptr, np.array(docs, dtype=np.int32), tfs,
+                   np.asarray(comprimentos, dtype=np.int32), list(ids))
+
+    def salvar(self, pasta):
+        os.makedirs(pasta, exist_ok=True)
+        for nome in ("indptr", "docs", "tfs", "comprimentos"):
+            np.save(os.path.join(pasta, f"{nome}.npy"), getattr(self, nome))
+        with open(os.path.join(pasta, "vocabulario.json"), 'w', encoding='utf-8') as f:
+            json.dump({"vocabulario": self.vocabulario, "ids": self.ids}, f, ensure_ascii=False)
+
+    @classmethod
+    def carregar(cls, pasta):
+        arrays = {nome: np.load(os.path.join(pasta, f"{nome}.npy"), mmap_mode='r')
+                  for nome in ("indptr", "docs", "tfs", "comprimentos")}
+        with open(os.path.join(pasta, "vocabulario.json"), 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        return cls(dados["vocabulario"], ids=dados["ids"], **arrays)
+
+    def postagens(self, termo):
+        linha = self.vocabulario.get(termo)
+        if linha is None:
+            return None, None
+        inicio, fim = self.indptr[linha], self.indptr[linha + 1]
+        return self.docs[inicio:fim], self.tfs[inicio:fim]
+
+class IndiceBM25:
+    """
+    Índice lexical BM25 construído de forma incremental ao lado da coleção Chroma.
+
+    Cada ingestão grava um novo segmento; documentos atualizados ou removidos são
+    marcados como apagados no segmento antigo. Quando há mais de MAX_SEGMENTOS
+    segmentos, todos são compactados em um só.
+    """
+
+    def __init__(self, pasta, k1=1.2, b=0.75):
+        self.pasta = pasta
+        self.k1 = k1
+        self.b = b
+        self.segmentos = []
+        self.nomes_segmentos = []
+        self.apagados = []
+        self.localizacao = {}
+        self._pendentes = {}
+
+    @classmethod
+    def carregar(cls, pasta, **parametros):
+        """
+        Abre o índice salvo na pasta (vazio se ainda não existir).
+        """
+        indice = cls(pasta, **parametros)
+        manifesto = os.path.join(pasta, "manifesto.json")
+        if os.path.exists(manifesto):
+            with open(manifesto, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            for nome, apagados in zip(dados["segmentos"], dados["apagados"]):
+                indice._anexar_segmento(nome, SegmentoBM25.carregar(os.path.join(pasta, nome)), set(apagados))
+        return indice
+
+    def __len__(self):
+        return len(self.localizacao) + sum(1 for id_ in self._pendentes if id_ not in self.localizacao)
+
+    def adicionar(self, documentos):
+        """
+        Adiciona ou substitui documentos (usa metadata["id"] e page_content).
+        """
+        for documento in documentos:
+            self._pendentes[documento.metadata["id"]] = documento.page_content
+
+    def remover(self, ids):
+        for id_ in ids:
+            self._pendentes.pop(id_, None)
+            self._apagar(id_)
+
+    def salvar(self):
+        """
+        Grava os documentos pendentes como um novo segmento e atualiza o manifesto.
+        """
+        if self._pendentes:
+            for id_ in self._pendentes:
+                self._apagar(id_)
+            segmento = SegmentoBM25.construir(list(self._pendentes), list(self._pendentes.values()))
+            nome = self._proximo_nome()
+            segmento.salvar(os.path.join(self.pasta, nome))
+            self._anexar_segmento(nome, segmento, set())
+            self._pendentes = {}
+
+        if len(self.segmentos) > MAX_SEGMENTOS:
+            self.compactar()
+        self._gravar_manifesto()
+
+    def compactar(self):
+        """
+        Junta todos os segmentos em um só, descartando os documentos apagados.
+        """
+        # Renumera os documentos vivos de cada segmento na ordem em que aparecem
+        ids, comprimentos, renumeracoes = [], [], []
+        for segmento, apagados in zip(self.segmentos, self.apagados):
+            vivos = np.ones(len(segmento.ids), dtype=bool)
+            vivos[list(apagados)] = False
+            renumeracao = np.full(len(segmento.ids), -1, dtype=np.int64)
+            renumeracao[vivos] = np.arange(len(ids), len(ids) + int(vivos.sum()))
+            renumeracoes.append(renumeracao)
+            ids.extend(id_ for id_, vivo in zip(segmento.ids, vivos) if vivo)
+            comprimentos.append(np.asarray(segmento.comprimentos)[vivos])
+
+        postagens = {}
+        for segmento, renumeracao in zip(self.segmentos, renumeracoes):
+            for termo in segmento.vocabulario:
+                docs, tfs = segmento.postagens(termo)
+                novos = renumeracao[np.asarray(docs)]
+                mantidos = novos >= 0
+                if mantidos.any():
+                    postagens.setdefault(termo, []).extend(zip(novos[mantidos].tolist(), np.asarray(tfs)[mantidos].tolist()))
+        segmento = SegmentoBM25.de_postagens(postagens, np.concatenate(comprimentos) if comprimentos else [], ids)
+
+        nome = self._proximo_nome()
+        antigos = list(self.nomes_segmentos)
+        self.segmentos, self.nomes_segmentos, self.apagados, self.localizacao = [], [], [], {}
+        segmento.salvar(os.path.join(self.pasta, nome))
+        self._anexar_segmento(nome, segmento, set())
+        self._gravar_manifesto()
+        for antigo in antigos:
+            shutil.rmtree(os.path.join(self.pasta, antigo), ignore_errors=True)
+
+    def buscar(self, consulta, k=50):
+        """
+        Retorna os k documentos com maior pontuação BM25 como lista de (id, pontuação).
+        """
+        termos = tokenizar(consulta)
+        if not termos or not self.segmentos:
+            return []
+
+        # Documentos apagados continuam nos segmentos até a compactação, mas não entram
+        # em N, no comprimento médio nem na frequência de documentos de cada termo
+        vivos = []
+        for segmento, apagados in zip(self.segmentos, self.apagados):
+            mascara = np.ones(len(segmento.ids), dtype=bool)
+            mascara[list(apagados)] = False
+            vivos.append(mascara)
+        total_docs = sum(int(mascara.sum()) for mascara in vivos)
+        if not total_docs:
+            return []
+        media_comprimento = sum(float(np.sum(np.asarray(segmento.comprimentos)[mascara]))
+                                for segmento, mascara in zip(self.segmentos, vivos)) / total_docs
+
+        frequencias_docs = Counter()
+        for termo in set(termos):
+            for segmento, mascara in zip(self.segmentos, vivos):
+                docs, _ = segmento.postagens(termo)
+                if docs is not None:
+                    frequencias_docs[termo] += int(mascara[np.asarray(docs)].sum())
+
+        candidatos = []
+        for segmento, apagados in zip(self.segmentos, self.apagados):
+            pontuacoes = np.zeros(len(segmento.ids), dtype=np.float32)
+            normalizacao = self.k1 * (1 - self.b + self.b * np.asarray(segmento.comprimentos) / media_comprimento)
+            for termo, repeticoes in Counter(termos).items():
+                docs, tfs = segmento.postagens(termo)
+                if docs is None:
+                    continue
+                n = frequencias_docs[termo]
+                idf = np.log(1 + (total_docs - n + 0.5) / (n + 0.5))
+                tfs = np.asarray(tfs, dtype=np.float32)
+                pontuacoes[docs] += repeticoes * idf * tfs * (self.k1 + 1) / (tfs + normalizacao[docs])
+            if apagados:
+                pontuacoes[list(apagados)] = 0
+            melhores = np.argsort(-pontuacoes)[:k]
+            candidatos.extend((segmento.ids[numero], float(pontuacoes[numero])) for numero in melhores if pontuacoes[numero] > 0)
+
+        candidatos.sort(key=lambda item: item[1], reverse=True)
+        return candidatos[:k]
+
+    def _anexar_segmento(self, nome, segmento, apagados):
+        indice_segmento = len(self.segmentos)
+        self.segmentos.append(segmento)
+        self.nomes_segmentos.append(nome)
+        self.apagados.append(apagados)
+        for numero, id_ in enumerate(segmento.ids):
+            if numero not in apagados:
+                self.localizacao[id_] = (indice_segmento, numero)
+
+    def _apagar(self, id_):
+        local = self.localizacao.pop(id_, None)
+        if local is not None:
+            self.apagados[local[0]].add(local[1])
+
+    def _proximo_nome(self):
+        numeros = [int(nome.rsplit("_", 1)[1]) for nome in self.nomes_segmentos]
+        return f"segmento_{max(numeros, default=-1) + 1:05d}"
+
+    def _gravar_manifesto(self):
+        os.makedirs(self.pasta, exist_ok=True)
+        temporario = os.path.join(self.pasta, "manifesto.json.tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({"segmentos": self.nomes_segmentos, "apagados": [sorted(a) for a in self.apagados]}, f)
+        os.replace(temporario, os.path.join(self.pasta, "manifesto.json"))
@@ -0,0 +1,142 @@
+import json
+import os
+import re
+
+# Campos de metadados indexados e como cada valor é dividido em termos
+CAMPOS_INDEXADOS = ["id", "epic_link", "sprint", "reporter", "linked_issues", "status", "epic_name"]
+PADRAO_CHAVE = re.compile(r"\b[A-Za-z][A-Za-z0-9]*-\d+\b")
+PADRAO_SPRINT = re.compile(r"\bsprint\s*(\d+)", re.IGNORECASE)
+
+# Padrões do roteador: (campo, expressão). A ordem define a prioridade.
+PADROES_CONSULTA = [
+    ("epic_link", re.compile(r"\bepic\s*link\s+([A-Za-z][A-Za-z0-9]*-\d+)", re.IGNORECASE)),
+    ("linked_issues", re.compile(r"\blinked\s*issues?\s+([A-Za-z][A-Za-z0-9]*-\d+)", re.IGNORECASE)),
+    ("id", re.compile(r"\bkey\s+([A-Za-z][A-Za-z0-9]*-\d+)", re.IGNORECASE)),
+    ("sprint", re.compile(r"\bsprint\s+(\d+)\b", re.IGNORECASE)),
+    ("reporter", re.compile(r"\breporter\s+([A-ZÀ-Ý][\w'-]+(?:\s+(?:d[aeo]s?\s+)?[A-ZÀ-Ý][\w'-]+)*)")),
+]
+
+def caminho_indice(chroma_path):
+    """
+    Retorna o caminho do índice de metadados que acompanha uma coleção Chroma.
+    """
+    return os.path.join(chroma_path, "indice_metadados.json")
+
+def extrair_filtros(pergunta):
+    """
+    Retorna os filtros estruturados (campo, valor) reconhecidos na pergunta.
+    """
+    return [(campo, valor) for campo, padrao in PADROES_CONSULTA for valor in padrao.findall(pergunta)]
+
+def termos_do_campo(campo, valor):
+    """
+    Normaliza o valor de um metadado nos termos usados pelo índice.
+    """
+    if not isinstance(valor, str) or not valor.strip():
+        return []
+    if campo == "linked_issues":
+        return [chave.lower() for chave in PADRAO_CHAVE.findall(valor)]
+    if campo == "sprint":
+        numeros = PADRAO_SPRINT.findall(valor)
+        return numeros or [valor.strip().lower()]
+    return [valor.strip().lower()]
+
+class IndiceMetadados:
+    """
+    Índice invertido (campo -> termo -> IDs) sobre os metadados dos documentos ingeridos.
+    """
+
+    def __init__(self):
+        self.campos = {campo: {} for campo in CAMPOS_INDEXADOS}
+        self.documentos = {}
+
+    def adicionar(self, documentos):
+        """
+        Indexa (ou reindexa) documentos a partir de seus metadados.
+        """
+        self.adicionar_metadados([documento.metadata for documento in documentos])
+
+    def adicionar_metadados(self, metadatas):
+        """
+        Indexa (ou reindexa) uma lista de dicionários de metadados com o campo "id".
+        """
+        for metadata in metadatas:
+            id_ = metadata["id"]
+            if id_ in self.documentos:
+                self.remover([id_])
+            termos = {campo: termos_do_campo(campo, metadata.get(campo)) for campo in CAMPOS_INDEXADOS}
+            termos = {campo: lista for campo, lista in termos.items() if lista}
+            for campo, lista in termos.items():
+                for termo in lista:
+                    self.campos[campo].setdefault(termo, set()).add(id_)
+            self.documentos[id_] = termos
+
+    def remover(self, ids):
+        """
+        Remove documentos do índice.
+        """
+        for id_ in ids:
+            for campo, lista in self.documentos.pop(id_, {}).items():
+                for termo in lista:
+                    postagens = self.campos[campo].get(termo, set())
+                    postagens.discard(id_)
+                    if not postagens:
+                        self.campos[campo].pop(termo, None)
+
+    def buscar(self, campo, valor):
+        """
+        Retorna os IDs com o termo no campo. Para reporter, aceita nomes parciais.
+        """
+        termo = valor.strip().lower()
+        if campo == "reporter" and termo not in self.campos[campo]:
+            palavras = termo.split()
+            ids = []
+            for nome, postagens in self.campos[campo].items():
+                if all(palavra in nome.split() for palavra in palavras):
+                    ids.extend(postagens)
+            return ids
+        return list(self.campos[campo].get(termo, ()))
+
+    def rotear(self, pergunta):
+        """
+        Detecta filtros estruturados na pergunta e retorna (filtros, IDs que satisfazem todos).
+
+        Retorna ([], None) quando a pergunta não tem filtros reconhecidos.
+        """
+        filtros = extrair_filtros(pergunta)
+        if not filtros:
+            return [], None
+
+        ids = None
+        for campo in dict.fromkeys(campo for campo, _ in filtros):
+            encontrados = set()
+            for valor in (valor for c, valor in filtros if c == campo):
+                encontrados.update(self.buscar(campo, valor))
+            ids = encontrados if ids is None else ids & encontrados
+        return filtros, sorted(ids)
+
+    def salvar(self, caminho):
+        """
+        Grava o índice em JSON de forma atômica.
+        """
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        temporario = caminho + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            campos = {campo: {termo: sorted(ids) for termo, ids in termos.items()} for campo, termos in self.campos.items()}
+            json.dump({"campos": campos, "documentos": self.documentos}, f, ensure_ascii=False)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        """
+        Carrega o índice salvo, ou retorna None se não existir.
+        """
+        if not os.path.exists(caminho):
+            return None
+        with open(caminho, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        indice = cls()
+        for campo, termos in dados["campos"].items():
+            indice.campos[campo] = {termo: set(ids) for termo, ids in termos.items()}
+        indice.documentos = dados["documentos"]
+        return indice
@@ -0,0 +1,230 @@
+import json
+import os
+import numpy as np
+
+# Tipos de quantização aceitos e linhas processadas por bloco na varredura. Cada bloco
+# é convertido para float32 em um único buffer reaproveitado: 4096 linhas ocupam 16 MB
+# em dimensão 1024, de modo que a memória da busca não cresce com a coleção
+TIPOS_QUANTIZACAO = {"float16": np.float16, "int8": np.int8}
+LINHAS_POR_BLOCO = 4096
+
+# Fração de linhas apagadas a partir da qual os arquivos são reescritos sem elas
+LIMITE_APAGADOS = 0.2
+
+# Candidatos da busca quantizada por resultado final, re-ranqueados em float32
+FATOR_CANDIDATOS = 4
+
+def caminho_quantizado(chroma_path):
+    """
+    Retorna a pasta do índice quantizado que acompanha uma coleção Chroma.
+    """
+    return os.path.join(chroma_path, "indice_quantizado")
+
+class IndiceQuantizado:
+    """
+    Índice vetorial compacto (float16 ou int8) mantido ao lado da coleção Chroma.
+
+    Os vetores quantizados ficam em um arquivo binário mapeado em memória e só
+    recebem linhas novas no final; vetores atualizados são regravados no lugar e
+    os removidos, marcados como apagados. No int8, cada vetor tem sua escala
+    (máximo absoluto / 127). A busca varre o arquivo em blocos com a distância L2
+    aproximada e devolve candidatos para o re-ranqueamento em float32.
+    """
+
+    def __init__(self, pasta, tipo="int8"):
+        if tipo not in TIPOS_QUANTIZACAO:
+            raise ValueError(f"Quantização desconhecida: {tipo}")
+        self.pasta = pasta
+        self.tipo = tipo
+        self.dimensao = None
+        self.ids = []
+        self.linha = {}
+        self.apagados = set()
+        self._pendentes = {}
+
+    @classmethod
+    def carregar(cls, pasta):
+        """
+        Abre o índice salvo na pasta, ou retorna None se não existir.
+        """
+        manifesto = os.path.join(pasta, "manifesto.json")
+        if not os.path.exists(manifesto):
+            return None
+        with open(manifesto, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        indice = cls(pasta, dados["tipo"])
+        indice.dimensao = dados["dimensao"]
+        indice.ids = dados["ids"]
+        indice.apagados = set(dados["apagados"])
+        indice.linha = {id_: linha for linha, id_ in enumerate(indice.ids) if linha not in indice.apagados}
+        return indice
+
+    def __len__(self):
+        return len(self.linha) + sum(1 for id_ in self._pendentes if id_ not in self.linha)
+
+    def adicionar(self, ids, embeddings):
+        """
+        Adiciona ou substitui vetores (gravados em disco em salvar).
+        """
+        for id_, vetor in zip(ids, embeddings):
+            self._pendentes[id_] = vetor
+
+    def remover(self, ids):
+        for id_ in ids:
+            self._pendentes.pop(id_, None)
+            linha = self.linha.pop(id_, None)
+            if linha is not None:
+                self.apagados.add(linha)
+
+    def salvar(self, manifesto=True):
+        """
+        Grava os vetores pendentes: substituições no lugar e vetores novos no final dos arquivos.
+
+        Com manifesto=False, só os arquivos binários são gravados (usado a cada lote da
+        ingestão, para não acumular vetores em memória); os IDs passam a valer quando o
+        manifesto é gravado.
+        """
+        os.makedirs(self.pasta, exist_ok=True)
+        if self._pendentes:
+            ids = list(self._pendentes)
+            matriz = np.asarray(list(self._pendentes.values()), dtype=np.float32)
+            self.dimensao = self.dimensao or matriz.shape[1]
+            if matriz.shape[1] != self.dimensao:
+                raise ValueError(f"Dimensão {matriz.shape[1]} diferente da do índice quantizado ({self.dimensao}).")
+            codigos, escalas = self.quantizar(matriz)
+            normas = np.einsum("ij,ij->i", matriz, matriz).astype(np.float32)
+
+            existentes = [i for i, id_ in enumerate(ids) if id_ in self.linha]
+            if existentes:
+                linhas = [self.linha[ids[i]] for i in existentes]
+                vetores, escalas_mmap, normas_mmap = self._abrir('r+')
+                vetores[linhas], escalas_mmap[linhas], normas_mmap[linhas] = codigos[existentes], escalas[existentes], normas[existentes]
+                vetores.flush(), escalas_mmap.flush(), normas_mmap.flush()
+
+            novos = [i for i, id_ in enumerate(ids) if id_ not in self.linha]
+            if novos:
+                for nome, valores in (("vetores.bin", codigos[novos]), ("escalas.bin", escalas[novos]), ("normas.bin", normas[novos])):
+                    with open(os.path.join(self.pasta, nome), 'ab') as f:
+                        # Descarta linhas de uma gravação interrompida que não chegaram ao manifesto
+                        f.truncate(len(self.ids) * valores.itemsize * (valores.size // len(valores)))
+                        f.write(np.ascontiguousarray(valores).tobytes())
+                for i in novos:
+                    self.linha[ids[i]] = len(self.ids)
+                    self.ids.append(ids[i])
+            self._pendentes = {}
+
+        if manifesto:
+            if self.ids and len(self.apagados) > LIMITE_APAGADOS * len(self.ids):
+                self._compactar()
+            self._gravar_manifesto()
+
+    def quantizar(self, matriz):
+        """
+        Converte vetores float32 em (códigos, escalas) no tipo do índice.
+        """
+        if self.tipo == "float16":
+            return matriz.astype(np.float16), np.ones(len(matriz), dtype=np.float32)
+        escalas = np.abs(matriz).max(axis=1) / 127
+        escalas = np.where(escalas > 0, escalas, 1).astype(np.float32)
+        return np.clip(np.rint(matriz / escalas[:, None]), -127, 127).astype(np.int8), escalas
+
+    def buscar(self, vetores_consulta, candidatos=100):
+        """
+        Retorna, para cada consulta, os `candidatos` IDs mais próximos pela distância
+        L2 ao quadrado aproximada, como lista de (ID, distância aproximada).
+        """
+        consultas = np.asarray(vetores_consulta, dtype=np.float32)
+        if not self.linha or consultas.size == 0:
+            return [[] for _ in range(len(consultas))]
+
+        vetores, escalas, normas = self._abrir('r')
+        normas_consulta = np.einsum("ij,ij->i", consultas, consultas)
+        apagados = np.fromiter(self.apagados, dtype=np.int64, count=len(self.apagados))
+        melhores_distancias = np.full((len(consultas), 0), np.inf, dtype=np.float32)
+        melhores_linhas = np.zeros((len(consultas), 0), dtype=np.int64)
+        buffer = np.empty((min(LINHAS_POR_BLOCO, len(self.ids)), vetores.shape[1]), dtype=np.float32)
+
+        for inicio in range(0, len(self.ids), LINHAS_POR_BLOCO):
+            codigos = vetores[inicio:inicio + LINHAS_POR_BLOCO]
+            bloco = buffer[:len(codigos)]
+            np.copyto(bloco, codigos, casting="unsafe")
+            distancias = (normas_consulta[:, None] - 2 * (consultas @ bloco.T) * escalas[inicio:inicio + len(bloco)]
+                          + normas[inicio:inicio + len(bloco)])
+            dentro = apagados[(apagados >= inicio) & (apagados < inicio + len(bloco))] - inicio
+            distancias[:, dentro] = np.inf
+
+            distancias = np.concatenate([melhores_distancias, distancias], axis=1)
+            linhas = np.concatenate([melhores_linhas, np.broadcast_to(np.arange(inicio, inicio + len(bloco)), (len(consultas), len(bloco)))], axis=1)
+            if distancias.shape[1] > candidatos:
+                selecionados = np.argpartition(distancias, candidatos - 1, axis=1)[:, :candidatos]
+                distancias = np.take_along_axis(distancias, selecionados, axis=1)
+                linhas = np.take_along_axis(linhas, selecionados, axis=1)
+            melhores_distancias, melhores_linhas = distancias, linhas
+
+        resultados = []
+        for distancias, linhas in zip(melhores_distancias, melhores_linhas):
+            ordem = np.argsort(distancias)
+            resultados.append([(self.ids[linhas[i]], float(distancias[i])) for i in ordem if np.isfinite(distancias[i])])
+        return resultados
+
+    def tamanho_bytes(self):
+        """
+        Retorna o tamanho em disco dos arquivos do índice.
+        """
+        return sum(
+            os.path.getsize(os.path.join(self.pasta, nome))
+            for nome in ("vetores.bin", "escalas.bin", "normas.bin", "manifesto.json")
+            if os.path.exists(os.path.join(self.pasta, nome))
+        )
+
+    def _abrir(self, modo):
+        linhas = len(self.ids)
+        tipo = TIPOS_QUANTIZACAO[self.tipo]
+        return (
+            np.memmap(os.path.join(self.pasta, "vetores.bin"), dtype=tipo, mode=modo, shape=(linhas, self.dimensao)),
+            np.memmap(os.path.join(self.pasta, "escalas.bin"), dtype=np.float32, mode=modo, shape=(linhas,)),
+            np.memmap(os.path.join(self.pasta, "normas.bin"), dtype=np.float32, mode=modo, shape=(linhas,)),
+        )
+
+    def _compactar(self):
+        vivos = np.array(sorted(self.linha.values()), dtype=np.int64)
+        vetores, escalas, normas = (np.array(arquivo[vivos]) for arquivo in self._abrir('r'))
+        for nome, valores in (("vetores.bin", vetores), ("escalas.bin", escalas), ("normas.bin", normas)):
+            temporario = os.path.join(self.pasta, nome + ".tmp")
+            with open(temporario, 'wb') as f:
+                f.write(np.ascontiguousarray(valores).tobytes())
+            os.replace(temporario, os.path.join(self.pasta, nome))
+        self.ids = [self.ids[linha] for linha in vivos]
+        self.linha = {id_: linha for linha, id_ in enumerate(self.ids)}
+        self.apagados = set()
+
+    def _gravar_manifesto(self):
+        temporario = os.path.join(self.pasta, "manifesto.json.tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({"tipo": self.tipo, "dimensao": self.dimensao, "ids": self.ids, "apagados": sorted(self.apagados)}, f)
+        os.replace(temporario, os.path.join(self.pasta, "manifesto.json"))
+
+def reranquear(colecao, vetores_consulta, candidatos, k):
+    """
+    Re-ranqueia os candidatos de cada consulta pela distância L2 ao quadrado exata,
+    com os vetores float32 da coleção Chroma (lidos só para os candidatos).
+
+    Retorna, por consulta, até k tuplas (ID, documento, metadados, distância).
+    """
+    ids = list(dict.fromkeys(id_ for lista in candidatos for id_, _ in lista))
+    if not ids:
+        return [[] for _ in candidatos]
+    itens = colecao.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+    posicao = {id_: i for i, id_ in enumerate(itens["ids"])}
+    matriz = np.asarray(itens["embeddings"], dtype=np.float32)
+
+    resultados = []
+    for vetor, lista in zip(np.asarray(vetores_consulta, dtype=np.float32), candidatos):
+        linhas = [posicao[id_] for id_, _ in lista if id_ in posicao]
+        diferencas = matriz[linhas] - vetor
+        distancias = np.einsum("ij,ij->i", diferencas, diferencas)
+        resultados.append([
+            (itens["ids"][linhas[i]], itens["documents"][linhas[i]], itens["metadatas"][linhas[i]], float(distancias[i]))
+            for i in np.argsort(distancias)[:k]
+        ])
+    return resultados
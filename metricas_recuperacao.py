@@ -0,0 +1,123 @@
+import re
+import numpy as np
+import pandas as pd
+
+def padrao_chaves(relevant_keys):
+    """
+    Monta a expressão que encontra qualquer uma das chaves relevantes (sem diferenciar maiúsculas).
+    """
+    return "|".join(re.escape(chave.lower()) for chave in relevant_keys)
+
+def matriz_relevancia(listas_documentos, listas_chaves, k):
+    """
+    Retorna (relevância, válidos): matrizes booleanas (consultas x k) indicando se o
+    documento de cada posição contém alguma chave relevante da consulta e se a
+    posição foi preenchida.
+
+    Todos os documentos são verificados de uma vez, com uma busca vetorizada por
+    conjunto distinto de chaves.
+    """
+    n = len(listas_documentos)
+    relevancia = np.zeros((n, k), dtype=bool)
+    validos = np.zeros((n, k), dtype=bool)
+
+    linhas, posicoes, textos, grupos = [], [], [], []
+    codigos = {}
+    for i, (documentos, chaves) in enumerate(zip(listas_documentos, listas_chaves)):
+        documentos = list(documentos)[:k]
+        codigo = codigos.setdefault(tuple(chaves), len(codigos))
+        linhas.extend([i] * len(documentos))
+        posicoes.extend(range(len(documentos)))
+        textos.extend(documentos)
+        grupos.extend([codigo] * len(documentos))
+    if not textos:
+        return relevancia, validos
+
+    linhas, posicoes, grupos = np.array(linhas), np.array(posicoes), np.array(grupos)
+    validos[linhas, posicoes] = True
+    textos = pd.Series(textos, dtype=object).str.lower()
+    for chaves, codigo in codigos.items():
+        indices = np.flatnonzero(grupos == codigo)
+        if chaves and len(indices):
+            encontrados = textos.iloc[indices].str.contains(padrao_chaves(chaves), regex=True).to_numpy(dtype=bool)
+            relevancia[linhas[indices], posicoes[indices]] = encontrados
+    return relevancia, validos
+
+def contar_relevantes(corpus, listas_chaves):
+    """
+    Conta, para cada consulta, os documentos do corpus que contêm alguma de suas chaves.
+    """
+    textos = pd.Series(list(corpus), dtype=object).str.lower()
+    contagens = {}
+    for chaves in set(map(tuple, listas_chaves)):
+        contagens[chaves] = int(textos.str.contains(padrao_chaves(chaves), regex=True).sum()) if chaves else 0
+    return np.array([contagens[tuple(chaves)] for chaves in listas_chaves])
+
+def metricas_por_consulta(relevancia, validos, total_relevantes=None):
+    """
+    Calcula precision@k, recall@k, F1, MRR, nDCG@k e AP@k para cada consulta.
+
+    A precisão divide os acertos pelas posições preenchidas (até k). O recall usa
+    `total_relevantes` (documentos relevantes no corpus inteiro); sem ele, usa os
+    relevantes entre os recuperados. Retorna um dicionário de arrays.
+    """
+    k = relevancia.shape[1]
+    relevancia = relevancia & validos
+    acertos = relevancia.sum(axis=1)
+    recuperados = validos.sum(axis=1)
+    if total_relevantes is None:
+        total_relevantes = acertos
+    total_relevantes = np.maximum(np.asarray(total_relevantes), acertos)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precisao = np.where(recuperados > 0, acertos / recuperados, 0.0)
+        recall = np.where(total_relevantes > 0, acertos / total_relevantes, 0.0)
+        f1 = np.where(precisao + recall > 0, 2 * precisao * recall / (precisao + recall), 0.0)
+
+        posicoes = np.arange(1, k + 1)
+        primeiro = np.where(acertos > 0, relevancia.argmax(axis=1) + 1, 0)
+        mrr = np.where(primeiro > 0, 1.0 / np.maximum(primeiro, 1), 0.0)
+
+        descontos = 1.0 / np.log2(posicoes + 1)
+        dcg = (relevancia * descontos).sum(axis=1)
+        ideais = np.minimum(total_relevantes, k)
+        idcg = np.concatenate([[0.0], np.cumsum(descontos)])[ideais]
+        ndcg = np.where(idcg > 0, dcg / idcg, 0.0)
+
+        precisao_na_posicao = np.cumsum(relevancia, axis=1) / posicoes
+        ap = np.where(ideais > 0, (precisao_na_posicao * relevancia).sum(axis=1) / np.maximum(ideais, 1), 0.0)
+
+    return {
+        "precision_at_k": precisao,
+        "recall_at_k": recall,
+        "f1_score": f1,
+        "mrr": mrr,
+        "ndcg_at_k": ndcg,
+        "average_precision": ap,
+    }
+
+def avaliar_lote(listas_documentos, listas_chaves, ks=(20,), total_relevantes=None):
+    """
+    Avalia um lote de consultas para cada k em `ks`.
+
+    Retorna {k: {métrica: array por consulta}}. A matriz de relevância é montada uma
+    única vez, para o maior k, e reaproveitada nos menores.
+    """
+    maior = max(ks)
+    relevancia, validos = matriz_relevancia(listas_documentos, listas_chaves, maior)
+    return {k: metricas_por_consulta(relevancia[:, :k], validos[:, :k], total_relevantes) for k in ks}
+
+def medias(metricas):
+    """
+    Reduz as métricas por consulta às médias do lote (MAP, MRR, etc.).
+    """
+    return {nome: float(np.mean(valores)) if len(valores) else 0.0 for nome, valores in metricas.items()}
+
+def metricas_da_consulta(documentos, relevant_keys, k=None, total_relevantes=None):
+    """
+    Calcula as métricas de uma única consulta, no formato gravado nas interações.
+    """
+    k = k or max(len(documentos), 1)
+    totais = None if total_relevantes is None else [total_relevantes]
+    metricas = avaliar_lote([documentos], [relevant_keys], (k,), totais)[k]
+    return {"k": k, **{nome: float(valores[0]) for nome, valores in metricas.items()}}
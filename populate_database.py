@@ -1,10 +1,21 @@
 import argparse
+import hashlib
+import json
 import os
 import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from langchain.schema import Document
 from langchain.vectorstores import Chroma
 from get_embeddings_function import get_embedding_function
+from backends_embeddings import verificar_assinatura
+from indice_metadados import IndiceMetadados, caminho_indice
+from indice_bm25 import IndiceBM25, caminho_bm25
+from indice_quantizado import TIPOS_QUANTIZACAO, IndiceQuantizado, caminho_quantizado
+from cache_recuperacao import gravar_versao_colecao
+from topicos import atualizar_topicos, exportar_topicos
+from duplicatas import LIMIAR_SIMILARIDADE, carregar_colapsados, detectar_duplicatas_novas, salvar_colapsados
 from langchain.text_splitter import CharacterTextSplitter
 from langchain.retrievers.self_query.base import SelfQueryRetriever
 from langchain.chains.query_constructor.base import AttributeInfo
@@ -12,6 +23,28 @@ from langchain.chains.query_constructor.base import AttributeInfo
 # Caminhos do banco de dados e dos dados
 CHROMA_PATH = "C:/Users/pedro/OneDrive/Documentos/basesdedefeitos/chroma_db"
 DATA_PATH = "C:/Users/pedro/OneDrive/Documentos/basesdedefeitos/jirabugs.csv"
+CHECKPOINT_PATH = os.path.join(CHROMA_PATH, "checkpoint_ingestao.json")
+INDICE_METADADOS_PATH = caminho_indice(CHROMA_PATH)
+INDICE_BM25_PATH = caminho_bm25(CHROMA_PATH)
+INDICE_QUANTIZADO_PATH = caminho_quantizado(CHROMA_PATH)
+
+# Parâmetros da ingestão em lotes
+BATCH_SIZE = 256
+CSV_CHUNKSIZE = 10_000
+
+# Campos de metadados extraídos do CSV e valor usado quando a coluna não existe
+METADATA_COLUMNS = {
+    "id": ("Key", None),
+    "status": ("Status", "Unknown"),
+    "created": ("Created", "Unknown"),
+    "linked_issues": ("Linked Issues", "None"),
+    "development": ("Development", "None"),
+    "epic_link": ("Epic Link", "None"),
+    "reporter": ("Reporter", "Unknown"),
+    "epic_name": ("Epic Name", "Unknown"),
+    "sprint": ("Sprint", "None"),
+}
+CSV_COLUMNS = {"Summary", "Epic Link", "Reporter"} | {coluna for coluna, _ in METADATA_COLUMNS.values()}
 
 # Definição dos metadados utilizados para a filtragem
 METADATA_FIELD_INFO = [
@@ -27,58 +60,74 @@ def main():
     """
     parser = argparse.ArgumentParser()
     parser.add_argument("--reset", action="store_true", help="Resetar o banco de dados.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Documentos por lote de embeddings.")
+    parser.add_argument("--workers", type=int, default=0, help="Processos para calcular embeddings (0 = processo atual).")
+    parser.add_argument("--sync", action="store_true", help="Sincronizar alterações: reprocessa apenas documentos modificados e remove os ausentes no CSV.")
+    parser.add_argument("--colapsar-duplicatas", action="store_true", help="Remover quase duplicatas dos documentos novos, mantendo um representante por cluster.")
+    parser.add_argument("--limiar-duplicatas", type=float, default=LIMIAR_SIMILARIDADE, help="Similaridade de cosseno mínima entre quase duplicatas.")
+    parser.add_argument("--topicos", action="store_true", help="Atualizar os tópicos (k-means) com os documentos novos e exportá-los para o contexto analítico.")
+    parser.add_argument("--vetores-compactos", choices=sorted(TIPOS_QUANTIZACAO), help="Manter um índice quantizado dos vetores (float16 ou int8) para a busca densa.")
     args = parser.parse_args()
 
     if args.reset:
         print("✨ Limpando o banco de dados...")
         clear_database()
 
-    print("📥 Carregando documentos do CSV...")
+    print("📥 Carregando documentos do CSV em blocos...")
     documents = load_documents_from_csv()
-    print(f"📝 Total de documentos carregados: {len(documents)}")
 
     print("➖ Dividindo documentos em chunks...")
     chunks = split_documents(documents)
 
     print("➕ Adicionando chunks ao banco de dados...")
-    add_to_chroma(chunks)
-
-def load_documents_from_csv():
-    """
-    Carrega documentos do CSV, aplicando pré-processamento e enriquecimento de metadados.
-    """
-    print("📥 Carregando documentos do CSV...")
-    df = pd.read_csv(DATA_PATH)
-
-    documents = []
-    for _, row in df.iterrows():
-        # Concatena os campos relevantes em uma única string para o page_content
-        content = f"Summary: {row['Summary'] if pd.notna(row['Summary']) else 'No summary available'}\n" \
-                  f"Epic Link: {row['Epic Link'] if pd.notna(row['Epic Link']) else 'No Epic Link available'}\n" \
-                  f"Reporter: {row['Reporter'] if pd.notna(row['Reporter']) else 'No reporter found'}"
-
-        # Todos os outros campos são metadados
-        metadata = {
-            "id": row["Key"],
-            "status": row["Status"] if "Status" in df.columns else "Unknown",
-            "created": row["Created"] if "Created" in df.columns else "Unknown",
-            "linked_issues": row["Linked Issues"] if "Linked Issues" in df.columns else "None",
-            "development": row["Development"] if "Development" in df.columns else "None",
-            "epic_link": row["Epic Link"] if "Epic Link" in df.columns else "None",
-            "reporter": row["Reporter"] if "Reporter" in df.columns else "Unknown",
-            "epic_name": row["Epic Name"] if "Epic Name" in df.columns else "Unknown",
-            "sprint": row["Sprint"] if "Sprint" in df.columns else "None",
-        }
+    add_to_chroma(chunks, batch_size=args.batch_size, workers=args.workers, sync=args.sync,
+                  quantizacao=args.vetores_compactos, colapsar_duplicatas=args.colapsar_duplicatas,
+                  limiar_duplicatas=args.limiar_duplicatas)
 
-        document = Document(
-            page_content=content,  # Agora é uma string
-            metadata=metadata
-        )
+    if args.topicos:
+        db = Chroma(persist_directory=CHROMA_PATH, embedding_function=get_embedding_function())
+        if exportar_topicos(atualizar_topicos(db)):
+            print("🧩 Tópicos exportados para o contexto analítico.")
 
-        documents.append(document)
+def load_documents_from_csv(caminho_csv=DATA_PATH, chunksize=CSV_CHUNKSIZE):
+    """
+    Lê o CSV em blocos e gera um Document por linha, sem carregar o arquivo inteiro.
 
-    print(f"📝 Total de documentos carregados: {len(documents)}")
-    return documents
+    O conteúdo e os metadados de cada bloco são montados com operações vetorizadas
+    de colunas, e a memória de pico depende apenas de `chunksize`.
+    """
+    total = 0
+    leitor = pd.read_csv(caminho_csv, chunksize=chunksize, usecols=lambda coluna: coluna in CSV_COLUMNS)
+    for bloco in leitor:
+        for document in documentos_do_bloco(bloco):
+            total += 1
+            yield document
+    print(f"📝 Total de documentos carregados: {total}")
+
+def documentos_do_bloco(df):
+    """
+    Converte um bloco do CSV em Documents usando operações por coluna.
+    """
+    # Concatena os campos relevantes em uma única string para o page_content
+    conteudos = (
+        "Summary: " + _coluna_texto(df, "Summary", "No summary available")
+        + "\nEpic Link: " + _coluna_texto(df, "Epic Link", "No Epic Link available")
+        + "\nReporter: " + _coluna_texto(df, "Reporter", "No reporter found")
+    ).tolist()
+
+    # Todos os outros campos são metadados
+    colunas = {
+        campo: df[coluna].tolist() if coluna in df.columns else [padrao] * len(df)
+        for campo, (coluna, padrao) in METADATA_COLUMNS.items()
+    }
+    campos = list(colunas)
+    for content, valores in zip(conteudos, zip(*colunas.values())):
+        yield Document(page_content=content, metadata=dict(zip(campos, valores)))
+
+def _coluna_texto(df, coluna, padrao):
+    if coluna not in df.columns:
+        return pd.Series(padrao, index=df.index)
+    return df[coluna].astype(object).where(df[coluna].notna(), padrao).astype(str)
 
 
 def split_documents(documents):
@@ -87,27 +136,375 @@ def split_documents(documents):
     """
     return documents  # Retorna os documentos diretamente
 
-def add_to_chroma(chunks):
+def add_to_chroma(chunks, batch_size=BATCH_SIZE, workers=0, sync=False, quantizacao=None,
+                  colapsar_duplicatas=False, limiar_duplicatas=LIMIAR_SIMILARIDADE):
     """
-    Adiciona ou atualiza chunks no banco de dados Chroma.
+    Adiciona ou atualiza chunks no banco de dados Chroma em lotes de tamanho fixo.
+
+    Cada lote é confirmado no banco antes do próximo e a posição é gravada em
+    CHECKPOINT_PATH, de modo que uma execução interrompida retoma do último lote
+    confirmado. Com workers > 0, os embeddings são calculados em um pool de processos.
+
+    Com sync=True, as impressões digitais gravadas nos metadados são comparadas com
+    as do CSV: documentos com conteúdo alterado são reprocessados, alterações só de
+    metadados são atualizadas sem novo embedding e IDs ausentes no CSV são removidos.
+
+    Com `quantizacao` ("float16" ou "int8"), os vetores também são gravados em um
+    índice quantizado ao lado da coleção; um índice já existente continua sendo
+    atualizado nas ingestões seguintes.
+
+    Com colapsar_duplicatas=True, os documentos gravados nesta execução são comparados
+    com a coleção inteira e as quase duplicatas (cosseno >= limiar_duplicatas) são
+    removidas, mantendo um representante por cluster. As removidas ficam registradas e
+    não são reinseridas enquanto o conteúdo não mudar.
     """
     embedding_function = get_embedding_function()
     db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embedding_function)
 
-    # Obtém IDs existentes no banco de dados
-    existing_items = db.get(include=[])  # IDs são incluídos por padrão
-    existing_ids = set(existing_items["ids"])
-    print(f"📊 Documentos existentes no banco de dados: {len(existing_ids)}")
-
-    # Adiciona apenas novos chunks
-    new_chunks = [chunk for chunk in chunks if chunk.metadata["id"] not in existing_ids]
-    if new_chunks:
-        print(f"➕ Adicionando {len(new_chunks)} novos documentos...")
-        new_chunk_ids = [chunk.metadata["id"] for chunk in new_chunks]
-        db.add_documents(new_chunks, ids=new_chunk_ids)
+    # Recusa misturar vetores de modelos/dimensões diferentes na mesma coleção
+    verificar_assinatura(CHROMA_PATH, embedding_function, registrar=True)
+
+    # Obtém IDs existentes no banco de dados e suas impressões digitais
+    existing_items = db.get(include=["metadatas"] if sync else [])
+    if sync:
+        existing = {
+            id_: _impressao_armazenada(meta)
+            for id_, meta in zip(existing_items["ids"], existing_items["metadatas"])
+        }
+    else:
+        existing = dict.fromkeys(existing_items["ids"])
+    print(f"📊 Documentos existentes no banco de dados: {len(existing)}")
+
+    posicao = carregar_checkpoint()
+    if posicao:
+        print(f"⏩ Retomando a partir do documento {posicao} (checkpoint encontrado).")
+
+    # Os índices de metadados e BM25 são salvos ao final; após uma interrupção, são reconstruídos a partir do banco.
+    indice = IndiceMetadados.carregar(INDICE_METADADOS_PATH)
+    if indice is None or posicao or len(indice.documentos) != len(existing):
+        indice = reconstruir_indice_metadados(db)
+    bm25 = IndiceBM25.carregar(INDICE_BM25_PATH)
+    if posicao or len(bm25) != len(existing):
+        bm25 = reconstruir_indice_bm25(db)
+    quantizado = IndiceQuantizado.carregar(INDICE_QUANTIZADO_PATH)
+    if quantizado is not None or quantizacao:
+        if (quantizado is None or (quantizacao and quantizado.tipo != quantizacao)
+                or posicao or len(quantizado) != len(existing)):
+            quantizado = reconstruir_indice_quantizado(db, quantizacao or quantizado.tipo, batch_size)
+
+    colapsados = carregar_colapsados(CHROMA_PATH)
+    vistos = set()
+    novos_ids = []
+    lotes = gerar_lotes(chunks, batch_size, existing, inicio=posicao, sync=sync, vistos=vistos, colapsados=colapsados)
+
+    inicio = time.perf_counter()
+    total_docs = 0
+    total_lotes = 0
+    total_metadados = 0
+    for fim_lote, lote, embeddings, atualizacoes in embutir_lotes(lotes, embedding_function, workers):
+        if lote:
+            gravar_lote(db, lote, embeddings)
+            indice.adicionar(lote)
+            bm25.adicionar(lote)
+            if quantizado is not None:
+                quantizado.adicionar([chunk.metadata["id"] for chunk in lote], embeddings)
+                quantizado.salvar(manifesto=False)
+            novos_ids.extend(chunk.metadata["id"] for chunk in lote)
+            total_docs += len(lote)
+            total_lotes += 1
+        if atualizacoes:
+            db._collection.update(
+                ids=[chunk.metadata["id"] for chunk in atualizacoes],
+                metadatas=[chunk.metadata for chunk in atualizacoes],
+            )
+            indice.adicionar(atualizacoes)
+            total_metadados += len(atualizacoes)
+        salvar_checkpoint(fim_lote)
+
+        decorrido = time.perf_counter() - inicio
+        if lote:
+            print(f"   ✔️ Lote {total_lotes}: {total_docs} documentos "
+                  f"({total_docs / decorrido:.1f} docs/s, {total_lotes / decorrido:.2f} lotes/s)")
+
+    remover_checkpoint()
+    if total_docs:
+        decorrido = time.perf_counter() - inicio
+        print(f"➕ {total_docs} documentos novos ou alterados gravados em {total_lotes} lotes "
+              f"({decorrido:.1f}s, {total_docs / decorrido:.1f} docs/s, {total_lotes / decorrido:.2f} lotes/s)")
     else:
         print("✅ Nenhum documento novo para adicionar.")
 
+    if hasattr(embedding_function, "estatisticas"):
+        print(f"🗃️ Cache de embeddings: {embedding_function.estatisticas()}")
+
+    if sync:
+        if total_metadados:
+            print(f"🏷️ {total_metadados} documentos com metadados atualizados sem novo embedding.")
+        removidos = [id_ for id_ in existing if id_ not in vistos]
+        for i in range(0, len(removidos), batch_size):
+            db._collection.delete(ids=removidos[i:i + batch_size])
+        indice.remover(removidos)
+        bm25.remover(removidos)
+        if quantizado is not None:
+            quantizado.remover(removidos)
+        if removidos:
+            print(f"🗑️ {len(removidos)} documentos ausentes no CSV removidos.")
+
+        # Duplicatas que saíram do CSV ou cujo representante foi removido deixam o registro
+        apagados = set(removidos)
+        orfaos = [id_ for id_, item in colapsados.items() if id_ not in vistos or item["representante"] in apagados]
+        for id_ in orfaos:
+            del colapsados[id_]
+        if orfaos:
+            salvar_colapsados(CHROMA_PATH, colapsados)
+            print(f"🪞 {len(orfaos)} duplicatas colapsadas saíram do registro e serão reavaliadas na próxima ingestão.")
+    else:
+        removidos = []
+
+    if colapsar_duplicatas and novos_ids:
+        clusters = detectar_duplicatas_novas(db, novos_ids, limiar_duplicatas)
+        removidos = removidos + colapsar_na_colecao(db, clusters, (indice, bm25, quantizado), colapsados)
+
+    indice.salvar(INDICE_METADADOS_PATH)
+    print(f"🗂️ Índice de metadados atualizado: {len(indice.documentos)} documentos.")
+    bm25.salvar()
+    print(f"🔤 Índice BM25 atualizado: {len(bm25)} documentos em {len(bm25.segmentos)} segmentos.")
+    if quantizado is not None:
+        quantizado.salvar()
+        print(f"🗜️ Índice quantizado ({quantizado.tipo}) atualizado: {len(quantizado)} vetores, "
+              f"{quantizado.tamanho_bytes() / 2**20:.1f} MB.")
+
+    # Um novo carimbo de versão invalida os resultados de busca guardados em cache
+    if total_docs or total_metadados or removidos:
+        gravar_versao_colecao(CHROMA_PATH)
+
+def colapsar_na_colecao(db, clusters, indices=None, colapsados=None):
+    """
+    Remove da coleção e dos índices as duplicatas de cada cluster, mantendo o representante.
+
+    As removidas são registradas com a impressão digital do conteúdo, para que a
+    ingestão não as reinsira. Sem `indices` (execução avulsa), os índices salvos são
+    carregados, atualizados e gravados aqui. Retorna os IDs removidos.
+    """
+    removidas = {id_: cluster["representante"] for cluster in clusters for id_ in cluster["duplicatas"]}
+    if not removidas:
+        return []
+
+    avulso = indices is None
+    if avulso:
+        indices = (IndiceMetadados.carregar(INDICE_METADADOS_PATH), IndiceBM25.carregar(INDICE_BM25_PATH),
+                   IndiceQuantizado.carregar(INDICE_QUANTIZADO_PATH))
+    if colapsados is None:
+        colapsados = carregar_colapsados(CHROMA_PATH)
+
+    ids = list(removidas)
+    itens = db.get(ids=ids, include=["metadatas"])
+    for id_, meta in zip(itens["ids"], itens["metadatas"]):
+        colapsados[id_] = {"representante": removidas[id_], "hash_conteudo": (meta or {}).get("hash_conteudo")}
+    for i in range(0, len(ids), BATCH_SIZE):
+        db._collection.delete(ids=ids[i:i + BATCH_SIZE])
+    for item in indices:
+        if item is not None:
+            item.remover(ids)
+    salvar_colapsados(CHROMA_PATH, colapsados)
+    print(f"🪞 {len(ids)} quase duplicatas colapsadas em {len(clusters)} clusters.")
+
+    if avulso:
+        indice, bm25, quantizado = indices
+        if indice is not None:
+            indice.salvar(INDICE_METADADOS_PATH)
+        bm25.salvar()
+        if quantizado is not None:
+            quantizado.salvar()
+        gravar_versao_colecao(CHROMA_PATH)
+    return ids
+
+def reconstruir_indice_metadados(db):
+    """
+    Reconstrói o índice de metadados a partir dos documentos já gravados no Chroma.
+    """
+    itens = db.get(include=["metadatas"])
+    indice = IndiceMetadados()
+    indice.adicionar_metadados([
+        {**(meta or {}), "id": id_} for id_, meta in zip(itens["ids"], itens["metadatas"])
+    ])
+    return indice
+
+def reconstruir_indice_bm25(db):
+    """
+    Reconstrói o índice BM25 a partir dos textos já gravados no Chroma.
+    """
+    if os.path.exists(INDICE_BM25_PATH):
+        shutil.rmtree(INDICE_BM25_PATH)
+    itens = db.get(include=["documents"])
+    bm25 = IndiceBM25(INDICE_BM25_PATH)
+    bm25.adicionar([
+        Document(page_content=doc or "", metadata={"id": id_}) for id_, doc in zip(itens["ids"], itens["documents"])
+    ])
+    return bm25
+
+def reconstruir_indice_quantizado(db, tipo, batch_size=BATCH_SIZE):
+    """
+    Reconstrói o índice quantizado a partir dos vetores já gravados no Chroma, lendo-os em páginas.
+    """
+    if os.path.exists(INDICE_QUANTIZADO_PATH):
+        shutil.rmtree(INDICE_QUANTIZADO_PATH)
+    quantizado = IndiceQuantizado(INDICE_QUANTIZADO_PATH, tipo)
+    offset = 0
+    while True:
+        itens = db.get(include=["embeddings"], limit=batch_size, offset=offset)
+        if not itens["ids"]:
+            break
+        quantizado.adicionar(itens["ids"], itens["embeddings"])
+        quantizado.salvar(manifesto=False)
+        offset += len(itens["ids"])
+    return quantizado
+
+def calcular_impressoes(chunk):
+    """
+    Calcula as impressões digitais do conteúdo e dos metadados de um chunk.
+    """
+    metadados = {k: v for k, v in chunk.metadata.items() if k not in ("hash_conteudo", "hash_metadados")}
+    hash_conteudo = hashlib.sha1(chunk.page_content.encode("utf-8")).hexdigest()
+    hash_metadados = hashlib.sha1(json.dumps(metadados, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return hash_conteudo, hash_metadados
+
+def _impressao_armazenada(meta):
+    if not meta or "hash_conteudo" not in meta:
+        return None
+    return meta["hash_conteudo"], meta.get("hash_metadados")
+
+def gerar_lotes(chunks, batch_size, existing, inicio=0, sync=False, vistos=None, colapsados=None):
+    """
+    Percorre os chunks em lotes de tamanho fixo, pulando os `inicio` primeiros.
+
+    Gera tuplas (posição final do lote, chunks a embutir, chunks só com metadados
+    alterados). Chunks inalterados são descartados, mas contam para a posição do
+    checkpoint. Os IDs percorridos, inclusive os pulados, são registrados em `vistos`.
+    Duplicatas já colapsadas (`colapsados`) são descartadas enquanto o conteúdo não mudar.
+    """
+    posicao = 0
+    lote = []
+    for chunk in chunks:
+        posicao += 1
+        if vistos is not None:
+            vistos.add(chunk.metadata["id"])
+        if posicao <= inicio:
+            continue
+        lote.append(chunk)
+        if len(lote) == batch_size:
+            yield (posicao, *_classificar_lote(lote, existing, sync, colapsados))
+            lote = []
+    if lote:
+        yield (posicao, *_classificar_lote(lote, existing, sync, colapsados))
+
+def _classificar_lote(lote, existing, sync, colapsados=None):
+    embutir, atualizar = [], []
+    for chunk in lote:
+        hash_conteudo, hash_metadados = calcular_impressoes(chunk)
+        chunk.metadata["hash_conteudo"] = hash_conteudo
+        chunk.metadata["hash_metadados"] = hash_metadados
+
+        id_ = chunk.metadata["id"]
+        if colapsados and id_ not in existing and colapsados.get(id_, {}).get("hash_conteudo") == hash_conteudo:
+            continue
+        if id_ not in existing:
+            embutir.append(chunk)
+        elif sync:
+            impressao = existing[id_]
+            if impressao is None or impressao[0] != hash_conteudo:
+                embutir.append(chunk)
+            elif impressao[1] != hash_metadados:
+                atualizar.append(chunk)
+    return embutir, atualizar
+
+def gravar_lote(db, lote, embeddings):
+    """
+    Grava um lote de chunks, com seus embeddings e metadados, na coleção Chroma.
+    """
+    db._collection.upsert(
+        ids=[chunk.metadata["id"] for chunk in lote],
+        embeddings=embeddings,
+        metadatas=[chunk.metadata for chunk in lote],
+        documents=[chunk.page_content for chunk in lote],
+    )
+
+def embutir_lotes(lotes, embedding_function, workers=0):
+    """
+    Calcula os embeddings de cada lote, preservando a ordem dos lotes.
+
+    Sem workers, usa a função de embeddings do processo atual. Com workers, mantém
+    até `workers` lotes em processamento no pool enquanto os anteriores são gravados.
+    """
+    if workers <= 0:
+        for fim_lote, lote, atualizacoes in lotes:
+            textos = [chunk.page_content for chunk in lote]
+            yield fim_lote, lote, embedding_function.embed_documents(textos) if textos else [], atualizacoes
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker) as pool:
+        pendentes = []
+        for fim_lote, lote, atualizacoes in lotes:
+            textos = [chunk.page_content for chunk in lote]
+            pendentes.append((fim_lote, lote, pool.submit(_embutir_textos, textos), atualizacoes))
+            if len(pendentes) > workers:
+                fim, lote_pronto, futuro, atualizacoes_prontas = pendentes.pop(0)
+                yield fim, lote_pronto, futuro.result(), atualizacoes_prontas
+        for fim, lote_pronto, futuro, atualizacoes_prontas in pendentes:
+            yield fim, lote_pronto, futuro.result(), atualizacoes_prontas
+
+_embedding_worker = None
+
+def _inicializar_worker():
+    """
+    Carrega o modelo de embeddings uma única vez em cada processo do pool.
+    """
+    global _embedding_worker
+    _embedding_worker = get_embedding_function()
+
+def _embutir_textos(textos):
+    """
+    Calcula os embeddings de uma lista de textos dentro de um processo do pool.
+    """
+    if not textos:
+        return []
+    return _embedding_worker.embed_documents(textos)
+
+def carregar_checkpoint():
+    """
+    Retorna a posição do último lote confirmado para o CSV atual, ou 0.
+    """
+    try:
+        with open(CHECKPOINT_PATH, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0
+
+    if checkpoint.get("origem") != DATA_PATH or checkpoint.get("mtime") != _mtime_dados():
+        print("⚠️ Checkpoint pertence a outra exportação e será ignorado.")
+        return 0
+    return checkpoint.get("posicao", 0)
+
+def salvar_checkpoint(posicao):
+    """
+    Grava a posição do último lote confirmado de forma atômica.
+    """
+    os.makedirs(CHROMA_PATH, exist_ok=True)
+    temporario = CHECKPOINT_PATH + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({"origem": DATA_PATH, "mtime": _mtime_dados(), "posicao": posicao}, f)
+    os.replace(temporario, CHECKPOINT_PATH)
+
+def remover_checkpoint():
+    """
+    Remove o checkpoint após uma ingestão concluída.
+    """
+    if os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+
+def _mtime_dados():
+    return os.path.getmtime(DATA_PATH) if os.path.exists(DATA_PATH) else None
+
 def get_self_query_retriever():
     """
     Configura um Self-Query Retriever para o ChromaDB, permitindo consultas baseadas em metadados.
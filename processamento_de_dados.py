@@ -1,16 +1,26 @@
 import pandas as pd
 import json
-from collections import defaultdict, Counter
+import time
 from datetime import datetime
 import matplotlib.pyplot as plt
 import re 
 import numpy as np
+from classificador_modulos import ClassificadorModulos, MODULOS_PATH
+from grafo_defeitos import COLUNAS_GRAFO, TOP_GRAFO, analisar_grafo
+from topicos import carregar_resumo_topicos
+from artefato_analitico import ARTEFATO_ANALITICO_PATH, gravar_artefato
+from series_temporais import RELEASE_NAO_IDENTIFICADA, analisar_series, converter_datas, derivar_release, derivar_sprint, tempo_resolucao
 
-def carregar_csv(caminho_csv):
+def carregar_csv(caminho_csv, backend=None):
     """
     Carrega o arquivo CSV e retorna um DataFrame pandas.
+
+    Com backend="pyarrow" (requer pyarrow instalado), a leitura é multithread e as
+    colunas ficam em tipos Arrow, cujas operações de texto são executadas em C++.
     """
     try:
+        if backend == "pyarrow":
+            return pd.read_csv(caminho_csv, engine="pyarrow", dtype_backend="pyarrow")
         return pd.read_csv(caminho_csv)
     except Exception as e:
         print(f"Erro ao carregar o CSV: {e}")
@@ -24,33 +34,38 @@ def contar_por_epic_link(df):
         return df['Epic Link'].value_counts().to_dict()
     return {}
 
-def contar_bugs_por_release(df):
+def textos_da_coluna(df, coluna="Summary"):
     """
-    Conta o número total de bugs por release, baseado em padrões de texto na coluna Summary.
-    Quando a release não está identificada, classifica como "release não identificada".
+    Retorna apenas os valores de texto da coluna (ignora nulos e não-strings).
     """
-    releases = defaultdict(int)
-    
-    if "Summary" in df.columns:
-        for summary in df['Summary']:
-            if isinstance(summary, str):
-                if "[" in summary and "]" in summary:
-                    release = summary.split(']')[0].split('[')[-1].strip()
-                else:
-                    release = "release não identificada"
-                releases[release] += 1
-    
-    return dict(releases)
+    if coluna not in df.columns:
+        return pd.Series([], dtype=object)
+    serie = df[coluna]
+    if not (serie.dtype == object or pd.api.types.is_string_dtype(serie)):
+        return serie.iloc[:0]
+    return serie[serie.str.len().notna()]
 
-def contar_palavras_com_3_ou_mais_caracteres(df, coluna="Summary"):
+def extrair_releases(summaries):
     """
-    Conta a frequência de palavras com 3 ou mais caracteres em uma coluna de texto.
+    Extrai a release de cada Summary (texto entre o último "[" e o primeiro "]").
     """
-    if coluna in df.columns:
-        palavras = ' '.join(df[coluna].dropna().astype(str)).split()
-        palavras_filtradas = [palavra for palavra in palavras if len(palavra) >= 3]
-        return Counter(palavras_filtradas)
-    return {}
+    tem_tag = summaries.str.contains("[", regex=False) & summaries.str.contains("]", regex=False)
+    releases = summaries.str.extract(r"^(?:[^\]]*\[)?(?P<release>[^\[\]]*)", expand=False).str.strip()
+    return releases.where(tem_tag, "release não identificada")
+
+def contar_bugs_por_release(df, summaries=None):
+    """
+    Conta o número total de bugs por release, baseado em padrões de texto na coluna Summary.
+    Quando a release não está identificada, classifica como "release não identificada".
+    """
+    if "Summary" not in df.columns:
+        return {}
+    if summaries is None:
+        summaries = textos_da_coluna(df, "Summary")
+    releases = extrair_releases(summaries)
+
+    # Mantém a ordem de primeira ocorrência, como na contagem original
+    return releases.groupby(releases, sort=False).size().to_dict()
 
 def categorizar_por_status(df):
     """
@@ -73,7 +88,7 @@ def calcular_tendencia_por_data(df, coluna_data="Created"):
     Calcula a tendência de bugs criados por dia/mês.
     """
     if coluna_data in df.columns:
-        df[coluna_data] = pd.to_datetime(df[coluna_data], errors='coerce')
+        df[coluna_data] = converter_datas(df[coluna_data])
         df = df.dropna(subset=[coluna_data])
         
         tendencia_dia = {str(data): contagem for data, contagem in df[coluna_data].dt.date.value_counts().sort_index().items()}
@@ -83,103 +98,152 @@ def calcular_tendencia_por_data(df, coluna_data="Created"):
     
     return {}
 
+# Classificador de módulos compilado uma única vez a partir de modulos.json
+CLASSIFICADOR_MODULOS = ClassificadorModulos.de_arquivo(MODULOS_PATH)
+
 def identificar_modulo(summary):
     """
     Identifica o módulo com base em palavras-chave no Summary.
     """
-    if not isinstance(summary, str):
-        return "Outros"
-
-    modulos = {
-        "CTO": r"\bcto[s]?\b",
-        "Splitter": r"\bsplitter[s]?\b",
-        "DIO": r"\bdio[s]?\b",
-        "Cabos": r"\bcabo[s]?\b",
-        "OLT": r"\bolt[s]?\b",
-        "MAC": r"\bmac\b",
-        "Uplink": r"\buplink[s]?\b",
-        "Mapa": r"\bmapa[s]?\b",
-        "KMZ": r"\bkmz\b",
-        "Endereços": r"\bendereço[s]?\b",
-        "ONU": r"\bonu[s]?\b",
-    }
+    return CLASSIFICADOR_MODULOS.classificar(summary)
 
-    summary_lower = summary.lower()
-    for modulo, padrao in modulos.items():
-        if re.search(padrao, summary_lower):
-            return modulo
-    return "Outros"
-
-def adicionar_modulo(df, coluna="Summary"):
+def adicionar_modulo(df, coluna="Summary", classificador=None):
+    """
+    Adiciona a coluna Modulo classificando a coluna inteira em uma única chamada.
+    """
     if coluna in df.columns:
-        df['Modulo'] = df[coluna].apply(identificar_modulo)
+        df['Modulo'] = (classificador or CLASSIFICADOR_MODULOS).classificar_serie(df[coluna])
     return df
 
 
+def derivar_colunas_temporais(df, summaries=None):
+    """
+    Adiciona as colunas Release (versão da tag do Summary), Sprint_Numero (campo Sprint ou
+    tag "spNN") e Tempo_Resolucao (dias até a resolução, quando o CSV traz a data).
+    """
+    if summaries is None:
+        summaries = textos_da_coluna(df, "Summary")
+    tags = extrair_releases(summaries).reindex(df.index)
+    df['Release'] = derivar_release(tags.fillna(RELEASE_NAO_IDENTIFICADA))
+    sprints = df['Sprint'] if 'Sprint' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    df['Sprint_Numero'] = derivar_sprint(sprints, tags)
+    df['Tempo_Resolucao'] = tempo_resolucao(df)
+    return df
+
+def calcular_series_temporais(df, coluna_data="Created"):
+    """
+    Calcula as séries semanal, por sprint e por release (ver series_temporais.py).
+    """
+    if coluna_data not in df.columns:
+        return {}
+    return analisar_series(df[coluna_data], df['Release'], df['Sprint_Numero'], df['Tempo_Resolucao'])
+
 def estatisticas_por_release(df):
     """
     Calcula estatísticas por release.
     """
     if "Release" in df.columns:
-        estatisticas = df.groupby('Release').agg({
-            'Tempo_Resolucao': ['mean', 'median', 'max'],
-            'Key': 'count'
-        }).reset_index()
-        estatisticas.columns = ['Release', 'Tempo_Resolucao_Medio', 'Tempo_Resolucao_Mediano', 'Tempo_Resolucao_Maximo', 'Total_Bugs']
-        return estatisticas.to_dict('records')
+        estatisticas = df.groupby('Release').agg(
+            Tempo_Resolucao_Medio=('Tempo_Resolucao', 'mean'),
+            Tempo_Resolucao_Mediano=('Tempo_Resolucao', 'median'),
+            Tempo_Resolucao_Maximo=('Tempo_Resolucao', 'max'),
+            Total_Bugs=('Release', 'size'),
+        ).round(1).reset_index()
+        # Sem data de resolução no CSV, os tempos ficam nulos (NaN não é JSON válido)
+        return estatisticas.astype(object).where(estatisticas.notna(), None).to_dict('records')
     return []
 
-def preprocessar_dados(caminho_csv, exportar_json=False):
+def preprocessar_dados(caminho_csv, exportar_json=False, backend=None):
     """
     Realiza o pré-processamento dos dados e retorna o contexto em formato de dicionário.
+
+    Cada análise é vetorizada sobre as colunas do DataFrame e tem seu tempo exibido ao final.
     """
-    df = carregar_csv(caminho_csv)
+    tempos = {}
+    inicio = time.perf_counter()
+    df = carregar_csv(caminho_csv, backend=backend)
+    tempos["carregar_csv"] = time.perf_counter() - inicio
     if df is None:
         return None
 
+    def cronometrar(nome, funcao, *args):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        tempos[nome] = time.perf_counter() - inicio
+        return resultado
+
+    # Created convertida uma única vez, no formato do Jira, e reaproveitada pelas análises de data.
+    if "Created" in df.columns:
+        df["Created"] = cronometrar("datas", converter_datas, df["Created"])
+
+    # Valores de texto do Summary, compartilhados pelas análises baseadas nele.
+    summaries = cronometrar("textos_summary", textos_da_coluna, df, "Summary")
+
     # Contagem por Epic Link.
-    epic_link_counts = contar_por_epic_link(df)
+    epic_link_counts = cronometrar("contagem_epic_link", contar_por_epic_link, df)
     
     # Contagem de bugs por release (versão ajustada).
-    bugs_por_release = contar_bugs_por_release(df)
-
-    # Contagem de palavras com 3 ou mais caracteres.
-    contagem_palavras = contar_palavras_com_3_ou_mais_caracteres(df)
+    bugs_por_release = cronometrar("contagem_bugs_release", contar_bugs_por_release, df, summaries)
 
     # Categorização por status.
-    categorias_status = categorizar_por_status(df)
+    categorias_status = cronometrar("categorias_status", categorizar_por_status, df)
 
     # Categorização por reporter.
-    categorias_reporter = categorizar_por_reporter(df)
+    categorias_reporter = cronometrar("categorias_reporter", categorizar_por_reporter, df)
 
     # Tendência de bugs por data.
-    tendencia_data = calcular_tendencia_por_data(df)
+    tendencia_data = cronometrar("tendencia_data", calcular_tendencia_por_data, df)
 
     # Adicionar módulo.
-    df = adicionar_modulo(df)
+    df = cronometrar("bugs_por_modulo", adicionar_modulo, df)
+
+    # Release, sprint e tempo de resolução derivados das tags do Summary e do campo Sprint.
+    df = cronometrar("colunas_temporais", derivar_colunas_temporais, df, summaries)
 
     # Estatísticas por release.
-    estatisticas_release = estatisticas_por_release(df)
+    estatisticas_release = cronometrar("estatisticas_por_release", estatisticas_por_release, df)
+
+    # Séries semanal, por sprint e por release, com taxa móvel, picos e densidade por release.
+    series = cronometrar("series_temporais", calcular_series_temporais, df)
+
+    # Grafo de issues, Epics, módulos e sprints (Linked Issues e Epic Link).
+    grafo = cronometrar("grafo_defeitos", analisar_grafo, df, COLUNAS_GRAFO, TOP_GRAFO, CLASSIFICADOR_MODULOS.padrao)
+
+    # Tópicos dos Summaries (k-means sobre os embeddings, atualizado por topicos.py), no lugar da contagem de palavras.
+    topicos = cronometrar("topicos", carregar_resumo_topicos)
     
     contexto_analitico = {
         "contagem_total_bugs": len(df),
         "contagem_epic_link": epic_link_counts,
         "contagem_bugs_release": bugs_por_release,
-        "contagem_palavras": contagem_palavras,
         "categorias_status": categorias_status,
         "categorias_reporter": categorias_reporter,
         "tendencia_data": tendencia_data,
         "bugs_por_modulo": df['Modulo'].value_counts().to_dict(),
         "estatisticas_por_release": estatisticas_release,
+        "series_temporais": series,
+        "grafo_defeitos": grafo,
+        "areas_criticas": grafo["hotspots"]["modulo"],
+        "topicos": topicos,
     }
 
+    tempos["total"] = time.perf_counter() - inicio
+    print("⏱️ Tempo por análise: " + ", ".join(f"{nome}={segundos:.3f}s" for nome, segundos in tempos.items()))
+
     if exportar_json:
-        with open('contexto_analitico.json', 'w', encoding='utf-8') as f:
-            json.dump(contexto_analitico, f, indent=4, ensure_ascii=False, default=converter_numeros)
-        print("Contexto exportado para 'contexto_analitico.json'.")
+        exportar_contexto(contexto_analitico)
     
     return contexto_analitico
 
+def exportar_contexto(contexto_analitico, caminho_json='contexto_analitico.json', caminho_artefato=ARTEFATO_ANALITICO_PATH):
+    """
+    Exporta o contexto analítico em JSON (legível) e no artefato binário por seções lido pelas consultas.
+    """
+    with open(caminho_json, 'w', encoding='utf-8') as f:
+        json.dump(contexto_analitico, f, indent=4, ensure_ascii=False, default=converter_numeros)
+    tamanho = gravar_artefato(contexto_analitico, caminho_artefato, converter_numeros)
+    print(f"Contexto exportado para '{caminho_json}' e '{caminho_artefato}' ({tamanho / 1024:.1f} KB).")
+
 def converter_numeros(obj):
         if isinstance(obj, np.integer):
             return int(obj)
@@ -190,7 +254,19 @@ def converter_numeros(obj):
         return obj
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--incremental", action="store_true", help="Processar apenas as linhas alteradas desde a última execução.")
+    parser.add_argument("--janela-dias", type=int, default=30, help="Tamanho da janela móvel em dias (modo incremental).")
+    parser.add_argument("--janela-sprints", type=int, default=3, help="Número de sprints da janela móvel (modo incremental).")
+    args = parser.parse_args()
+
     caminho_csv = "C:/Users/pedro/OneDrive/Documentos/basesdedefeitos/jirabugs.csv"
-    contexto = preprocessar_dados(caminho_csv, exportar_json=True)
+    if args.incremental:
+        from analise_incremental import atualizar_contexto_incremental
+        contexto = atualizar_contexto_incremental(caminho_csv, exportar_json=True,
+                                                  janela_dias=args.janela_dias, janela_sprints=args.janela_sprints)
+    else:
+        contexto = preprocessar_dados(caminho_csv, exportar_json=True)
     print(json.dumps(contexto, indent=4, default=converter_numeros))
 
@@ -1,13 +1,37 @@
+import argparse
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
 from langchain_ollama import OllamaLLM
 from get_embeddings_function import get_embedding_function
-from sklearn.metrics import precision_score, recall_score, f1_score, average_precision_score
+from backends_embeddings import verificar_assinatura
+from armazenamento_interacoes import INTERACOES_PATH, anexar_interacoes
+from indice_metadados import IndiceMetadados, caminho_indice, extrair_filtros
+from indice_bm25 import IndiceBM25, caminho_bm25
+from indice_quantizado import FATOR_CANDIDATOS, IndiceQuantizado, caminho_quantizado, reranquear
+from cache_embeddings import embutir_consultas
+from cache_recuperacao import CacheRecuperacao
+from classificador_modulos import ClassificadorModulos
+from contexto_prompt import ORCAMENTO_TOKENS, montar_contexto, relevancias
+from artefato_analitico import ARTEFATO_ANALITICO_PATH, abrir_contexto_analitico
+from metricas_recuperacao import avaliar_lote, contar_relevantes, medias, metricas_da_consulta
 
 # Caminhos dos arquivos
 CHROMA_PATH = "C:/Users/pedro/OneDrive/Documentos/basesdedefeitos/chroma_db"
 JSON_ANALITICO_PATH = "contexto_analitico.json"
-INTERACOES_PATH = "interacoes.json"
+RESULTADOS_LOTE_PATH = "resultados_lote.json"
+
+# Acima deste número de IDs, o filtro do índice de metadados não é repassado ao Chroma
+MAX_IDS_PRE_FILTRO = 5000
+
+# Busca híbrida: pesos de cada ranking na fusão por rank recíproco (RRF), constante
+# de suavização do RRF e candidatos buscados em cada índice antes da fusão
+PESO_DENSO = 1.0
+PESO_LEXICO = 1.0
+K_RRF = 60
+CANDIDATOS_HIBRIDOS = 50
 
 # === Ground truth completo e preservado ===
 ground_truth = {
@@ -58,92 +82,572 @@ ground_truth = {
 
 # --- Funções auxiliares ---
 
-def convert_to_binary(retrieved_docs, relevant_keys):
-    """Converte documentos recuperados em listas binárias para cálculo de métricas."""
-    relevant_keys = [key.lower() for key in relevant_keys]
-    y_true = [1 if any(key in doc.lower() for key in relevant_keys) else 0 for doc in retrieved_docs]
-    y_pred = [1] * len(retrieved_docs)
-    return y_true, y_pred
-
-
-def calcular_metricas(retrieved_docs, relevant_keys):
-    """Calcula métricas de avaliação com sklearn."""
-    y_true, y_pred = convert_to_binary(retrieved_docs, relevant_keys)
-    return {
-        "precision": precision_score(y_true, y_pred, zero_division=0),
-        "recall": recall_score(y_true, y_pred, zero_division=0),
-        "f1_score": f1_score(y_true, y_pred, zero_division=0),
-        "average_precision": average_precision_score(y_true, y_pred),
-    }
+def calcular_metricas(retrieved_docs, relevant_keys, total_relevantes=None):
+    """Calcula precision@k, recall@k, F1, MRR, nDCG@k e AP@k de uma consulta (k = documentos recuperados)."""
+    return metricas_da_consulta(retrieved_docs, relevant_keys, total_relevantes=total_relevantes)
 
 
-def salvar_interacao(query, documentos, resposta, metricas):
-    """Salva interações no JSON."""
-    try:
-        with open(INTERACOES_PATH, 'r', encoding='utf-8') as f:
-            interacoes = json.load(f)
-    except FileNotFoundError:
-        interacoes = []
-    interacoes.append({
+def salvar_interacao(query, documentos, resposta, metricas, desempenho=None):
+    """Salva uma interação no arquivo de interações."""
+    salvar_interacoes([{
         "query": query,
         "documentos": documentos,
         "resposta": resposta,
-        "metricas": metricas
-    })
-    with open(INTERACOES_PATH, 'w', encoding='utf-8') as f:
-        json.dump(interacoes, f, ensure_ascii=False, indent=4)
+        "metricas": metricas,
+        "desempenho": desempenho,
+    }])
+
+
+def salvar_interacoes(novas):
+    """Acrescenta várias interações ao arquivo de interações em uma única escrita."""
+    anexar_interacoes(novas, INTERACOES_PATH)
+
+
+# --- Sessão de consulta ---
+
+PROMPT_TEMPLATE = """
+Você é um assistente especializado em responder perguntas sobre defeitos em sistemas GPON.
+Analise o contexto e gere respostas concisas em português.
+
+### Contexto:
+{contexto}
+
+### Pergunta:
+{pergunta_do_usuário}
+
+Responda no formato:
+Resposta: <texto direto e objetivo>
+Fontes: <lista de chaves de defeito usadas>
+"""
+
+
+class SessaoConsulta:
+    """
+    Mantém carregados o modelo de embeddings, a coleção Chroma, o contexto analítico
+    e o LLM, para responder várias perguntas sem repetir o custo de inicialização.
+    """
+
+    def __init__(self, chroma_path=CHROMA_PATH, json_analitico_path=JSON_ANALITICO_PATH, modelo_llm="mistral",
+                 modo_busca="hibrido", peso_denso=PESO_DENSO, peso_lexico=PESO_LEXICO, k_rrf=K_RRF,
+                 candidatos=CANDIDATOS_HIBRIDOS, usar_cache=True, orcamento_tokens=ORCAMENTO_TOKENS,
+                 embedding_function=None, usar_quantizado=True, artefato_analitico_path=ARTEFATO_ANALITICO_PATH):
+        self.modo_busca = modo_busca
+        self.orcamento_tokens = orcamento_tokens
+        self._corpus_versao = None
+        self._totais_relevantes = {}
+        self.peso_denso = peso_denso
+        self.peso_lexico = peso_lexico
+        self.k_rrf = k_rrf
+        self.candidatos = candidatos
+        self.tempos_inicializacao = {}
+
+        inicio = time.perf_counter()
+        self.embedding_function = embedding_function or get_embedding_function()
+        self.tempos_inicializacao["embeddings"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        self.db = Chroma(persist_directory=chroma_path, embedding_function=self.embedding_function)
+        verificar_assinatura(chroma_path, self.embedding_function)
+        self.tempos_inicializacao["chroma"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        self.indice = IndiceMetadados.carregar(caminho_indice(chroma_path))
+        self.tempos_inicializacao["indice_metadados"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        self.bm25 = IndiceBM25.carregar(caminho_bm25(chroma_path))
+        self.tempos_inicializacao["indice_bm25"] = time.perf_counter() - inicio
+
+        # Com um índice quantizado, a busca densa varre os vetores compactos e re-ranqueia em float32
+        inicio = time.perf_counter()
+        self.quantizado = IndiceQuantizado.carregar(caminho_quantizado(chroma_path)) if usar_quantizado else None
+        self.tempos_inicializacao["indice_quantizado"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        self.cache = CacheRecuperacao(chroma_path) if usar_cache else None
+        self.tempos_inicializacao["cache_recuperacao"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        # Só o índice do artefato é lido aqui; cada seção é carregada quando uma pergunta a usa
+        self.contexto_analitico = abrir_contexto_analitico(json_analitico_path, artefato_analitico_path)
+        self.classificador = ClassificadorModulos.de_arquivo()
+        self.tempos_inicializacao["contexto_analitico"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        self.model = OllamaLLM(model=modelo_llm)
+        self.tempos_inicializacao["llm"] = time.perf_counter() - inicio
+
+        self.tempos_inicializacao["total"] = sum(self.tempos_inicializacao.values())
+        print(f"🧊 Inicialização a frio: {_formatar_tempos(self.tempos_inicializacao)}")
+
+    def responder(self, query_text, ao_receber=None):
+        """
+        Responde uma pergunta usando os recursos já carregados.
+
+        A resposta é lida do LLM em streaming; se `ao_receber` for informado, ele é
+        chamado com cada trecho assim que chega. Retorna um dicionário com resposta,
+        fontes, documentos, métricas, latências e desempenho da geração, em que o
+        tempo até o primeiro token e a latência total contam desde a pergunta.
+        """
+        inicio = time.perf_counter()
+        results = self.buscar(query_text, k=20)
+        tempo_busca = time.perf_counter() - inicio
+
+        resultado = self._gerar(query_text, results, ao_receber)
+        desempenho = resultado["desempenho"]
+        desempenho["tempo_primeiro_token"] += tempo_busca
+        desempenho["latencia_total"] = time.perf_counter() - inicio
+        if resultado["metricas"]:
+            salvar_interacao(query_text, resultado["documentos"], resultado["resposta"], resultado["metricas"], desempenho)
+
+        resultado["latencias"] = {"busca": tempo_busca, "geracao": resultado.pop("tempo_geracao"), "total": desempenho["latencia_total"]}
+        return resultado
+
+    def buscar(self, query_text, k=20):
+        """
+        Recupera os documentos de uma pergunta: pelo índice de metadados quando ela
+        traz filtros estruturados (Key, Epic Link, Sprint, Reporter, Linked Issues),
+        ou pela busca vetorial, fundida com a BM25 no modo híbrido. As pontuações
+        retornadas são relevâncias entre 0 e 1 (ver fundir).
+
+        Perguntas repetidas são respondidas pelo cache de recuperação, sem embedding
+        nem busca, enquanto a versão da coleção não mudar.
+        """
+        chave = self._chave_cache(query_text, k)
+        if chave is not None:
+            results = self.cache.obter(chave)
+            if results is not None:
+                return results
+
+        results = self.buscar_por_indice(query_text, k=k)
+        if results is None:
+            vetor = self.embedding_function.embed_query(query_text)
+            densos = self.buscar_densos([vetor], self._numero_candidatos(k))[0]
+            results = self.fundir(query_text, densos, k)
+
+        if chave is not None:
+            self.cache.guardar(chave, results)
+        return results
+
+    def _chave_cache(self, query_text, k):
+        if self.cache is None:
+            return None
+        parametros = {
+            "modo_busca": self.modo_busca, "peso_denso": self.peso_denso, "peso_lexico": self.peso_lexico,
+            "k_rrf": self.k_rrf, "candidatos": self.candidatos,
+            "quantizado": self.quantizado.tipo if self.quantizado is not None else None,
+            # Perguntas sempre embutidas como consulta; invalida resultados de lote embutidos como documento
+            "vetor_pergunta": "consulta",
+            # Pontuações guardadas como relevâncias; invalida as distâncias guardadas antes
+            "pontuacao": "relevancia",
+        }
+        return self.cache.chave(query_text, k, extrair_filtros(query_text), parametros)
+
+    def buscar_densos(self, vetores, n):
+        """
+        Retorna, para cada vetor de consulta, os n documentos mais próximos como (Document, distância).
+
+        Com o índice quantizado, os n * FATOR_CANDIDATOS candidatos da varredura
+        compacta são re-ranqueados pela distância exata em float32; sem ele, a
+        coleção Chroma é consultada diretamente.
+        """
+        if self.quantizado is not None:
+            candidatos = self.quantizado.buscar(vetores, candidatos=n * FATOR_CANDIDATOS)
+            return [
+                [(Document(page_content=doc, metadata=meta or {}), distancia) for _, doc, meta, distancia in linha]
+                for linha in reranquear(self.db, vetores, candidatos, n)
+            ]
+        resposta = self.db._collection.query(
+            query_embeddings=vetores, n_results=n, include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [(Document(page_content=doc, metadata=meta or {}), distancia) for doc, meta, distancia in zip(*linha)]
+            for linha in zip(resposta["documents"], resposta["metadatas"], resposta["distances"])
+        ]
+
+    def fundir(self, query_text, densos, k=20, permitidos=None):
+        """
+        Combina os resultados densos com os da BM25 por fusão de rank recíproco.
+
+        Cada documento recebe a soma de peso / (k_rrf + posição) nos dois rankings e a
+        ordem segue essa soma. A pontuação retornada é sempre uma relevância entre 0 e 1
+        (maior é melhor): a do RRF dividida pela de um primeiro lugar em um só ranking
+        (limitada a 1), de modo que um documento bem colocado apenas na BM25 não é
+        descartado pelo limiar relativo de montar_contexto; no modo denso, ou sem índice
+        BM25, as distâncias são convertidas em 1 / (1 + distância).
+        Com `permitidos`, o ranking da BM25 é restrito a esses IDs.
+        """
+        if self.modo_busca != "hibrido" or not self.bm25.segmentos:
+            densos = densos[:k]
+            return [(doc, relevancia) for (doc, _), relevancia in zip(densos, relevancias(densos, maior_melhor=False))]
+        if permitidos is None:
+            lexicos = self.bm25.buscar(query_text, k=self._numero_candidatos(k))
+        else:
+            lexicos = [item for item in self.bm25.buscar(query_text, k=len(self.bm25)) if item[0] in permitidos]
+            lexicos = lexicos[:self._numero_candidatos(k)]
+
+        pontuacoes = {}
+        for peso, ids in ((self.peso_denso, [doc.metadata.get("id") for doc, _ in densos]),
+                          (self.peso_lexico, [id_ for id_, _ in lexicos])):
+            for posicao, id_ in enumerate(ids, start=1):
+                pontuacoes[id_] = pontuacoes.get(id_, 0.0) + peso / (self.k_rrf + posicao)
+        melhores = sorted(pontuacoes, key=pontuacoes.get, reverse=True)[:k]
+        primeiro_lugar = max(self.peso_denso, self.peso_lexico) / (self.k_rrf + 1) or 1.0
+
+        documentos = {doc.metadata.get("id"): doc for doc, _ in densos}
+        faltantes = [id_ for id_ in melhores if id_ not in documentos]
+        if faltantes:
+            itens = self.db.get(ids=faltantes, include=["documents", "metadatas"])
+            for id_, doc, meta in zip(itens["ids"], itens["documents"], itens["metadatas"]):
+                documentos[id_] = Document(page_content=doc, metadata=meta or {})
+        return [(documentos[id_], min(pontuacoes[id_] / primeiro_lugar, 1.0)) for id_ in melhores if id_ in documentos]
+
+    def _numero_candidatos(self, k):
+        return max(k, self.candidatos) if self.modo_busca == "hibrido" else k
+
+    def buscar_por_indice(self, query_text, k=20):
+        """
+        Responde pelo índice de metadados se a pergunta tiver filtros reconhecidos.
+
+        Até k documentos filtrados são retornados diretamente (relevância 1); acima
+        disso, a busca vetorial é restrita aos IDs filtrados. Retorna None quando a
+        pergunta não tem filtros ou nenhum documento os satisfaz.
+        """
+        if self.indice is None:
+            return None
+        filtros, ids = self.indice.rotear(query_text)
+        if not ids:
+            return None
+
+        if len(ids) <= k:
+            itens = self.db.get(ids=ids, include=["documents", "metadatas"])
+            return [
+                (Document(page_content=doc, metadata=meta or {}), 1.0)
+                for doc, meta in zip(itens["documents"], itens["metadatas"])
+            ]
+        if len(ids) <= MAX_IDS_PRE_FILTRO:
+            densos = self.db.similarity_search_with_score(
+                query_text, k=self._numero_candidatos(k), filter={"id": {"$in": ids}}
+            )
+            return self.fundir(query_text, densos, k, permitidos=set(ids))
+        return None
+
+    def buscar_lote(self, perguntas, k=20):
+        """
+        Embute todas as perguntas em uma única chamada e consulta a coleção de uma vez.
+
+        Perguntas encontradas no cache de recuperação ou resolvidas pelo índice de
+        metadados ficam fora da consulta vetorial. Retorna, para cada pergunta, a
+        lista de (Document, pontuação) como em buscar.
+        """
+        chaves = [self._chave_cache(pergunta, k) for pergunta in perguntas]
+        resultados = [self.cache.obter(chave) if chave is not None else None for chave in chaves]
+        calculadas = [i for i, results in enumerate(resultados) if results is None]
+        for i in calculadas:
+            resultados[i] = self.buscar_por_indice(perguntas[i], k=k)
+        pendentes = [i for i in calculadas if resultados[i] is None]
+        if pendentes:
+            self._buscar_vetorial_lote(perguntas, pendentes, resultados, k)
+
+        for i in calculadas:
+            if chaves[i] is not None:
+                self.cache.guardar(chaves[i], resultados[i])
+        return resultados
+
+    def _buscar_vetorial_lote(self, perguntas, pendentes, resultados, k):
+        """
+        Preenche em `resultados` as perguntas `pendentes` com uma única chamada de
+        embeddings e uma única consulta à coleção.
+        """
+        vetores = embutir_consultas(self.embedding_function, [perguntas[i] for i in pendentes])
+        for i, densos in zip(pendentes, self.buscar_densos(vetores, self._numero_candidatos(k))):
+            resultados[i] = self.fundir(perguntas[i], densos, k)
+
+    def responder_lote(self, perguntas, k=20, concorrencia=4):
+        """
+        Responde uma lista de perguntas: embeddings e busca em lote e gerações no LLM
+        com no máximo `concorrencia` chamadas simultâneas.
+
+        Retorna (resultados na ordem das perguntas, métricas da execução). No
+        desempenho de cada resultado, os tempos contam desde o início da geração.
+        """
+        inicio = time.perf_counter()
+        resultados_busca = self.buscar_lote(perguntas, k=k)
+        tempo_busca = time.perf_counter() - inicio
+
+        # Os totais de relevantes são contados uma vez, antes das gerações em paralelo
+        avaliadas = [pergunta for pergunta in perguntas if pergunta in ground_truth]
+        totais = dict(zip(avaliadas, self.total_relevantes([ground_truth[pergunta]["relevant_keys"] for pergunta in avaliadas])))
+
+        inicio_geracao = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            resultados = list(executor.map(
+                lambda pergunta, results: self._gerar(pergunta, results, total_relevantes=totais.get(pergunta)),
+                perguntas, resultados_busca,
+            ))
+        tempo_geracao = time.perf_counter() - inicio_geracao
+
+        for pergunta, resultado in zip(perguntas, resultados):
+            resultado["query"] = pergunta
+        salvar_interacoes([
+            {chave: resultado[chave] for chave in ("query", "documentos", "resposta", "metricas", "desempenho")}
+            for resultado in resultados if resultado["metricas"]
+        ])
+
+        geracoes = [resultado["tempo_geracao"] for resultado in resultados]
+        metricas_execucao = {
+            "perguntas": len(perguntas),
+            "concorrencia": concorrencia,
+            "tempo_busca_lote": tempo_busca,
+            "tempo_geracao_lote": tempo_geracao,
+            "geracao_mais_lenta": max(geracoes, default=0.0),
+            "soma_geracoes": sum(geracoes),
+            "tempo_primeiro_token_medio": sum(r["desempenho"]["tempo_primeiro_token"] for r in resultados) / max(len(resultados), 1),
+            "tempo_total": time.perf_counter() - inicio,
+        }
+        if self.cache is not None:
+            metricas_execucao["cache_recuperacao"] = self.cache.estatisticas()
+        return resultados, metricas_execucao
+
+    def total_relevantes(self, listas_chaves):
+        """
+        Conta os documentos relevantes de cada lista de chaves na coleção inteira, para o recall.
+
+        As contagens são guardadas até a versão da coleção mudar.
+        """
+        versao = self.cache.versao() if self.cache is not None else ""
+        if versao != self._corpus_versao:
+            self._totais_relevantes = {}
+            self._corpus_versao = versao
+        faltantes = list({tuple(chaves) for chaves in listas_chaves} - self._totais_relevantes.keys())
+        if faltantes:
+            corpus = self.db.get(include=["documents"])["documents"]
+            self._totais_relevantes.update(zip(faltantes, contar_relevantes(corpus, faltantes).tolist()))
+        return [self._totais_relevantes[tuple(chaves)] for chaves in listas_chaves]
+
+    def _gerar(self, query_text, results, ao_receber=None, total_relevantes=None):
+        retrieved_docs = [doc.page_content for doc, _ in results]
+
+        # buscar/buscar_lote sempre retornam relevâncias (ver fundir), em qualquer modo de busca
+        combined_context, incluidos, relatorio_contexto = montar_contexto(
+            query_text, results, self.contexto_analitico, self.orcamento_tokens,
+            maior_melhor=True, classificador=self.classificador,
+        )
+        prompt = PROMPT_TEMPLATE.format(contexto=combined_context, pergunta_do_usuário=query_text)
+
+        inicio_geracao = time.perf_counter()
+        pedacos = []
+        tempo_primeiro_token = None
+        for pedaco in self.model.stream(prompt):
+            if tempo_primeiro_token is None:
+                tempo_primeiro_token = time.perf_counter() - inicio_geracao
+            pedacos.append(pedaco)
+            if ao_receber is not None:
+                ao_receber(pedaco)
+        tempo_geracao = time.perf_counter() - inicio_geracao
+        response = "".join(pedacos).strip()
+
+        # O Ollama envia um token por trecho; a taxa considera só o tempo após o primeiro token
+        tempo_primeiro_token = tempo_primeiro_token if tempo_primeiro_token is not None else tempo_geracao
+        tempo_decodificacao = tempo_geracao - tempo_primeiro_token
+        desempenho = {
+            "tempo_primeiro_token": tempo_primeiro_token,
+            "tokens_gerados": len(pedacos),
+            "tokens_por_segundo": (len(pedacos) - 1) / tempo_decodificacao if len(pedacos) > 1 and tempo_decodificacao > 0 else 0.0,
+            "latencia_total": tempo_geracao,
+        }
+        sources = [doc.metadata.get("id", "Desconhecido") for doc, _ in incluidos]
+
+        metricas = {}
+        if query_text in ground_truth:
+            relevant_keys = ground_truth[query_text]["relevant_keys"]
+            if total_relevantes is None:
+                total_relevantes = self.total_relevantes([relevant_keys])[0]
+            metricas = calcular_metricas(retrieved_docs, relevant_keys, total_relevantes)
+
+        return {
+            "resposta": response,
+            "fontes": sources,
+            "documentos": [doc.page_content for doc, _ in incluidos],
+            "metricas": metricas,
+            "contexto": relatorio_contexto,
+            "desempenho": desempenho,
+            "tempo_geracao": tempo_geracao,
+        }
+
+
+def _formatar_tempos(tempos):
+    return ", ".join(f"{etapa}={segundos:.2f}s" for etapa, segundos in tempos.items())
+
+
+_sessao = None
+
+def obter_sessao():
+    """Retorna a sessão de consulta do processo, criando-a na primeira chamada."""
+    global _sessao
+    if _sessao is None:
+        _sessao = SessaoConsulta()
+    return _sessao
 
 
 # --- Função principal ---
-def query_data():
+def query_data(query_text=None):
     """Executa a consulta e calcula métricas."""
-    PROMPT_TEMPLATE = """
-    Você é um assistente especializado em responder perguntas sobre defeitos em sistemas GPON.
-    Analise o contexto e gere respostas concisas em português.
+    if query_text is None:
+        query_text = input("❓ Sua pergunta: ")
+
+    print("\n💡 ", end="", flush=True)
+    resultado = obter_sessao().responder(query_text, ao_receber=lambda pedaco: print(pedaco, end="", flush=True))
+
+    print(f"\n🔗 Fontes: {resultado['fontes']}\n📈 Métricas: {resultado['metricas']}")
+    print(f"⏱️ Latência (sessão aquecida): {_formatar_tempos(resultado['latencias'])}")
+    desempenho = resultado["desempenho"]
+    print(f"⚡ Primeiro token em {desempenho['tempo_primeiro_token']:.2f}s, "
+          f"{desempenho['tokens_gerados']} tokens a {desempenho['tokens_por_segundo']:.1f} tokens/s")
+    contexto = resultado["contexto"]
+    print(f"🧮 Contexto: {contexto['tokens_contexto']}/{contexto['orcamento']} tokens, "
+          f"{contexto['documentos_incluidos']} de {contexto['documentos_recuperados']} documentos")
+    return resultado['resposta']
+
+
+def carregar_perguntas(caminho):
+    """Lê perguntas de um arquivo .json (lista) ou de texto (uma por linha)."""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        if caminho.endswith(".json"):
+            return json.load(f)
+        return [linha.strip() for linha in f if linha.strip()]
+
+
+def query_data_lote(perguntas, concorrencia=4, caminho_saida=RESULTADOS_LOTE_PATH):
+    """Responde um lote de perguntas e grava resultados e métricas em um único arquivo."""
+    resultados, metricas_execucao = obter_sessao().responder_lote(perguntas, concorrencia=concorrencia)
+
+    with open(caminho_saida, 'w', encoding='utf-8') as f:
+        json.dump({"metricas_execucao": metricas_execucao, "resultados": resultados}, f, ensure_ascii=False, indent=4)
+
+    print(f"✅ {len(resultados)} perguntas respondidas. Resultados salvos em {caminho_saida}")
+    print(f"⏱️ Lote: {_formatar_tempos({chave: valor for chave, valor in metricas_execucao.items() if isinstance(valor, float)})}")
+    return resultados
+
 
-    ### Contexto:
-    {contexto}
+def comparar_modos_busca(perguntas=None, ks=(5, 10, 20), modos=("denso", "hibrido")):
+    """Calcula as métricas médias de recuperação do ground truth para cada modo de busca e cada k."""
+    sessao = obter_sessao()
+    perguntas = perguntas or list(ground_truth)
+    listas_chaves = [ground_truth[pergunta]["relevant_keys"] for pergunta in perguntas]
+    totais = sessao.total_relevantes(listas_chaves)
+    modo_original = sessao.modo_busca
+    resultados = {}
+    try:
+        for modo in modos:
+            sessao.modo_busca = modo
+            documentos = [[doc.page_content for doc, _ in results] for results in sessao.buscar_lote(perguntas, k=max(ks))]
+            por_k = avaliar_lote(documentos, listas_chaves, ks, totais)
+            resultados[modo] = {k: medias(metricas) for k, metricas in por_k.items()}
+    finally:
+        sessao.modo_busca = modo_original
+
+    for modo, por_k in resultados.items():
+        for k, media in por_k.items():
+            print(f"🔎 {modo} @{k}: " + ", ".join(f"{chave}={valor:.3f}" for chave, valor in media.items()))
+    return resultados
 
-    ### Pergunta:
-    {pergunta_do_usuário}
 
-    Responda no formato:
-    Resposta: <texto direto e objetivo>
-    Fontes: <lista de chaves de defeito usadas>
+def comparar_quantizacao(perguntas=None, k=20):
+    """
+    Compara a busca densa no índice quantizado com a busca em precisão total (float32)
+    nas perguntas do ground truth: memória dos vetores, sobreposição dos top-k
+    (recall em relação à precisão total), com e sem re-ranqueamento, e a variação
+    das métricas de recuperação.
     """
+    sessao = obter_sessao()
+    quantizado = sessao.quantizado
+    if quantizado is None:
+        print("⚠️ Nenhum índice quantizado encontrado. Rode populate_database.py com --vetores-compactos.")
+        return None
+
+    perguntas = perguntas or list(ground_truth)
+    listas_chaves = [ground_truth[pergunta]["relevant_keys"] for pergunta in perguntas]
+    vetores = embutir_consultas(sessao.embedding_function, perguntas)
+
+    inicio = time.perf_counter()
+    sessao.quantizado = None
+    try:
+        completos = sessao.buscar_densos(vetores, k)
+    finally:
+        sessao.quantizado = quantizado
+    tempo_completo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    reranqueados = sessao.buscar_densos(vetores, k)
+    tempo_reranqueado = time.perf_counter() - inicio
+    sem_reranqueamento = quantizado.buscar(vetores, candidatos=k)
+
+    def sobreposicao(listas):
+        valores = []
+        for referencia, ids in zip(completos, listas):
+            esperados = {doc.metadata.get("id") for doc, _ in referencia}
+            if esperados:
+                valores.append(len(esperados & set(ids)) / len(esperados))
+        return sum(valores) / max(len(valores), 1)
+
+    totais = sessao.total_relevantes(listas_chaves)
+    metricas_completas = medias(avaliar_lote([[doc.page_content for doc, _ in r] for r in completos], listas_chaves, (k,), totais)[k])
+    metricas_quantizadas = medias(avaliar_lote([[doc.page_content for doc, _ in r] for r in reranqueados], listas_chaves, (k,), totais)[k])
+
+    vetores_indice = len(quantizado)
+    relatorio = {
+        "tipo": quantizado.tipo,
+        "vetores": vetores_indice,
+        "dimensao": quantizado.dimensao,
+        "bytes_float32": vetores_indice * (quantizado.dimensao or 0) * 4,
+        "bytes_quantizado": quantizado.tamanho_bytes(),
+        "recall_sem_reranqueamento": sobreposicao([[id_ for id_, _ in linha] for linha in sem_reranqueamento]),
+        "recall_com_reranqueamento": sobreposicao([[doc.metadata.get("id") for doc, _ in r] for r in reranqueados]),
+        "tempo_float32": tempo_completo,
+        "tempo_quantizado": tempo_reranqueado,
+        "variacao_metricas": {nome: metricas_quantizadas[nome] - valor for nome, valor in metricas_completas.items()},
+    }
 
-    query_text = input("❓ Sua pergunta: ")
-    embedding_function = get_embedding_function()
-    db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embedding_function)
-    results = db.similarity_search_with_score(query_text, k=20)
-    retrieved_docs = [doc.page_content for doc, _ in results]
+    print(f"🗜️ {quantizado.tipo}: {relatorio['bytes_quantizado'] / 2**20:.1f} MB contra "
+          f"{relatorio['bytes_float32'] / 2**20:.1f} MB em float32 ({vetores_indice} vetores de dimensão {quantizado.dimensao})")
+    print(f"🎯 Recall@{k} em relação ao float32: {relatorio['recall_sem_reranqueamento']:.3f} sem re-ranqueamento, "
+          f"{relatorio['recall_com_reranqueamento']:.3f} com re-ranqueamento")
+    print(f"⏱️ Busca densa: float32={tempo_completo:.2f}s, quantizada={tempo_reranqueado:.2f}s")
+    print("📉 Variação das métricas: " + ", ".join(f"{nome}={valor:+.3f}" for nome, valor in relatorio["variacao_metricas"].items()))
+    return relatorio
 
-    with open(JSON_ANALITICO_PATH, 'r', encoding='utf-8') as f:
-        contexto_analitico = json.load(f)
 
-    contexto_texto = (
-        f"Total de bugs: {contexto_analitico['contagem_total_bugs']}\n\n"
-        f"Bugs por Epic Link:\n{contexto_analitico['contagem_epic_link']}\n\n"
-        f"Bugs por Release:\n{contexto_analitico['contagem_bugs_release']}"
-    )
+def main():
+    """Responde perguntas em sequência reaproveitando a mesma sessão. Linha vazia encerra."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lote", help="Arquivo com perguntas (.json com lista ou .txt com uma por linha).")
+    parser.add_argument("--ground-truth", action="store_true", help="Executar todas as perguntas do ground truth.")
+    parser.add_argument("--concorrencia", type=int, default=4, help="Gerações simultâneas no LLM no modo lote.")
+    parser.add_argument("--saida", default=RESULTADOS_LOTE_PATH, help="Arquivo de resultados do modo lote.")
+    parser.add_argument("--comparar-busca", action="store_true", help="Comparar as métricas de recuperação da busca densa e da híbrida no ground truth.")
+    parser.add_argument("--comparar-quantizacao", action="store_true", help="Comparar a busca no índice quantizado com a de precisão total no ground truth.")
+    args = parser.parse_args()
 
-    combined_context = f"{contexto_texto}\n\n---\n\n" + "\n\n---\n\n".join(retrieved_docs)
-    prompt = PROMPT_TEMPLATE.format(contexto=combined_context, pergunta_do_usuário=query_text)
+    if args.comparar_quantizacao:
+        comparar_quantizacao()
+        return
 
-    model = OllamaLLM(model="mistral")
-    response = model.invoke(prompt).strip()
-    sources = [doc.metadata.get("id", "Desconhecido") for doc, _ in results]
+    if args.comparar_busca:
+        comparar_modos_busca()
+        return
 
-    # Calcular métricas com sklearn
-    metricas = {}
-    if query_text in ground_truth:
-        relevant_keys = ground_truth[query_text]["relevant_keys"]
-        metricas = calcular_metricas(retrieved_docs, relevant_keys)
-        salvar_interacao(query_text, retrieved_docs, response, metricas)
+    if args.lote or args.ground_truth:
+        perguntas = carregar_perguntas(args.lote) if args.lote else list(ground_truth)
+        query_data_lote(perguntas, concorrencia=args.concorrencia, caminho_saida=args.saida)
+        return
 
-    print(f"\n💡 Resposta: {response}\n🔗 Fontes: {sources}\n📈 Métricas: {metricas}")
-    return response
+    while True:
+        query_text = input("❓ Sua pergunta (vazio para sair): ").strip()
+        if not query_text:
+            break
+        query_data(query_text)
 
 
 if __name__ == "__main__":
-    query_data()
+    main()
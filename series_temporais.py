@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+
+# Colunas de data de resolução aceitas no CSV do Jira, em ordem de preferência
+COLUNAS_RESOLUCAO = ["Resolved", "Resolution Date", "Resolvido"]
+
+# Formatos de data tentados em ordem: o da exportação do Jira ("15/Jan/23 10:00 AM") e
+# ISO 8601. Com formato explícito, o pandas não recorre ao dateutil elemento a elemento
+FORMATO_DATA_JIRA = "%d/%b/%y %I:%M %p"
+FORMATOS_DATA = [FORMATO_DATA_JIRA, "ISO8601"]
+
+# Versão no início da tag do Summary (ex.: "v1.6.0" em "[v1.6.0-sp33.0]") e sprint na tag ("sp33")
+PADRAO_VERSAO = r"^(?P<versao>v?\d+(?:\.\d+)+)"
+PADRAO_SPRINT_TAG = r"(?i)\bsp(?P<numero>\d+)"
+PADRAO_SPRINT = r"(?P<numero>\d+)\D*$"
+RELEASE_NAO_IDENTIFICADA = "release não identificada"
+
+# Taxa móvel (média das últimas JANELA_TAXA semanas/sprints) e detecção de picos: um período
+# é pico quando supera a média das JANELA_PICOS anteriores em LIMIAR_PICO desvios-padrão
+JANELA_TAXA = 4
+JANELA_PICOS = 8
+LIMIAR_PICO = 3.0
+MINIMO_PICO = 3
+
+def converter_datas(valores):
+    """
+    Converte datas do Jira em datetime, tentando FORMATOS_DATA em ordem só nos valores
+    ainda não convertidos. Valores fora dos formatos viram NaT; colunas já convertidas
+    são retornadas sem alteração.
+    """
+    valores = pd.Series(valores)
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        return valores
+    datas = pd.Series(pd.NaT, index=valores.index, dtype="datetime64[ns]")
+    for formato in FORMATOS_DATA:
+        faltantes = datas.isna() & valores.notna()
+        if not faltantes.any():
+            break
+        datas[faltantes] = pd.to_datetime(valores[faltantes].astype(str), format=formato, errors='coerce')
+    return datas
+
+def derivar_release(tags):
+    """
+    Extrai a versão da release das tags do Summary (ver extrair_releases).
+
+    Tags sem versão ("Bloqueado", "Duplicado") e Summaries sem tag viram RELEASE_NAO_IDENTIFICADA.
+    """
+    tags = pd.Series(tags, dtype=object).astype(str)
+    return tags.str.extract(PADRAO_VERSAO, expand=False).fillna(RELEASE_NAO_IDENTIFICADA)
+
+def derivar_sprint(sprints, tags=None):
+    """
+    Retorna o número da sprint pelo campo Sprint ou, na falta dele, pela tag do Summary ("sp33").
+    """
+    sprints = pd.Series(sprints, dtype=object)
+    numeros = pd.to_numeric(sprints.astype(str).str.extract(PADRAO_SPRINT, expand=False).where(sprints.notna()),
+                            errors='coerce')
+    if tags is not None:
+        da_tag = pd.to_numeric(pd.Series(tags, dtype=object, index=sprints.index).astype(str)
+                               .str.extract(PADRAO_SPRINT_TAG, expand=False), errors='coerce')
+        numeros = numeros.fillna(da_tag)
+    return numeros.astype("Int64")
+
+def tempo_resolucao(df, coluna_criacao="Created"):
+    """
+    Calcula o tempo de resolução em dias (data de resolução - criação).
+
+    Retorna NaN para bugs sem data de resolução ou quando o CSV não traz nenhuma das COLUNAS_RESOLUCAO.
+    """
+    coluna = next((coluna for coluna in COLUNAS_RESOLUCAO if coluna in df.columns), None)
+    if coluna is None or coluna_criacao not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    criados = converter_datas(df[coluna_criacao])
+    resolvidos = converter_datas(df[coluna])
+    dias = (resolvidos - criados).dt.total_seconds() / 86400
+    return dias.where(dias >= 0)
+
+def taxa_movel(contagens, janela=JANELA_TAXA):
+    """
+    Média móvel das últimas `janela` posições (janelas parciais no início), por soma acumulada.
+    """
+    contagens = np.asarray(contagens, dtype=np.float64)
+    acumulada = np.concatenate([[0.0], np.cumsum(contagens)])
+    posicoes = np.arange(1, len(contagens) + 1)
+    inicio = np.maximum(posicoes - janela, 0)
+    return (acumulada[posicoes] - acumulada[inicio]) / (posicoes - inicio)
+
+def detectar_picos(contagens, janela=JANELA_PICOS, limiar=LIMIAR_PICO, minimo=MINIMO_PICO):
+    """
+    Retorna as posições em que a contagem supera a média das `janela` anteriores em
+    `limiar` desvios-padrão (e vale ao menos `minimo`).
+    """
+    contagens = np.asarray(contagens, dtype=np.float64)
+    if len(contagens) <= 1:
+        return np.zeros(0, dtype=np.int64)
+    soma = np.concatenate([[0.0], np.cumsum(contagens)])
+    soma_quadrados = np.concatenate([[0.0], np.cumsum(contagens ** 2)])
+    posicoes = np.arange(len(contagens))
+    inicio = np.maximum(posicoes - janela, 0)
+    tamanho = posicoes - inicio
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        media = (soma[posicoes] - soma[inicio]) / tamanho
+        variancia = (soma_quadrados[posicoes] - soma_quadrados[inicio]) / tamanho - media ** 2
+        desvio = np.sqrt(np.maximum(variancia, 0))
+        # Com histórico constante (desvio 0), vale um desvio mínimo de 1 bug
+        picos = (tamanho > 1) & (contagens >= minimo) & (contagens > media + limiar * np.maximum(desvio, 1.0))
+    return np.flatnonzero(picos)
+
+def _serie(rotulos, contagens, janela_taxa=JANELA_TAXA):
+    contagens = np.asarray(contagens, dtype=np.int64)
+    return {
+        "rotulos": [str(rotulo) for rotulo in rotulos],
+        "contagens": contagens.tolist(),
+        "taxa_movel": np.round(taxa_movel(contagens, janela_taxa), 2).tolist(),
+        "picos": [str(rotulos[i]) for i in detectar_picos(contagens)],
+    }
+
+def serie_semanal(datas):
+    """
+    Contagem de bugs por semana (segunda a domingo), incluindo semanas sem bugs.
+
+    Em vez de um rótulo por semana, a série guarda a data inicial e o vetor de contagens.
+    """
+    dias = converter_datas(datas).dropna().to_numpy().astype("datetime64[D]").astype(np.int64)
+    if not len(dias):
+        return {}
+    # 1970-01-01 foi uma quinta-feira: (dias + 3) // 7 numera as semanas a partir de segunda
+    semanas = (dias + 3) // 7
+    primeira = semanas.min()
+    contagens = np.bincount(semanas - primeira)
+    inicios = (np.arange(primeira, primeira + len(contagens)) * 7 - 3).astype("datetime64[D]")
+    serie = _serie(inicios.astype(str), contagens)
+    return {
+        "inicio": str(inicios[0]),
+        "frequencia": "W-MON",
+        "contagens": serie["contagens"],
+        "taxa_movel": serie["taxa_movel"],
+        "picos": serie["picos"],
+    }
+
+def serie_por_sprint(numeros, resolucao=None):
+    """
+    Contagem de bugs por número de sprint (sprints sem bugs incluídas), com o tempo
+    mediano de resolução de cada uma quando disponível.
+    """
+    numeros = pd.Series(numeros).dropna().astype(np.int64)
+    if numeros.empty:
+        return {}
+    primeira = int(numeros.min())
+    contagens = np.bincount(numeros.to_numpy() - primeira)
+    serie = _serie(np.arange(primeira, primeira + len(contagens)), contagens)
+    serie["rotulos"] = [int(rotulo) for rotulo in serie["rotulos"]]
+    serie["picos"] = [int(rotulo) for rotulo in serie["picos"]]
+    if resolucao is not None:
+        medianas = pd.Series(resolucao).reindex(numeros.index).groupby(numeros).median()
+        medianas = medianas.reindex(range(primeira, primeira + len(contagens)))
+        serie["resolucao_mediana_dias"] = [None if pd.isna(valor) else round(float(valor), 1) for valor in medianas]
+    return serie
+
+def densidade_por_release(releases, datas, resolucao=None):
+    """
+    Resume cada release (em ordem cronológica do primeiro bug): bugs, período, semanas
+    ativas (semanas distintas com ao menos um bug), densidade (bugs por semana ativa) e
+    tempo de resolução.
+    """
+    tabela = pd.DataFrame({
+        "release": pd.Series(releases, dtype=object).to_numpy(),
+        "data": converter_datas(datas).to_numpy(),
+        "resolucao": np.nan if resolucao is None else pd.Series(resolucao, dtype=float).to_numpy(),
+    })
+    tabela = tabela[tabela["release"] != RELEASE_NAO_IDENTIFICADA]
+    if tabela.empty:
+        return {}
+    # Semana de cada bug numerada a partir de segunda, como em serie_semanal
+    dias = tabela["data"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    tabela["semana"] = np.where(tabela["data"].notna(), (dias + 3) // 7, np.nan)
+    grupos = tabela.groupby("release").agg(
+        bugs=("release", "size"),
+        inicio=("data", "min"),
+        fim=("data", "max"),
+        semanas=("semana", "nunique"),
+        resolvidos=("resolucao", "count"),
+        resolucao_media=("resolucao", "mean"),
+        resolucao_mediana=("resolucao", "median"),
+    ).sort_values("inicio", na_position="last")
+    semanas = np.maximum(grupos["semanas"].to_numpy(dtype=float), 1.0)
+
+    def lista(valores, casas=1):
+        return [None if pd.isna(valor) else round(float(valor), casas) for valor in valores]
+
+    return {
+        "releases": grupos.index.tolist(),
+        "bugs": grupos["bugs"].astype(int).tolist(),
+        "inicio": [None if pd.isna(data) else str(data.date()) for data in grupos["inicio"]],
+        "fim": [None if pd.isna(data) else str(data.date()) for data in grupos["fim"]],
+        "semanas_ativas": [int(semana) for semana in semanas],
+        "densidade_semanal": lista(grupos["bugs"].to_numpy() / semanas, 2),
+        "resolvidos": grupos["resolvidos"].astype(int).tolist(),
+        "resolucao_media_dias": lista(grupos["resolucao_media"]),
+        "resolucao_mediana_dias": lista(grupos["resolucao_mediana"]),
+    }
+
+def analisar_series(datas, releases, sprints, resolucao=None):
+    """
+    Produz as séries semanal, por sprint e por release a partir das colunas já derivadas.
+    """
+    return {
+        "semanal": serie_semanal(datas),
+        "por_sprint": serie_por_sprint(sprints, resolucao),
+        "por_release": densidade_por_release(releases, datas, resolucao),
+    }
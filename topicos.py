@@ -0,0 +1,315 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from artefato_analitico import ARTEFATO_ANALITICO_PATH, atualizar_secoes
+from classificador_modulos import ClassificadorModulos
+from duplicatas import PAGINA_CHROMA, normalizar
+from indice_bm25 import tokenizar
+
+# Estado do modelo de tópicos, ao lado do estado da análise incremental
+TOPICOS_PATH = os.path.join("estado_analitico", "topicos")
+CONTEXTO_ANALITICO_PATH = "contexto_analitico.json"
+
+# Parâmetros do k-means em mini-lotes (k-means esférico: vetores e centróides normalizados)
+NUMERO_TOPICOS = 40
+TAMANHO_LOTE_KMEANS = 1024
+EPOCAS_INICIAIS = 5
+AMOSTRA_INICIALIZACAO = 20_000
+SEMENTE = 42
+
+# Tamanho do resumo exportado para o contexto analítico
+TERMOS_POR_TOPICO = 5
+TOPICOS_POR_GRUPO = 3
+MAX_EPICS_RESUMO = 30
+
+# Termos sem conteúdo descartados do c-TF-IDF (comparados já tokenizados)
+STOPWORDS = set(tokenizar(
+    "não nao com para por uma que dos das nas nos the and for with when after após are does not from "
+    "nem sem mais mas está esta sua seu ser sendo pelo pela como quando este essa isso"
+))
+
+class ModeloTopicos:
+    """
+    Tópicos dos bugs por k-means em mini-lotes sobre os vetores já gravados no Chroma.
+
+    Os centróides e o número de documentos que cada um já absorveu são persistidos,
+    de modo que bugs novos apenas ajustam os centróides (taxa de aprendizado 1/contagem)
+    e recebem um tópico, sem refazer o agrupamento. Os termos de cada tópico vêm do
+    c-TF-IDF dos Summaries, calculado com uma matriz esparsa tópico x termo.
+    """
+
+    def __init__(self, centroides=None, contagens=None, documentos=None):
+        self.centroides = centroides
+        self.contagens = contagens
+        self.documentos = documentos if documentos is not None else pd.DataFrame(
+            columns=["hash", "topico", "modulo", "epic", "summary"]
+        )
+
+    @classmethod
+    def carregar(cls, pasta=TOPICOS_PATH):
+        """
+        Carrega o modelo salvo, ou retorna None se não existir.
+        """
+        caminho_modelo = os.path.join(pasta, "modelo.npz")
+        caminho_documentos = os.path.join(pasta, "documentos.pkl")
+        if not (os.path.exists(caminho_modelo) and os.path.exists(caminho_documentos)):
+            return None
+        with np.load(caminho_modelo) as modelo:
+            return cls(modelo["centroides"], modelo["contagens"], pd.read_pickle(caminho_documentos))
+
+    def salvar(self, pasta=TOPICOS_PATH):
+        os.makedirs(pasta, exist_ok=True)
+        np.savez(os.path.join(pasta, "modelo.npz"), centroides=self.centroides, contagens=self.contagens)
+        self.documentos.to_pickle(os.path.join(pasta, "documentos.pkl"))
+
+    def ajustar(self, matriz, numero_topicos=NUMERO_TOPICOS, epocas=EPOCAS_INICIAIS):
+        """
+        Inicializa os centróides por k-means++ em uma amostra e os refina em `epocas` passadas de mini-lotes.
+        """
+        gerador = np.random.default_rng(SEMENTE)
+        amostra = matriz[gerador.permutation(len(matriz))[:AMOSTRA_INICIALIZACAO]]
+        self.centroides = _kmeans_mais_mais(amostra, min(numero_topicos, len(amostra)), gerador)
+        self.contagens = np.zeros(len(self.centroides), dtype=np.int64)
+        for _ in range(epocas):
+            self.atualizar(matriz[gerador.permutation(len(matriz))])
+
+    def atualizar(self, matriz):
+        """
+        Ajusta os centróides com os vetores em mini-lotes e retorna o tópico de cada vetor.
+
+        Cada centróide se move em direção à média do lote com peso n_lote / contagem
+        acumulada, o equivalente vetorizado da atualização de Sculley (2010).
+        """
+        topicos = np.empty(len(matriz), dtype=np.int64)
+        for inicio in range(0, len(matriz), TAMANHO_LOTE_KMEANS):
+            lote = matriz[inicio:inicio + TAMANHO_LOTE_KMEANS]
+            atribuidos = self.atribuir(lote)
+            quantidades = np.bincount(atribuidos, minlength=len(self.centroides))
+            somas = np.zeros_like(self.centroides)
+            np.add.at(somas, atribuidos, lote)
+
+            self.contagens += quantidades
+            movidos = quantidades > 0
+            taxa = (quantidades[movidos] / self.contagens[movidos])[:, None]
+            medias = somas[movidos] / quantidades[movidos][:, None]
+            self.centroides[movidos] = (1 - taxa) * self.centroides[movidos] + taxa * medias
+            self.centroides = normalizar(self.centroides)
+            topicos[inicio:inicio + len(lote)] = atribuidos
+        return topicos
+
+    def atribuir(self, matriz):
+        """
+        Retorna o tópico (centróide de maior cosseno) de cada vetor normalizado.
+        """
+        return np.argmax(matriz @ self.centroides.T, axis=1)
+
+    def termos(self, quantidade=TERMOS_POR_TOPICO):
+        """
+        Retorna os `quantidade` termos de maior c-TF-IDF de cada tópico.
+
+        c-TF-IDF(t, c) = frequência de t em c / termos em c * log(1 + média de termos
+        por tópico / frequência de t em todos os tópicos).
+        """
+        tokens = self.documentos["summary"].fillna("").map(_termos_do_summary).reset_index(drop=True).explode().dropna()
+        if tokens.empty:
+            return {}
+        codigos, vocabulario = pd.factorize(tokens)
+        topicos = self.documentos["topico"].to_numpy(dtype=np.int64)[tokens.index.to_numpy()]
+        numero = len(self.centroides)
+        frequencias = sparse.coo_matrix((np.ones(len(codigos)), (topicos, codigos)), shape=(numero, len(vocabulario))).tocsr()
+
+        por_topico = np.asarray(frequencias.sum(axis=1)).ravel()
+        por_termo = np.asarray(frequencias.sum(axis=0)).ravel()
+        media = por_topico[por_topico > 0].mean()
+        pesos = sparse.diags(1 / np.maximum(por_topico, 1)) @ frequencias @ sparse.diags(np.log1p(media / por_termo))
+
+        resultado = {}
+        for topico in np.flatnonzero(por_topico):
+            linha = pesos.getrow(topico)
+            melhores = linha.indices[np.argsort(-linha.data, kind="stable")[:quantidade]]
+            resultado[int(topico)] = [vocabulario[i] for i in melhores]
+        return resultado
+
+    def resumo(self):
+        """
+        Resume os tópicos para o contexto analítico: termos e tamanho de cada tópico e
+        os tópicos predominantes de cada módulo e das Epics com mais bugs.
+        """
+        termos = self.termos()
+        tamanhos = self.documentos["topico"].value_counts()
+        temas = {
+            str(topico): {"bugs": int(total), "termos": ", ".join(termos.get(int(topico), []))}
+            for topico, total in tamanhos.items()
+        }
+
+        def predominantes(coluna, limite=None):
+            grupos = self.documentos.dropna(subset=[coluna])
+            contagem = grupos.groupby([coluna, "topico"]).size()
+            ordem = grupos[coluna].value_counts().index[:limite]
+            return {
+                str(grupo): {str(topico): int(total) for topico, total in contagem[grupo].nlargest(TOPICOS_POR_GRUPO).items()}
+                for grupo in ordem
+            }
+
+        return {
+            "documentos": len(self.documentos),
+            "temas": temas,
+            "por_modulo": predominantes("modulo"),
+            "por_epic": predominantes("epic", MAX_EPICS_RESUMO),
+        }
+
+def ler_documentos(db, ids=None, pagina=PAGINA_CHROMA, embeddings=True):
+    """
+    Lê da coleção, em páginas, IDs, metadados, textos e (opcionalmente) vetores normalizados.
+    """
+    incluir = ["metadatas", "documents"] + (["embeddings"] if embeddings else [])
+    paginas = []
+    if ids is None:
+        offset = 0
+        while True:
+            itens = db.get(include=incluir, limit=pagina, offset=offset)
+            if not itens["ids"]:
+                break
+            paginas.append(itens)
+            offset += len(itens["ids"])
+    else:
+        ids = list(ids)
+        paginas = [db.get(ids=ids[i:i + pagina], include=incluir) for i in range(0, len(ids), pagina)]
+
+    resultado = {chave: [valor for itens in paginas for valor in itens[chave]] for chave in ["ids", "metadatas", "documents"]}
+    if embeddings:
+        resultado["embeddings"] = (np.concatenate([normalizar(itens["embeddings"]) for itens in paginas])
+                                   if paginas else np.zeros((0, 0), dtype=np.float32))
+    return resultado
+
+def hash_conteudo(meta, texto):
+    """
+    Retorna o hash_conteudo dos metadados ou, em documentos ingeridos antes dele existir,
+    o mesmo SHA-1 do texto calculado por populate_database.
+    """
+    return (meta or {}).get("hash_conteudo") or hashlib.sha1((texto or "").encode("utf-8")).hexdigest()
+
+def tabela_documentos(itens, topicos, classificador):
+    """
+    Monta a tabela de documentos do modelo (hash, tópico, módulo, Epic e Summary), indexada pelo ID.
+    """
+    summaries = pd.Series([(texto or "").split("\n", 1)[0].removeprefix("Summary: ") for texto in itens["documents"]],
+                          dtype=object)
+    epics = pd.Series([(meta or {}).get("epic_link") for meta in itens["metadatas"]], dtype=object)
+    epics = epics.where(epics.notna() & ~epics.astype(str).str.lower().isin(["none", "nan", ""]))
+    return pd.DataFrame({
+        "hash": [hash_conteudo(meta, texto) for meta, texto in zip(itens["metadatas"], itens["documents"])],
+        "topico": topicos,
+        "modulo": classificador.classificar_serie(summaries).to_numpy(),
+        "epic": epics.to_numpy(),
+        "summary": summaries.to_numpy(),
+    }, index=pd.Index(itens["ids"], dtype=object))
+
+def atualizar_topicos(db, pasta=TOPICOS_PATH, numero_topicos=NUMERO_TOPICOS, recalcular=False, classificador=None):
+    """
+    Atualiza o modelo de tópicos com a coleção atual e o salva.
+
+    Na primeira execução (ou com recalcular=True), todos os vetores são agrupados. Nas
+    seguintes, só os documentos novos ou com conteúdo alterado são lidos; eles ajustam
+    os centróides e recebem um tópico, e os removidos da coleção saem da tabela.
+    """
+    inicio = time.perf_counter()
+    classificador = classificador or ClassificadorModulos.de_arquivo()
+    modelo = None if recalcular else ModeloTopicos.carregar(pasta)
+
+    if modelo is None or modelo.centroides is None:
+        itens = ler_documentos(db)
+        modelo = ModeloTopicos()
+        if itens["ids"]:
+            modelo.ajustar(itens["embeddings"], numero_topicos)
+            modelo.documentos = tabela_documentos(itens, modelo.atribuir(itens["embeddings"]), classificador)
+        print(f"🧩 {len(itens['ids'])} documentos agrupados em {0 if modelo.centroides is None else len(modelo.centroides)} tópicos "
+              f"({time.perf_counter() - inicio:.2f}s).")
+    else:
+        atuais = db.get(include=["metadatas"])
+        hashes = pd.Series([(meta or {}).get("hash_conteudo") for meta in atuais["metadatas"]], index=atuais["ids"], dtype=object)
+        sem_hash = hashes.index[hashes.isna().to_numpy()]
+        if len(sem_hash):
+            # Só os documentos sem hash nos metadados têm o texto lido para calcular o hash
+            textos = ler_documentos(db, sem_hash, embeddings=False)
+            hashes[textos["ids"]] = [hash_conteudo(None, texto) for texto in textos["documents"]]
+        anteriores = modelo.documentos["hash"].reindex(hashes.index)
+        novos = hashes.index[anteriores.isna().to_numpy() | (anteriores.to_numpy() != hashes.to_numpy())]
+        manter = modelo.documentos.index.intersection(hashes.index).difference(novos)
+        removidos = len(modelo.documentos.index.difference(hashes.index))
+
+        itens = ler_documentos(db, novos)
+        tabela = modelo.documentos.loc[manter]
+        if itens["ids"]:
+            topicos = modelo.atualizar(itens["embeddings"])
+            tabela = pd.concat([tabela, tabela_documentos(itens, topicos, classificador)])
+        modelo.documentos = tabela
+        print(f"🧩 Tópicos atualizados: {len(itens['ids'])} documentos novos ou alterados, "
+              f"{removidos} removidos ({time.perf_counter() - inicio:.2f}s).")
+
+    modelo.salvar(pasta)
+    return modelo
+
+def carregar_resumo_topicos(pasta=TOPICOS_PATH):
+    """
+    Retorna o resumo do modelo de tópicos salvo, ou None se ele ainda não foi calculado.
+    """
+    modelo = ModeloTopicos.carregar(pasta)
+    if modelo is None or modelo.centroides is None or modelo.documentos.empty:
+        return None
+    return modelo.resumo()
+
+def exportar_topicos(modelo, caminho=CONTEXTO_ANALITICO_PATH, caminho_artefato=ARTEFATO_ANALITICO_PATH):
+    """
+    Grava o resumo dos tópicos em "topicos" no contexto analítico já exportado (JSON e artefato binário).
+    """
+    if not os.path.exists(caminho):
+        return False
+    resumo = modelo.resumo()
+    with open(caminho, 'r', encoding='utf-8') as f:
+        contexto = json.load(f)
+    contexto["topicos"] = resumo
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(contexto, f, indent=4, ensure_ascii=False)
+    # O artefato é gravado depois do JSON, para não ser considerado desatualizado
+    atualizar_secoes({"topicos": resumo}, caminho_artefato)
+    return True
+
+def _termos_do_summary(texto):
+    """
+    Tokeniza um Summary para o c-TF-IDF, sem stopwords, termos curtos e termos com dígitos (versões, sprints).
+    """
+    return [termo for termo in tokenizar(texto) if len(termo) >= 3 and termo not in STOPWORDS and not any(c.isdigit() for c in termo)]
+
+def _kmeans_mais_mais(matriz, k, gerador):
+    """
+    Escolhe k centróides iniciais com probabilidade proporcional à distância ao mais próximo já escolhido.
+    """
+    escolhidos = [gerador.integers(len(matriz))]
+    distancias = np.maximum(1 - matriz @ matriz[escolhidos[0]], 0)
+    for _ in range(1, k):
+        total = distancias.sum()
+        proximo = gerador.choice(len(matriz), p=distancias / total) if total > 0 else gerador.integers(len(matriz))
+        escolhidos.append(proximo)
+        distancias = np.minimum(distancias, np.maximum(1 - matriz @ matriz[proximo], 0))
+    return matriz[escolhidos].copy()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recalcular", action="store_true", help="Refazer o agrupamento com todos os documentos.")
+    parser.add_argument("--topicos", type=int, default=NUMERO_TOPICOS, help="Número de tópicos (ao recalcular).")
+    args = parser.parse_args()
+
+    from langchain.vectorstores import Chroma
+    from get_embeddings_function import get_embedding_function
+    from populate_database import CHROMA_PATH
+
+    db = Chroma(persist_directory=CHROMA_PATH, embedding_function=get_embedding_function())
+    modelo = atualizar_topicos(db, numero_topicos=args.topicos, recalcular=args.recalcular)
+    if exportar_topicos(modelo):
+        print(f"✅ Tópicos exportados para '{CONTEXTO_ANALITICO_PATH}'.")